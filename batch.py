@@ -0,0 +1,342 @@
+import argparse
+import csv
+import fnmatch
+import glob
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from evaluation import evaluate_track
+from loader import (ORIGINAL, REFERENCE, SMOOTHED, align_reference_axes, load_file, original_array, reference_array,
+                    smoothed_array, sniff_file)
+from track_cache import load_file_cached
+
+##
+# \file batch.py
+# \brief Tryb wsadowy: ocena wszystkich tras i metod wygładzania jednym poleceniem.
+#
+# Skrypt wyszukuje katalogi tras (domyślnie TRASA_*), w każdym z nich plik z danymi oryginalnymi, plik referencyjny
+# i pliki "smoothed <Metoda>.txt", a następnie oblicza błędy dla wszystkich kombinacji trasa x metoda w puli procesów.
+# Dane oryginalne i referencyjne każdej trasy wczytywane są tylko raz. Wyniki zapisywane są w jednej tabeli CSV.
+# Trasom bez własnego pliku referencyjnego można przypisać plik spoza katalogu trasy (--reference-map). Trasy
+# pominięte przy wyszukiwaniu, wczytywaniu lub ocenie nie przerywają przebiegu - są wypisywane na końcu.
+#
+# Przykład: python batch.py --output results.csv --workers 4 --reference-map "TRASA_2_*=referencyjneT2.txt" \
+#           --reference-map TRASA_3=referencyjneT3.txt
+
+SMOOTHED_PREFIX = 'smoothed '
+
+## Kolumny tabeli wyników
+RESULT_COLUMNS = ('route', 'method', 'track', 'metric', 'points', 'groups',
+                  'group_mean', 'group_mse', 'group_mae', 'group_rmse', 'group_median',
+                  'mean', 'mse', 'rmse', 'median', 'p90', 'p95', 'max')
+
+## Pominięta trasa (method równe None oznacza całą trasę) i powód pominięcia
+Skipped = namedtuple('Skipped', ['route', 'method', 'reason'])
+
+##
+# @brief Odczytuje mapowanie tras na pliki referencyjne z argumentów postaci TRASA=ŚCIEŻKA.
+# @param items Lista argumentów; TRASA to ścieżka katalogu trasy lub wzorzec (np. TRASA_2_*).
+# @return Słownik wzorzec -> ścieżka pliku referencyjnego (w kolejności argumentów).
+def parse_reference_map(items):
+    reference_map = {}
+    for item in items or ():
+        pattern, separator, path = item.partition('=')
+        if not separator or not pattern.strip() or not path.strip():
+            raise ValueError(f'Niepoprawne mapowanie pliku referencyjnego (oczekiwano TRASA=ŚCIEŻKA): {item}')
+        reference_map[os.path.normpath(pattern.strip())] = path.strip()
+    return reference_map
+
+##
+# @brief Wyszukuje w mapowaniu plik referencyjny trasy.
+# @param route Ścieżka katalogu trasy (względna).
+# @param reference_map Słownik wzorzec -> ścieżka (parse_reference_map).
+# @return Ścieżka pliku referencyjnego z pierwszego pasującego wzorca lub None.
+def mapped_reference(route, reference_map):
+    for pattern, path in (reference_map or {}).items():
+        if fnmatch.fnmatchcase(route, pattern):
+            return path
+    return None
+
+##
+# @brief Wybiera plik referencyjny spośród kandydatów.
+#
+# Pierwszeństwo mają pliki o nazwach zaczynających się od "referencyjne"; spośród nich wybierany jest ostatni
+# w kolejności alfabetycznej (np. referencyjnev2.txt zamiast referencyjne.txt).
+# @param names Nazwy plików rozpoznanych jako dane referencyjne.
+# @return Wybrana nazwa pliku lub None.
+def choose_reference(names):
+    preferred = [name for name in names if name.lower().startswith('referencyjne')]
+    candidates = sorted(preferred or names)
+    return candidates[-1] if candidates else None
+
+##
+# @brief Wyszukuje trasy w podanych katalogach (rekurencyjnie).
+#
+# Katalog jest trasą, jeśli zawiera plik z danymi oryginalnymi, plik referencyjny i co najmniej jeden plik
+# "smoothed <Metoda>.txt". Plik referencyjny wskazany w mapowaniu ma pierwszeństwo przed plikami w katalogu trasy.
+# Katalogi bez pliku referencyjnego są pomijane z komunikatem.
+# @param roots Lista katalogów do przeszukania.
+# @param reference Nazwa pliku referencyjnego wymuszająca wybór w każdej trasie (opcjonalnie).
+# @param reference_map Słownik wzorzec ścieżki trasy -> ścieżka pliku referencyjnego (parse_reference_map).
+# @param skipped Lista, do której dopisywane są pominięte trasy (Skipped; opcjonalnie).
+# @return Lista słowników z kluczami 'route', 'original', 'reference' i 'methods' (metoda -> ścieżka).
+def discover_routes(roots, reference=None, reference_map=None, skipped=None):
+    routes = []
+    for root in roots:
+        for directory, subdirectories, file_names in os.walk(root):
+            subdirectories.sort()
+            roles = {ORIGINAL: [], SMOOTHED: [], REFERENCE: []}
+            for name in sorted(file_names):
+                if not name.endswith('.txt'):
+                    continue
+                role = sniff_file(os.path.join(directory, name))
+                if role is not None:
+                    roles[role].append(name)
+
+            methods = {name[len(SMOOTHED_PREFIX):-len('.txt')]: os.path.join(directory, name)
+                       for name in roles[SMOOTHED] if name.startswith(SMOOTHED_PREFIX)}
+            if not methods or not roles[ORIGINAL]:
+                continue
+            originals = [name for name in roles[ORIGINAL] if name.startswith('original')] or roles[ORIGINAL]
+            route = os.path.relpath(directory)
+            reference_path = mapped_reference(route, reference_map)
+            if reference_path is None:
+                reference_name = reference if reference in roles[REFERENCE] else choose_reference(roles[REFERENCE])
+                reference_path = os.path.join(directory, reference_name) if reference_name is not None else None
+                reason = 'brak pliku referencyjnego (użyj --reference-map)'
+            else:
+                reason = f'plik referencyjny z mapowania nie istnieje: {reference_path}'
+            if reference_path is None or not os.path.isfile(reference_path):
+                print(f"Pominięto {route}: {reason}")
+                if skipped is not None:
+                    skipped.append(Skipped(route, None, reason))
+                continue
+            routes.append({
+                'route': route,
+                'original': os.path.join(directory, originals[0]),
+                'reference': reference_path,
+                'methods': methods,
+            })
+    return routes
+
+##
+# @brief Wczytuje plik z danymi, korzystając z pamięci podręcznej, jeśli podano jej katalog.
+# @param file_path Ścieżka do pliku.
+# @param role Rola pliku.
+# @param cache_dir Katalog pamięci podręcznej lub None.
+# @return Krotka (rola, słownik kolumn).
+def _load(file_path, role, cache_dir):
+    if cache_dir is None:
+        return load_file(file_path, role)
+    return load_file_cached(file_path, role, cache_dir)
+
+##
+# @brief Wczytuje dane oryginalne i referencyjne trasy (wspólne dla wszystkich metod).
+# @param route Słownik trasy zwrócony przez discover_routes.
+# @param cache_dir Katalog binarnej pamięci podręcznej (track_cache.py); jeśli None, pliki są zawsze parsowane.
+# @return Słownik trasy uzupełniony o 'original_data' i 'ref_data' (w formacie szerokość, długość).
+def load_route(route, cache_dir=None):
+    _, original = _load(route['original'], ORIGINAL, cache_dir)
+    _, reference = _load(route['reference'], REFERENCE, cache_dir)
+    original_data = original_array(original)
+    ref_data = align_reference_axes(reference_array(reference), original_data[:, 1:3])
+    return dict(route, original_data=original_data, ref_data=ref_data, cache_dir=cache_dir)
+
+##
+# @brief Buduje wiersze tabeli wyników z wyniku evaluate_track.
+# @param route Nazwa trasy.
+# @param method Nazwa metody wygładzania.
+# @param metric Metryka błędów bez uwzględniania grup.
+# @param evaluation Słownik zwrócony przez evaluate_track.
+# @param points Liczba punktów danych wygładzonych.
+# @return Lista dwóch słowników (dane wygładzone i oryginalne) o kluczach RESULT_COLUMNS.
+def result_rows(route, method, metric, evaluation, points):
+    (mean_smoothed, mean_original, mse_smoothed, mse_original, mae_smoothed, mae_original,
+     rmse_smoothed, rmse_original, median_smoothed, median_original, _) = evaluation['groups']
+    group_values = {
+        'smoothed': (mean_smoothed, mse_smoothed, mae_smoothed, rmse_smoothed, median_smoothed),
+        'original': (mean_original, mse_original, mae_original, rmse_original, median_original),
+    }
+    rows = []
+    for track, (group_mean, group_mse, group_mae, group_rmse, group_median) in group_values.items():
+        metrics = evaluation['no_groups'][track]
+        rows.append({
+            'route': route, 'method': method, 'track': track, 'metric': metric,
+            'points': points, 'groups': len(evaluation['grouped_smoothed_data']),
+            'group_mean': float(group_mean), 'group_mse': float(group_mse), 'group_mae': float(group_mae),
+            'group_rmse': float(group_rmse), 'group_median': float(group_median),
+            'mean': metrics.mean, 'mse': metrics.mse, 'rmse': metrics.rmse, 'median': metrics.median,
+            'p90': metrics.percentiles[90], 'p95': metrics.percentiles[95], 'max': metrics.max,
+        })
+    return rows
+
+##
+# @brief Oblicza błędy jednej metody wygładzania na wczytanej trasie.
+# @param route_data Słownik trasy zwrócony przez load_route.
+# @param method Nazwa metody wygładzania.
+# @param metric Metryka błędów bez uwzględniania grup.
+# @param figures_dir Katalog, do którego zapisywane są wykresy (opcjonalnie).
+# @param with_errors Czy zwracać też wektory błędów (dla bazy wyników results_store.py).
+# @return Lista wierszy tabeli wyników lub, jeśli with_errors, krotka (wiersze, słownik ślad -> (wektor błędów
+#         grup, wektor błędów punktów)).
+def evaluate_method(route_data, method, metric='euclidean', figures_dir=None, with_errors=False):
+    _, smoothed = _load(route_data['methods'][method], SMOOTHED, route_data['cache_dir'])
+    smoothed_data = smoothed_array(smoothed)
+    evaluation = evaluate_track(route_data['original_data'], smoothed_data, route_data['ref_data'], metric=metric,
+                                cache_dir=route_data['cache_dir'])
+    if figures_dir is not None:
+        from plotting import plot_evaluation, use_headless
+        use_headless()
+        prefix = f"{route_data['route']}_{method}_".replace(os.sep, '_').replace(' ', '_')
+        plot_evaluation(route_data['original_data'], smoothed_data, evaluation, figures_dir, prefix)
+    rows = result_rows(route_data['route'], method, metric, evaluation, len(smoothed_data))
+    if not with_errors:
+        return rows
+    errors_smoothed, errors_original = evaluation['group_errors']
+    return rows, {'smoothed': (errors_smoothed, evaluation['no_groups']['smoothed'].errors),
+                  'original': (errors_original, evaluation['no_groups']['original'].errors)}
+
+##
+# @brief Ocenia wszystkie kombinacje trasa x metoda w puli procesów.
+#
+# Jeśli podano bazę wyników (results_store.py), kombinacje, których pliki wejściowe i metryka nie zmieniły się od
+# zapisania wyniku, nie są przeliczane - ich wiersze pochodzą z bazy, a trasy bez zmienionych kombinacji nie są
+# wczytywane.
+# @param routes Lista tras zwrócona przez discover_routes.
+# @param metric Metryka błędów bez uwzględniania grup.
+# @param workers Liczba procesów (None - liczba rdzeni).
+# @param cache_dir Katalog binarnej pamięci podręcznej (opcjonalnie).
+# @param figures_dir Katalog, do którego zapisywane są wykresy każdej kombinacji (opcjonalnie).
+# @param store Ścieżka do bazy wyników SQLite (opcjonalnie).
+# @param with_errors Czy zwracać też wektory błędów (dla przedziałów ufności bootstrap.py); wektory ponownie użytych
+#                    wyników odczytywane są z bazy.
+# @param skipped Lista, do której dopisywane są trasy i metody pominięte z powodu błędu wczytywania lub oceny
+#                (Skipped; opcjonalnie). Błąd jednej trasy lub metody nie przerywa oceny pozostałych.
+# @return Lista wierszy tabeli wyników w kolejności tras i metod lub, jeśli with_errors, krotka (wiersze, słownik
+#         (trasa, metoda) -> {ślad: (wektor błędów grup, wektor błędów punktów)}).
+def run_batch(routes, metric='euclidean', workers=None, cache_dir=None, figures_dir=None, store=None,
+              with_errors=False, skipped=None):
+    if skipped is None:
+        skipped = []
+    stored = {}
+    keys = {}
+    errors = {}
+    if store is not None:
+        import results_store
+        connection = results_store.open_store(store)
+        run_id = results_store.start_run(connection, f'batch.py metric={metric}')
+        digests = {}
+        for route in routes:
+            for method, smoothed_path in route['methods'].items():
+                key = results_store.result_key(route['original'], smoothed_path, route['reference'], metric, digests)
+                rows = results_store.reuse_results(connection, run_id, key, route['route'], method)
+                if rows is None:
+                    keys[route['route'], method] = key
+                else:
+                    stored[route['route'], method] = rows
+                    if with_errors:
+                        errors[route['route'], method] = results_store.stored_errors(connection, key)
+        routes = [dict(route, methods={method: path for method, path in route['methods'].items()
+                                       if (route['route'], method) not in stored}) for route in routes]
+        print(f"Baza wyników {store}: przebieg {run_id}, ponownie użyte {len(stored)}, do obliczenia {len(keys)}")
+
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        loads = [(route['route'], executor.submit(load_route, route, cache_dir))
+                 for route in routes if route['methods']]
+        loaded_routes = {}
+        failed_routes = set()
+        for route, future in loads:
+            try:
+                loaded_routes[route] = future.result()
+            except Exception as error:
+                print(f"Pominięto {route}: {error}")
+                skipped.append(Skipped(route, None, str(error)))
+                failed_routes.add(route)
+        jobs = {(route_data['route'], method): executor.submit(evaluate_method, route_data, method, metric,
+                                                               figures_dir, store is not None or with_errors)
+                for route_data in loaded_routes.values() for method in sorted(route_data['methods'])}
+        for route in routes:
+            if route['route'] in failed_routes:
+                continue
+            for method in sorted(set(route['methods']) | {key[1] for key in stored if key[0] == route['route']}):
+                if (route['route'], method) in stored:
+                    rows.extend(stored[route['route'], method])
+                    continue
+                try:
+                    result = jobs[route['route'], method].result()
+                except Exception as error:
+                    print(f"Pominięto {route['route']} / {method}: {error}")
+                    skipped.append(Skipped(route['route'], method, str(error)))
+                    continue
+                if store is None and not with_errors:
+                    rows.extend(result)
+                    continue
+                method_rows, method_errors = result
+                if store is not None:
+                    results_store.store_results(connection, run_id, keys[route['route'], method], method_rows,
+                                                method_errors)
+                errors[route['route'], method] = method_errors
+                rows.extend(method_rows)
+    return (rows, errors) if with_errors else rows
+
+##
+# @brief Zapisuje tabelę wyników do pliku CSV.
+# @param rows Lista wierszy tabeli wyników.
+# @param output_path Ścieżka do pliku wynikowego.
+# @param columns Kolumny tabeli (domyślnie RESULT_COLUMNS).
+def write_results(rows, output_path, columns=RESULT_COLUMNS):
+    with open(output_path, 'w', newline='') as output_file:
+        writer = csv.DictWriter(output_file, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description='Ocena wszystkich tras i metod wygładzania.')
+    parser.add_argument('roots', nargs='*', help='Katalogi tras (domyślnie TRASA_*)')
+    parser.add_argument('--output', default='results.csv', help='Plik wynikowy CSV')
+    parser.add_argument('--workers', type=int, default=None, help='Liczba procesów')
+    parser.add_argument('--metric', default='euclidean', choices=('euclidean', 'haversine', 'equirectangular', 'cross_track'))
+    parser.add_argument('--reference', default=None, help='Nazwa pliku referencyjnego używanego w każdej trasie')
+    parser.add_argument('--reference-map', action='append', default=[], metavar='TRASA=ŚCIEŻKA',
+                        help='Plik referencyjny trasy (ścieżka katalogu lub wzorzec, '
+                             'np. "TRASA_2_*=referencyjneT2.txt"); ma pierwszeństwo przed plikami w katalogu trasy; '
+                             'można podać wielokrotnie')
+    parser.add_argument('--cache-dir', default=None, help='Katalog binarnej pamięci podręcznej śladów')
+    parser.add_argument('--figures', default=None, help='Katalog, do którego zapisywane są wykresy')
+    parser.add_argument('--store', default=None,
+                        help='Baza wyników SQLite; przeliczane są tylko kombinacje o zmienionych plikach')
+    parser.add_argument('--bootstrap', type=int, default=0, metavar='RESAMPLES',
+                        help='Liczba losowań przedziałów ufności bootstrap (0 - bez przedziałów)')
+    parser.add_argument('--confidence', type=float, default=0.95, help='Poziom ufności przedziałów bootstrap')
+    parser.add_argument('--intervals-output', default='intervals.csv', help='Plik CSV z przedziałami ufności')
+    parser.add_argument('--differences-output', default='differences.csv',
+                        help='Plik CSV z przedziałami ufności różnic pomiędzy metodami')
+    args = parser.parse_args()
+    try:
+        reference_map = parse_reference_map(args.reference_map)
+    except ValueError as error:
+        parser.error(str(error))
+
+    skipped = []
+    routes = discover_routes(args.roots or sorted(glob.glob('TRASA_*')), args.reference, reference_map, skipped)
+    result = run_batch(routes, args.metric, args.workers, args.cache_dir, args.figures, args.store,
+                       with_errors=args.bootstrap > 0, skipped=skipped)
+    rows = result[0] if args.bootstrap > 0 else result
+    write_results(rows, args.output)
+    print(f"Zapisano {len(rows)} wierszy ({len(routes)} tras) do {args.output}")
+    if skipped:
+        print(f"Pominięto {len(skipped)}:")
+        for entry in skipped:
+            print(f"  {entry.route}{'' if entry.method is None else ' / ' + entry.method}: {entry.reason}")
+    if args.bootstrap > 0:
+        from bootstrap import DIFFERENCE_COLUMNS, INTERVAL_COLUMNS, batch_bootstrap
+        interval_rows, difference_rows = batch_bootstrap(result[1], args.bootstrap, args.confidence, args.workers)
+        write_results(interval_rows, args.intervals_output, INTERVAL_COLUMNS)
+        write_results(difference_rows, args.differences_output, DIFFERENCE_COLUMNS)
+        print(f"Zapisano {len(interval_rows)} przedziałów do {args.intervals_output} i {len(difference_rows)} "
+              f"różnic do {args.differences_output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+
+from evaluation import interpolate_reference, segmented_groups_errors, summarize_groups_errors
+from geo import from_local_metres
+from grouping import arrange, group_index, group_slices
+from loader import (ORIGINAL, REFERENCE, SMOOTHED, align_reference_axes, load_file, original_array, reference_array,
+                    smoothed_array)
+from metrics import calculate_errors
+from smoothing import MA, smooth_track, write_smoothed
+from spatial_index import build_reference_index
+
+##
+# \file benchmark.py
+# \brief Pomiar czasu kolejnych etapów potoku main.py na syntetycznych śladach o rosnącej liczbie punktów.
+#
+# Dla każdego rozmiaru generowany jest syntetyczny przejazd (ślad oryginalny z szumem, ślad wygładzony z grupami
+# i łamana referencyjna) zapisywany we wszystkich trzech formatach tekstowych oraz jako nagranie XML, a następnie
+# mierzony jest czas etapów: wczytywania plików, interpolacji danych referencyjnych, grupowania, wyszukiwania błędów
+# grup, miar bez uwzględniania grup i rysowania wykresów. Wyniki zapisywane są w pliku JSON razem z wersją kodu,
+# dzięki czemu można porównywać kolejne wersje.
+#
+# Przykład: python benchmark.py --sizes 1000 10000 100000 --output benchmark.json
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+DEFAULT_NOISE = 3.0  # Odchylenie standardowe szumu położenia (w metrach)
+DEFAULT_GROUP_SIZE = 10  # Liczba punktów w grupie danych wygładzonych
+DEFAULT_REFERENCE_DENSITY = 0.05  # Liczba punktów referencyjnych na punkt śladu
+DEFAULT_PLOT_LIMIT = 10000  # Największy ślad, dla którego mierzony jest czas rysowania wykresów
+
+STEP_LENGTH = 1.5  # Odległość (w metrach) pomiędzy kolejnymi punktami przejazdu
+TIME_STEP = 1000  # Odstęp czasu (w milisekundach) pomiędzy kolejnymi punktami przejazdu
+START = (50.1296, 19.4336)  # Punkt początkowy przejazdu (szerokość, długość)
+
+STAGES = ('generate', 'parse_original', 'parse_original_xml', 'parse_smoothed', 'parse_reference', 'interpolation',
+          'grouping', 'group_errors', 'no_group_metrics', 'plotting')
+
+##
+# @brief Generuje syntetyczny przejazd.
+#
+# Trasa jest błądzeniem losowym kierunku o stałym kroku; ślad oryginalny to trasa z szumem gaussowskim, ślad
+# wygładzony powstaje metodą MA (smoothing.py) z grupami po group_size punktów, a łamana referencyjna to trasa
+# próbkowana co 1 / reference_density punktów.
+# @param num_points Liczba punktów śladu.
+# @param noise Odchylenie standardowe szumu położenia (w metrach).
+# @param group_size Liczba punktów w grupie danych wygładzonych.
+# @param reference_density Liczba punktów referencyjnych na punkt śladu.
+# @param seed Ziarno generatora liczb losowych.
+# @return Krotka (kolumny danych oryginalnych, kolumny danych wygładzonych, dane referencyjne (szerokość, długość)).
+def generate_drive(num_points, noise=DEFAULT_NOISE, group_size=DEFAULT_GROUP_SIZE,
+                   reference_density=DEFAULT_REFERENCE_DENSITY, seed=0):
+    rng = np.random.default_rng(seed)
+    heading = np.cumsum(rng.normal(0.0, 0.05, num_points))
+    route = np.cumsum(STEP_LENGTH * np.column_stack((np.sin(heading), np.cos(heading))), axis=0)
+    track = from_local_metres(route + rng.normal(0.0, noise, route.shape), START)
+
+    original = {
+        'index': np.arange(num_points, dtype=np.int64),
+        'lat': track[:, 0],
+        'lon': track[:, 1],
+        'altitude': 330.0 + np.cumsum(rng.normal(0.0, 0.1, num_points)),
+        'accuracy': np.abs(rng.normal(noise, 1.0, num_points)) + 1.0,
+        'sx': rng.normal(0.0, 1.0, num_points),
+        'sy': rng.normal(4.0, 1.0, num_points),
+        'sz': rng.normal(8.0, 1.0, num_points),
+        'time': 1720000000000 + np.arange(num_points, dtype=np.int64) * TIME_STEP,
+        'azimuth': np.degrees(heading) % 360.0,
+    }
+    smoothed = smooth_track(original, MA, group_size=group_size, max_jump=np.inf)
+
+    step = max(int(round(1.0 / reference_density)), 1)
+    reference_rows = np.unique(np.append(np.arange(0, num_points, step), num_points - 1))
+    reference = from_local_metres(route[reference_rows], START)
+    return original, smoothed, reference
+
+##
+# @brief Zapisuje dane oryginalne w formacie "Point N:Latitude:... Longitude:... ...".
+# @param columns Kolumny danych oryginalnych.
+# @param output_path Ścieżka pliku wynikowego.
+def write_original(columns, output_path):
+    with open(output_path, 'w', encoding='utf-8') as output_file:
+        for index, fields in enumerate(_original_fields(columns)):
+            output_file.write(f'Point {index}:{fields}\n')
+
+##
+# @brief Zapisuje dane oryginalne jako nagranie XML SharedPreferences (format waypoints.py).
+# @param columns Kolumny danych oryginalnych.
+# @param output_path Ścieżka pliku wynikowego.
+def write_waypoints_xml(columns, output_path):
+    with open(output_path, 'w', encoding='utf-8') as output_file:
+        output_file.write("<?xml version='1.0' encoding='utf-8' standalone='yes' ?>\n<map>\n"
+                          '    <string name="waypoints">[')
+        for index, fields in enumerate(_original_fields(columns)):
+            output_file.write(('&quot;' if index == 0 else ',&quot;') + fields + '&quot;')
+        output_file.write(']</string>\n</map>\n')
+
+##
+# @brief Zwraca pola "Klucz:wartość" kolejnych punktów danych oryginalnych.
+# @param columns Kolumny danych oryginalnych.
+# @return Generator napisów.
+def _original_fields(columns):
+    rows = zip(*(columns[name].tolist() for name in
+                 ('lat', 'lon', 'altitude', 'accuracy', 'sx', 'sy', 'sz', 'time', 'azimuth')))
+    for lat, lon, altitude, accuracy, sx, sy, sz, timestamp, azimuth in rows:
+        yield (f'Latitude:{lat:.7f} Longitude:{lon:.7f} Altitude:{altitude!r} Accuracy:{accuracy:.3f} SX:{sx!r} '
+               f'SY:{sy!r} SZ:{sz!r} Time:{timestamp} Azimuth:{azimuth:.6f}')
+
+##
+# @brief Zapisuje dane referencyjne w formacie "szerokość, długość,".
+# @param reference Tablica punktów (szerokość, długość).
+# @param output_path Ścieżka pliku wynikowego.
+def write_reference(reference, output_path):
+    with open(output_path, 'w', encoding='utf-8') as output_file:
+        for lat, lon in reference.tolist():
+            output_file.write(f'{lat:.7f}, {lon:.7f},\n')
+
+##
+# @brief Mierzy czas wykonania funkcji.
+# @param timings Słownik etap -> czas w sekundach, do którego dopisywany jest wynik.
+# @param stage Nazwa etapu.
+# @param function Funkcja bez argumentów.
+# @return Wynik funkcji.
+def timed(timings, stage, function):
+    start = time.perf_counter()
+    result = function()
+    timings[stage] = time.perf_counter() - start
+    return result
+
+##
+# @brief Mierzy czas etapów potoku dla jednego syntetycznego przejazdu.
+# @param num_points Liczba punktów śladu.
+# @param work_dir Katalog na wygenerowane pliki.
+# @param noise Odchylenie standardowe szumu położenia (w metrach).
+# @param group_size Liczba punktów w grupie.
+# @param reference_density Liczba punktów referencyjnych na punkt śladu.
+# @param plots Czy mierzyć czas rysowania wykresów.
+# @param seed Ziarno generatora liczb losowych.
+# @return Słownik etap -> czas w sekundach.
+def benchmark_size(num_points, work_dir, noise=DEFAULT_NOISE, group_size=DEFAULT_GROUP_SIZE,
+                   reference_density=DEFAULT_REFERENCE_DENSITY, plots=True, seed=0):
+    timings = {}
+    original, smoothed, reference = timed(
+        timings, 'generate', lambda: generate_drive(num_points, noise, group_size, reference_density, seed))
+    paths = {name: os.path.join(work_dir, f'{name}_{num_points}.{extension}') for name, extension in
+             (('original', 'txt'), ('original_xml', 'xml'), ('smoothed', 'txt'), ('reference', 'txt'))}
+    write_original(original, paths['original'])
+    write_waypoints_xml(original, paths['original_xml'])
+    write_smoothed(smoothed, paths['smoothed'])
+    write_reference(reference, paths['reference'])
+
+    _, original_columns = timed(timings, 'parse_original', lambda: load_file(paths['original'], ORIGINAL))
+    timed(timings, 'parse_original_xml', lambda: load_file(paths['original_xml'], ORIGINAL))
+    _, smoothed_columns = timed(timings, 'parse_smoothed', lambda: load_file(paths['smoothed'], SMOOTHED))
+    _, reference_columns = timed(timings, 'parse_reference', lambda: load_file(paths['reference'], REFERENCE))
+
+    original_data = original_array(original_columns)
+    smoothed_data = smoothed_array(smoothed_columns)
+    ref_data = align_reference_axes(reference_array(reference_columns), smoothed_data[:, 1:3])
+    interpolated = timed(timings, 'interpolation', lambda: interpolate_reference(ref_data, len(smoothed_data)))
+
+    def grouping():
+        smoothed_index = group_index(smoothed_data[:, 4])
+        return (smoothed_index, arrange(smoothed_data, smoothed_index)[:, 1:3],
+                arrange(original_data, smoothed_index)[:, 1:3])
+    smoothed_index, smoothed_coords, original_coords = timed(timings, 'grouping', grouping)
+
+    def group_errors():
+        ref_index = build_reference_index(interpolated)
+        return summarize_groups_errors(*segmented_groups_errors(
+            smoothed_coords, smoothed_index.offsets, original_coords, smoothed_index.offsets, interpolated, ref_index))
+    groups = timed(timings, 'group_errors', group_errors)
+    no_groups = timed(timings, 'no_group_metrics', lambda: calculate_errors(smoothed_data, original_data, interpolated))
+
+    if plots:
+        import plotting
+        plotting.use_headless()
+        evaluation = {
+            'interpolated_ref_data': interpolated,
+            'grouped_original_data': group_slices(original_data, smoothed_index),
+            'groups': groups,
+            'no_groups': no_groups,
+        }
+        timed(timings, 'plotting', lambda: plotting.plot_evaluation(
+            original_data, smoothed_data, evaluation, output_dir=work_dir, prefix=f'{num_points}_'))
+    return timings
+
+##
+# @brief Zwraca skrót wersji kodu (git), jeśli jest dostępny.
+# @return Skrót zatwierdzenia lub None.
+def code_version():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+##
+# @brief Wykonuje pomiary dla wszystkich rozmiarów.
+# @param sizes Liczby punktów śladów.
+# @param work_dir Katalog na wygenerowane pliki; jeśli None, używany jest katalog tymczasowy.
+# @param repeat Liczba powtórzeń każdego pomiaru (zapisywany jest najkrótszy czas).
+# @param plot_limit Największy ślad, dla którego mierzony jest czas rysowania wykresów.
+# @param params Parametry przekazywane do benchmark_size (noise, group_size, reference_density, seed).
+# @return Słownik wyników gotowy do zapisu w JSON.
+def run_benchmark(sizes=DEFAULT_SIZES, work_dir=None, repeat=1, plot_limit=DEFAULT_PLOT_LIMIT, **params):
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        work_dir = temp_dir if work_dir is None else work_dir
+        os.makedirs(work_dir, exist_ok=True)
+        # Przebieg rozgrzewający: wczytanie modułów (SciPy, matplotlib) nie wlicza się do pomiarów
+        benchmark_size(100, work_dir, plots=min(sizes) <= plot_limit, **params)
+        for num_points in sizes:
+            runs = [benchmark_size(num_points, work_dir, plots=num_points <= plot_limit, **params)
+                    for _ in range(repeat)]
+            timings = {stage: min(run[stage] for run in runs) for stage in STAGES if stage in runs[0]}
+            results.append({'points': num_points, 'stages': timings})
+            print(f"{num_points} punktów: " + ', '.join(f'{stage} {seconds:.3f} s' for stage, seconds in timings.items()),
+                  flush=True)
+    return {
+        'version': code_version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'params': dict(params, repeat=repeat),
+        'results': results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Pomiar czasu etapów potoku na syntetycznych śladach.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help='Liczby punktów śladów')
+    parser.add_argument('--noise', type=float, default=DEFAULT_NOISE, help='Szum położenia w metrach')
+    parser.add_argument('--group-size', type=int, default=DEFAULT_GROUP_SIZE, help='Liczba punktów w grupie')
+    parser.add_argument('--reference-density', type=float, default=DEFAULT_REFERENCE_DENSITY,
+                        help='Liczba punktów referencyjnych na punkt śladu')
+    parser.add_argument('--repeat', type=int, default=1, help='Liczba powtórzeń każdego pomiaru')
+    parser.add_argument('--plot-limit', type=int, default=DEFAULT_PLOT_LIMIT,
+                        help='Największy ślad, dla którego mierzony jest czas rysowania wykresów')
+    parser.add_argument('--seed', type=int, default=0, help='Ziarno generatora liczb losowych')
+    parser.add_argument('--work-dir', default=None, help='Katalog na wygenerowane pliki (domyślnie tymczasowy)')
+    parser.add_argument('--output', default='benchmark.json', help='Plik wynikowy JSON')
+    args = parser.parse_args()
+
+    report = run_benchmark(args.sizes, args.work_dir, args.repeat, args.plot_limit, noise=args.noise,
+                           group_size=args.group_size, reference_density=args.reference_density, seed=args.seed)
+    with open(args.output, 'w') as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"Zapisano wyniki do {args.output}")
+
+if __name__ == "__main__":
+    main()
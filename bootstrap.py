@@ -0,0 +1,187 @@
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+##
+# \file bootstrap.py
+# \brief Przedziały ufności bootstrap miar błędów i różnic pomiędzy metodami wygładzania.
+#
+# Wektory błędów punktów lub grup losowane są ze zwracaniem wsadowo: jeden fragment (chunk) to macierz indeksów
+# o kształcie (liczba losowań, liczba błędów), z której miary (średnia, MSE, RMSE, mediana) wszystkich losowań
+# wyznaczane są jedną operacją na tablicy. Liczba losowań we fragmencie dobierana jest tak, aby macierz nie
+# przekraczała chunk_elements elementów; fragmenty mogą być liczone w puli procesów. Każdy fragment ma własne
+# ziarno (SeedSequence.spawn), więc wynik nie zależy od liczby procesów.
+#
+# Wektory o tej samej długości losowane są tymi samymi indeksami (próba sparowana: i-ty błąd każdego wektora
+# dotyczy i-tego interpolowanego punktu referencyjnego lub i-tej grupy), więc przedział różnicy miar dwóch metod
+# uwzględnia korelację ich błędów. Wektory o różnych długościach losowane są niezależnie.
+
+## Miary wyznaczane w każdym losowaniu
+BOOTSTRAP_STATISTICS = ('mean', 'mse', 'rmse', 'median')
+
+DEFAULT_RESAMPLES = 2000
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_CHUNK_ELEMENTS = 2 ** 22  # Maksymalna liczba elementów macierzy losowań jednego fragmentu (32 MB float64)
+DEFAULT_SEED = 0
+
+## Wynik losowań: miary pełnych wektorów (k, miary), miary kolejnych losowań (losowania, k, miary) i długości wektorów
+Bootstrap = namedtuple('Bootstrap', ['estimates', 'samples', 'lengths'])
+
+## Przedział ufności miary
+Interval = namedtuple('Interval', ['estimate', 'low', 'high'])
+
+## Przedział ufności różnicy miar dwóch wektorów; paired określa, czy losowania były sparowane
+Difference = namedtuple('Difference', ['estimate', 'low', 'high', 'paired'])
+
+## Kolumny tabeli przedziałów ufności (batch.py --bootstrap)
+INTERVAL_COLUMNS = ('route', 'method', 'track', 'level', 'statistic', 'estimate', 'low', 'high')
+
+## Kolumny tabeli różnic pomiędzy metodami (batch.py --bootstrap)
+DIFFERENCE_COLUMNS = ('route', 'level', 'statistic', 'first_method', 'first_track', 'second_method', 'second_track',
+                      'difference', 'low', 'high', 'paired')
+
+##
+# @brief Wyznacza miary błędów wzdłuż ostatniej osi.
+# @param samples Tablica błędów o kształcie (..., n).
+# @return Tablica o kształcie (..., len(BOOTSTRAP_STATISTICS)).
+def statistics(samples):
+    mean = np.mean(samples, axis=-1)
+    mse = np.mean(samples ** 2, axis=-1)
+    return np.stack((mean, mse, np.sqrt(mse), np.median(samples, axis=-1)), axis=-1)
+
+##
+# @brief Wyznacza miary jednego fragmentu losowań (funkcja wykonywana w procesie puli).
+# @param job Krotka (lista wektorów błędów, liczba losowań, ziarno SeedSequence).
+# @return Tablica o kształcie (losowania, liczba wektorów, miary).
+def _chunk_statistics(job):
+    vectors, rows, seed = job
+    rng = np.random.default_rng(seed)
+    indices = {}
+    result = np.empty((rows, len(vectors), len(BOOTSTRAP_STATISTICS)))
+    for number, errors in enumerate(vectors):
+        # Wektory tej samej długości losowane są tymi samymi indeksami (próba sparowana)
+        if len(errors) not in indices:
+            indices[len(errors)] = rng.integers(0, len(errors), size=(rows, len(errors)))
+        result[:, number] = statistics(errors[indices[len(errors)]])
+    return result
+
+##
+# @brief Losuje ze zwracaniem wektory błędów i wyznacza miary wszystkich losowań.
+# @param vectors Lista wektorów błędów (np. punktów lub grup kolejnych metod).
+# @param resamples Liczba losowań.
+# @param seed Ziarno generatora.
+# @param chunk_elements Maksymalna liczba elementów macierzy losowań jednego fragmentu.
+# @param workers Liczba procesów; jeśli None lub 1, fragmenty liczone są w bieżącym procesie.
+# @return Obiekt Bootstrap.
+def bootstrap(vectors, resamples=DEFAULT_RESAMPLES, seed=DEFAULT_SEED, chunk_elements=DEFAULT_CHUNK_ELEMENTS,
+              workers=None):
+    vectors = [np.asarray(errors, dtype=np.float64).ravel() for errors in vectors]
+    if not vectors or any(len(errors) == 0 for errors in vectors):
+        raise ValueError('Bootstrap wymaga niepustych wektorów błędów')
+    if resamples < 1:
+        raise ValueError(f'Liczba losowań musi być dodatnia: {resamples}')
+    # Wektory tej samej długości dzielą macierz indeksów, więc liczy się suma długości różnych wektorów
+    rows = max(1, chunk_elements // sum({len(errors) for errors in vectors}))
+    sizes = [min(rows, resamples - start) for start in range(0, resamples, rows)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(vectors, size, chunk_seed) for size, chunk_seed in zip(sizes, seeds)]
+    if workers is None or workers == 1 or len(jobs) == 1:
+        chunks = [_chunk_statistics(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunks = list(executor.map(_chunk_statistics, jobs))
+    estimates = np.stack([statistics(errors) for errors in vectors])
+    return Bootstrap(estimates, np.concatenate(chunks), np.array([len(errors) for errors in vectors]))
+
+##
+# @brief Wyznacza granice percentylowego przedziału ufności.
+# @param samples Tablica miar kolejnych losowań (oś 0).
+# @param confidence Poziom ufności.
+# @return Krotka (dolne granice, górne granice).
+def _bounds(samples, confidence):
+    alpha = (1.0 - confidence) / 2.0
+    low, high = np.quantile(samples, (alpha, 1.0 - alpha), axis=0)
+    return low, high
+
+##
+# @brief Wyznacza przedziały ufności miar jednego wektora.
+# @param result Obiekt Bootstrap.
+# @param index Numer wektora.
+# @param confidence Poziom ufności.
+# @return Słownik miara -> Interval.
+def intervals(result, index, confidence=DEFAULT_CONFIDENCE):
+    low, high = _bounds(result.samples[:, index], confidence)
+    return {name: Interval(float(estimate), float(lo), float(hi))
+            for name, estimate, lo, hi in zip(BOOTSTRAP_STATISTICS, result.estimates[index], low, high)}
+
+##
+# @brief Wyznacza przedziały ufności różnic miar dwóch wektorów (pierwszy minus drugi).
+# @param result Obiekt Bootstrap.
+# @param first Numer pierwszego wektora.
+# @param second Numer drugiego wektora.
+# @param confidence Poziom ufności.
+# @return Słownik miara -> Difference; przedział niezawierający zera oznacza istotną różnicę.
+def difference(result, first, second, confidence=DEFAULT_CONFIDENCE):
+    low, high = _bounds(result.samples[:, first] - result.samples[:, second], confidence)
+    estimates = result.estimates[first] - result.estimates[second]
+    paired = bool(result.lengths[first] == result.lengths[second])
+    return {name: Difference(float(estimate), float(lo), float(hi), paired)
+            for name, estimate, lo, hi in zip(BOOTSTRAP_STATISTICS, estimates, low, high)}
+
+##
+# @brief Wyznacza przedziały ufności i różnice dla wszystkich metod jednej trasy.
+#
+# Osobno losowane są błędy punktów (poziom 'points') i błędy grup (poziom 'groups'). Różnice wyznaczane są dla
+# danych wygładzonych każdej pary metod oraz dla danych wygładzonych i oryginalnych każdej metody.
+# @param job Krotka (nazwa trasy, słownik metoda -> {ślad: (wektor błędów grup, wektor błędów punktów)}, liczba
+#            losowań, poziom ufności, ziarno, maksymalna liczba elementów fragmentu).
+# @return Krotka (wiersze INTERVAL_COLUMNS, wiersze DIFFERENCE_COLUMNS).
+def route_bootstrap(job):
+    route, errors, resamples, confidence, seed, chunk_elements = job
+    interval_rows, difference_rows = [], []
+    for level, position in (('groups', 0), ('points', 1)):
+        keys = [(method, track) for method in sorted(errors) for track in ('smoothed', 'original')
+                if errors[method].get(track) is not None and errors[method][track][position] is not None
+                and len(errors[method][track][position])]
+        if not keys:
+            continue
+        result = bootstrap([errors[method][track][position] for method, track in keys], resamples, seed,
+                           chunk_elements)
+        for number, (method, track) in enumerate(keys):
+            for statistic, interval in intervals(result, number, confidence).items():
+                interval_rows.append(dict(interval._asdict(), route=route, method=method, track=track, level=level,
+                                          statistic=statistic))
+        pairs = [(first, second) for first in range(len(keys)) for second in range(first + 1, len(keys))
+                 if keys[first][1] == keys[second][1] == 'smoothed' or keys[first][0] == keys[second][0]]
+        for first, second in pairs:
+            for statistic, value in difference(result, first, second, confidence).items():
+                difference_rows.append({
+                    'route': route, 'level': level, 'statistic': statistic,
+                    'first_method': keys[first][0], 'first_track': keys[first][1],
+                    'second_method': keys[second][0], 'second_track': keys[second][1],
+                    'difference': value.estimate, 'low': value.low, 'high': value.high, 'paired': value.paired,
+                })
+    return interval_rows, difference_rows
+
+##
+# @brief Wyznacza przedziały ufności i różnice dla wszystkich tras w puli procesów.
+# @param errors Słownik (trasa, metoda) -> {ślad: (wektor błędów grup, wektor błędów punktów)}.
+# @param resamples Liczba losowań.
+# @param confidence Poziom ufności.
+# @param workers Liczba procesów (None - liczba rdzeni).
+# @param seed Ziarno generatora (wspólne dla tras).
+# @param chunk_elements Maksymalna liczba elementów macierzy losowań jednego fragmentu.
+# @return Krotka (wiersze INTERVAL_COLUMNS, wiersze DIFFERENCE_COLUMNS) w kolejności tras.
+def batch_bootstrap(errors, resamples=DEFAULT_RESAMPLES, confidence=DEFAULT_CONFIDENCE, workers=None,
+                    seed=DEFAULT_SEED, chunk_elements=DEFAULT_CHUNK_ELEMENTS):
+    routes = {}
+    for (route, method), tracks in errors.items():
+        routes.setdefault(route, {})[method] = tracks
+    jobs = [(route, methods, resamples, confidence, seed, chunk_elements) for route, methods in routes.items()]
+    interval_rows, difference_rows = [], []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for route_intervals, route_differences in executor.map(route_bootstrap, jobs):
+            interval_rows.extend(route_intervals)
+            difference_rows.extend(route_differences)
+    return interval_rows, difference_rows
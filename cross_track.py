@@ -0,0 +1,62 @@
+from collections import namedtuple
+
+import numpy as np
+
+from geo import to_local_metres
+from spatial_index import DEFAULT_PIECE_LENGTH, build_segment_index, query_segments
+
+##
+# \file cross_track.py
+# \brief Błąd poprzeczny: odległość punktów śladu od łamanej referencyjnej.
+#
+# Każdy punkt śladu rzutowany jest na najbliższy odcinek łamanej referencyjnej (indeks odcinków z spatial_index.py),
+# w lokalnym układzie płaskim w metrach. Wynik nie zależy od liczby punktów ani tempa śladu, w przeciwieństwie do
+# parowania i-tego punktu śladu z i-tym punktem interpolowanych danych referencyjnych.
+
+## Indeks łamanej: indeks odcinków, punkt odniesienia układu płaskiego i odległość wzdłuż łamanej do początku
+# każdego odcinka (w metrach)
+PolylineIndex = namedtuple('PolylineIndex', ['segments', 'origin', 'offsets'])
+
+## Wynik rzutowania: odległość od łamanej (w metrach), numer odcinka i odległość wzdłuż łamanej (w metrach)
+CrossTrack = namedtuple('CrossTrack', ['distances', 'segments', 'along_track'])
+
+##
+# @brief Buduje indeks łamanej referencyjnej.
+# @param ref_data Tablica punktów łamanej (szerokość, długość); kolejne punkty wyznaczają odcinki.
+# @param piece_length Maksymalna długość fragmentu odcinka w indeksie (w metrach).
+# @param tolerance Tolerancja uproszczenia łamanej w metrach (Douglas-Peucker, simplify.py); mniej odcinków
+#        w indeksie kosztem błędów zawyżonych lub zaniżonych co najwyżej o tolerancję. Jeśli None, łamana
+#        nie jest upraszczana.
+# @return Obiekt PolylineIndex.
+def build_polyline_index(ref_data, piece_length=DEFAULT_PIECE_LENGTH, tolerance=None):
+    ref_data = np.asarray(ref_data, dtype=np.float64)[:, :2]
+    if len(ref_data) < 2:
+        raise ValueError('Łamana referencyjna musi mieć co najmniej dwa punkty')
+    origin = ref_data.mean(axis=0)
+    points = to_local_metres(ref_data, origin)
+    if tolerance is not None:
+        from simplify import douglas_peucker
+        points = points[douglas_peucker(points, tolerance)]
+    lengths = np.sqrt(np.sum(np.diff(points, axis=0) ** 2, axis=1))
+    offsets = np.concatenate(([0.0], np.cumsum(lengths)[:-1]))
+    return PolylineIndex(build_segment_index(points[:-1], points[1:], piece_length), origin, offsets)
+
+##
+# @brief Rzutuje punkty śladu na łamaną referencyjną.
+# @param index Indeks łamanej.
+# @param track Tablica punktów śladu (szerokość, długość).
+# @return Obiekt CrossTrack.
+def project_on_polyline(index, track):
+    track = np.asarray(track, dtype=np.float64)[:, :2]
+    distances, segments, fractions = query_segments(index.segments, to_local_metres(track, index.origin))
+    lengths = np.sqrt(np.sum((index.segments.ends - index.segments.starts)[segments] ** 2, axis=1))
+    return CrossTrack(distances, segments, index.offsets[segments] + fractions * lengths)
+
+##
+# @brief Oblicza błędy poprzeczne punktów śladu względem łamanej referencyjnej.
+# @param track Tablica punktów śladu (szerokość, długość).
+# @param ref_data Tablica punktów łamanej (szerokość, długość) lub gotowy PolylineIndex.
+# @return Wektor odległości w metrach.
+def cross_track_errors(track, ref_data):
+    index = ref_data if isinstance(ref_data, PolylineIndex) else build_polyline_index(ref_data)
+    return project_on_polyline(index, track).distances
@@ -0,0 +1,357 @@
+import argparse
+import glob
+import os
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+##
+# \file density.py
+# \brief Trwała, przyrostowa siatka gęstości punktów (i błędów) wielu śladów dla map gęstości.
+#
+# Punkty przypisywane są do stałych komórek geograficznych o boku cell_size stopni, liczonych od (0, 0), więc siatki
+# z różnych przebiegów i procesów są ze sobą zgodne i łączą się przez zsumowanie liczników. Siatka jest rzadka:
+# przechowywane są tylko niepuste komórki jako posortowany wektor kluczy int64 i wektor liczników uint32 (oraz
+# opcjonalnie sumy błędów float64 do map średniego błędu). Zapisuje się ją do jednego pliku .npz razem z listą
+# identyfikatorów dodanych śladów (ścieżka, czas modyfikacji, rozmiar), dzięki czemu ponowne dodanie niezmienionego
+# pliku jest pomijane bez jego wczytywania. Mapy gęstości rysowane są z gotowych liczników, bez ponownego
+# kubełkowania punktów, jako obrazy tylko zajętych kafelków siatki (z ograniczoną łączną liczbą pikseli).
+#
+# Przykład: python density.py add gestosc.npz TRASA_* --track smoothed --errors --workers 4
+#           python density.py render gestosc.npz --output gestosc.png --values errors
+
+DEFAULT_CELL_SIZE = 0.0001  # bok komórki w stopniach (ok. 11 m szerokości geograficznej)
+DEFAULT_TILE_SIZE = 128  # bok kafelka mapy gęstości w komórkach
+DEFAULT_MAX_PIXELS = 2 ** 22  # maksymalna liczba pikseli rysowanej mapy gęstości (32 MB float64)
+
+# Klucz komórki: (wiersz + _KEY_OFFSET) * _KEY_SPAN + (kolumna + _KEY_OFFSET)
+_KEY_OFFSET = 2 ** 30
+_KEY_SPAN = 2 ** 31
+
+## Siatka gęstości: bok komórki, posortowane klucze niepustych komórek, liczniki punktów, sumy błędów (lub None)
+# i identyfikatory dodanych śladów
+DensityGrid = namedtuple('DensityGrid', ['cell_size', 'keys', 'counts', 'error_sums', 'sources'])
+
+##
+# @brief Tworzy pustą siatkę gęstości.
+# @param cell_size Bok komórki w stopniach.
+# @param errors Czy siatka przechowuje sumy błędów.
+# @return Obiekt DensityGrid.
+def empty_grid(cell_size=DEFAULT_CELL_SIZE, errors=False):
+    return DensityGrid(float(cell_size), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint32),
+                       np.empty(0, dtype=np.float64) if errors else None, ())
+
+##
+# @brief Wyznacza klucze komórek dla punktów.
+# @param points Tablica punktów (szerokość, długość).
+# @param cell_size Bok komórki w stopniach.
+# @return Wektor kluczy int64.
+def cell_keys(points, cell_size):
+    points = np.asarray(points, dtype=np.float64)[:, :2]
+    cells = np.floor(points / cell_size).astype(np.int64) + _KEY_OFFSET
+    return cells[:, 0] * _KEY_SPAN + cells[:, 1]
+
+##
+# @brief Zamienia klucze komórek na numery wierszy i kolumn.
+# @param keys Wektor kluczy.
+# @return Krotka (wiersze - szerokość, kolumny - długość).
+def key_cells(keys):
+    return keys // _KEY_SPAN - _KEY_OFFSET, keys % _KEY_SPAN - _KEY_OFFSET
+
+##
+# @brief Sumuje liczniki (i sumy błędów) o tych samych kluczach.
+# @param cell_size Bok komórki.
+# @param keys Wektor kluczy (z powtórzeniami).
+# @param counts Wektor liczników.
+# @param error_sums Wektor sum błędów lub None.
+# @param sources Identyfikatory śladów.
+# @return Obiekt DensityGrid.
+def _reduce(cell_size, keys, counts, error_sums, sources):
+    keys, inverse = np.unique(keys, return_inverse=True)
+    inverse = inverse.ravel()
+    counts = np.bincount(inverse, weights=counts, minlength=len(keys))
+    if error_sums is not None:
+        error_sums = np.bincount(inverse, weights=error_sums, minlength=len(keys))
+    return DensityGrid(cell_size, keys, np.round(counts).astype(np.uint32), error_sums, tuple(sources))
+
+##
+# @brief Dodaje punkty śladu do siatki.
+# @param grid Siatka gęstości.
+# @param points Tablica punktów (szerokość, długość).
+# @param errors Błędy kolejnych punktów (wymagane, jeśli siatka przechowuje sumy błędów).
+# @param source Identyfikator śladu; ślad o identyfikatorze obecnym już w siatce jest pomijany.
+# @return Nowa siatka gęstości.
+def add_points(grid, points, errors=None, source=None):
+    if source is not None and source in grid.sources:
+        return grid
+    if grid.error_sums is not None and errors is None:
+        raise ValueError('Siatka przechowuje sumy błędów - podaj błędy punktów')
+    points = np.asarray(points, dtype=np.float64)[:, :2]
+    keys = np.concatenate((grid.keys, cell_keys(points, grid.cell_size)))
+    counts = np.concatenate((grid.counts, np.ones(len(points))))
+    error_sums = None
+    if grid.error_sums is not None:
+        errors = np.asarray(errors, dtype=np.float64)
+        if len(errors) != len(points):
+            raise ValueError(f'Liczba błędów ({len(errors)}) różni się od liczby punktów ({len(points)})')
+        error_sums = np.concatenate((grid.error_sums, errors))
+    sources = grid.sources + ((source,) if source is not None else ())
+    return _reduce(grid.cell_size, keys, counts, error_sums, sources)
+
+##
+# @brief Łączy siatki (np. zbudowane w różnych procesach).
+#
+# Ślady obecne w więcej niż jednej siatce liczone są wielokrotnie - siatki łączone powinny pochodzić z rozłącznych
+# zbiorów śladów.
+# @param grids Siatki o tym samym boku komórki.
+# @return Połączona siatka gęstości.
+def merge_grids(*grids):
+    if not grids:
+        raise ValueError('Brak siatek do połączenia')
+    cell_size = grids[0].cell_size
+    if any(grid.cell_size != cell_size for grid in grids):
+        raise ValueError('Siatki mają różne rozmiary komórek')
+    with_errors = all(grid.error_sums is not None for grid in grids)
+    return _reduce(cell_size,
+                   np.concatenate([grid.keys for grid in grids]),
+                   np.concatenate([grid.counts for grid in grids]).astype(np.float64),
+                   np.concatenate([grid.error_sums for grid in grids]) if with_errors else None,
+                   [source for grid in grids for source in grid.sources])
+
+##
+# @brief Zwraca identyfikator pliku śladu (zmienia się po modyfikacji pliku).
+# @param file_path Ścieżka do pliku.
+# @param track Rodzaj punktów ('original' lub 'smoothed').
+# @return Napis identyfikatora.
+def file_source(file_path, track):
+    stat = os.stat(file_path)
+    return f'{os.path.abspath(file_path)}|{stat.st_mtime_ns}|{stat.st_size}|{track}'
+
+##
+# @brief Zapisuje siatkę do pliku .npz (atomowo).
+# @param grid Siatka gęstości.
+# @param grid_path Ścieżka do pliku.
+def save_grid(grid, grid_path):
+    arrays = {'cell_size': np.float64(grid.cell_size), 'keys': grid.keys, 'counts': grid.counts,
+              'sources': np.array(grid.sources, dtype=str)}
+    if grid.error_sums is not None:
+        arrays['error_sums'] = grid.error_sums
+    directory = os.path.dirname(os.path.abspath(grid_path))
+    file_descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.npz')
+    try:
+        with os.fdopen(file_descriptor, 'wb') as grid_file:
+            np.savez(grid_file, **arrays)
+        os.replace(temp_path, grid_path)
+    except OSError:
+        os.remove(temp_path)
+        raise
+
+##
+# @brief Wczytuje siatkę z pliku .npz.
+# @param grid_path Ścieżka do pliku.
+# @return Obiekt DensityGrid.
+def load_grid(grid_path):
+    with np.load(grid_path) as arrays:
+        return DensityGrid(float(arrays['cell_size']), arrays['keys'], arrays['counts'],
+                           arrays['error_sums'] if 'error_sums' in arrays else None,
+                           tuple(str(source) for source in arrays['sources']))
+
+##
+# @brief Wczytuje siatkę z pliku lub tworzy pustą, jeśli plik nie istnieje.
+# @param grid_path Ścieżka do pliku.
+# @param cell_size Bok komórki nowej siatki.
+# @param errors Czy nowa siatka przechowuje sumy błędów.
+# @return Obiekt DensityGrid.
+def open_grid(grid_path, cell_size=DEFAULT_CELL_SIZE, errors=False):
+    if os.path.exists(grid_path):
+        return load_grid(grid_path)
+    return empty_grid(cell_size, errors)
+
+##
+# @brief Łączy komórki siatki w większe (bok komórki razy factor), sumując liczniki i sumy błędów.
+# @param grid Siatka gęstości.
+# @param factor Liczba łączonych komórek wzdłuż każdej osi.
+# @return Nowa siatka gęstości.
+def coarsen_grid(grid, factor):
+    if factor == 1:
+        return grid
+    rows, cols = key_cells(grid.keys)
+    keys = (rows // factor + _KEY_OFFSET) * _KEY_SPAN + (cols // factor + _KEY_OFFSET)
+    return _reduce(grid.cell_size * factor, keys, grid.counts.astype(np.float64), grid.error_sums, grid.sources)
+
+##
+# @brief Zamienia siatkę na gęste obrazy tylko zajętych kafelków (tile_size x tile_size komórek).
+#
+# Pamięć zależy od liczby zajętych kafelków, a nie od prostokąta obejmującego wszystkie komórki (odległe obszary nie
+# wypełniają obrazu pustymi komórkami). Jeśli zajęte kafelki przekraczają max_pixels pikseli, komórki łączone są
+# (coarsen_grid) po dwie wzdłuż każdej osi aż do zmieszczenia się w budżecie.
+# @param grid Siatka gęstości.
+# @param values 'counts' (liczba punktów) lub 'errors' (średni błąd w komórce).
+# @param tile_size Bok kafelka w komórkach.
+# @param max_pixels Maksymalna łączna liczba pikseli obrazów kafelków.
+# @return Krotka (lista par (obraz o kształcie (kolumny długości, wiersze szerokości) z NaN w pustych komórkach,
+#         zakres [min szerokość, max szerokość, min długość, max długość]), najmniejsza wartość, największa wartość).
+def grid_tiles(grid, values='counts', tile_size=DEFAULT_TILE_SIZE, max_pixels=DEFAULT_MAX_PIXELS):
+    if not len(grid.keys):
+        raise ValueError('Siatka jest pusta')
+    if values == 'errors' and grid.error_sums is None:
+        raise ValueError('Siatka nie przechowuje błędów')
+    tile_size = max(1, min(tile_size, int(np.sqrt(max_pixels))))
+    while True:
+        rows, cols = key_cells(grid.keys)
+        tile_rows, tile_cols = rows // tile_size, cols // tile_size
+        tiles, inverse = np.unique(np.column_stack((tile_rows, tile_cols)), axis=0, return_inverse=True)
+        if len(tiles) * tile_size ** 2 <= max_pixels:
+            break
+        grid = coarsen_grid(grid, 2)
+    if values == 'errors':
+        cell_values = grid.error_sums / grid.counts
+    else:
+        cell_values = grid.counts.astype(np.float64)
+
+    inverse = inverse.ravel()
+    order = np.argsort(inverse, kind='stable')
+    bounds = np.searchsorted(inverse[order], np.arange(len(tiles) + 1))
+    images = []
+    for number, (tile_row, tile_col) in enumerate(tiles):
+        cells = order[bounds[number]:bounds[number + 1]]
+        image = np.full((tile_size, tile_size), np.nan)
+        image[cols[cells] - tile_col * tile_size, rows[cells] - tile_row * tile_size] = cell_values[cells]
+        extent = [tile_row * tile_size * grid.cell_size, (tile_row + 1) * tile_size * grid.cell_size,
+                  tile_col * tile_size * grid.cell_size, (tile_col + 1) * tile_size * grid.cell_size]
+        images.append((image, extent))
+    return images, float(cell_values.min()), float(cell_values.max())
+
+##
+# @brief Rysuje mapę gęstości z siatki (szerokość na osi X, jak w plotting.plot_errors).
+#
+# Każdy zajęty kafelek rysowany jest osobnym obrazem o wspólnej normalizacji kolorów.
+# @param ax Oś wykresu.
+# @param grid Siatka gęstości.
+# @param values 'counts' lub 'errors'.
+# @param cmap Mapa kolorów.
+# @param max_pixels Maksymalna łączna liczba pikseli obrazów kafelków (zob. grid_tiles).
+# @return Obraz pierwszego kafelka (do fig.colorbar; wszystkie kafelki mają tę samą skalę).
+def draw_grid(ax, grid, values='counts', cmap='inferno', max_pixels=DEFAULT_MAX_PIXELS):
+    from matplotlib.colors import Normalize
+    tiles, low, high = grid_tiles(grid, values, max_pixels=max_pixels)
+    norm = Normalize(low, high)
+    images = [ax.imshow(image, origin='lower', extent=extent, cmap=cmap, norm=norm, aspect='auto',
+                        interpolation='nearest') for image, extent in tiles]
+    ax.autoscale()
+    return images[0]
+
+##
+# @brief Tworzy siatkę z jednego pliku śladu (funkcja wykonywana w procesie roboczym).
+# @param job Krotka (słownik trasy z batch.discover_routes, metoda wygładzania, rodzaj punktów, bok komórki,
+#            czy zbierać błędy punktów).
+# @return Siatka gęstości tego pliku.
+def track_grid(job):
+    route, method, track, cell_size, errors = job
+    from batch import load_route
+    from loader import SMOOTHED, load_file, smoothed_array
+    route_data = load_route(route)
+    smoothed_data = smoothed_array(load_file(route['methods'][method], SMOOTHED)[1])
+    data = route_data['original_data'] if track == 'original' else smoothed_data
+    file_path = route['original'] if track == 'original' else route['methods'][method]
+    source = file_source(file_path, track)
+    if not errors:
+        return add_points(empty_grid(cell_size), data[:, 1:3], source=source)
+
+    from evaluation import evaluate_track
+    evaluation = evaluate_track(route_data['original_data'], smoothed_data, route_data['ref_data'])
+    point_errors = evaluation['no_groups'][track].errors
+    return add_points(empty_grid(cell_size, errors=True), data[:len(point_errors), 1:3], point_errors, source)
+
+##
+# @brief Dodaje do siatki ślady wszystkich tras (pomijając pliki już dodane) w puli procesów.
+#
+# Dla danych oryginalnych dodawany jest jeden plik trasy; jego błędy liczone są względem pierwszej metody
+# wygładzania w kolejności alfabetycznej (błędy bez grup nie zależą od metody).
+# @param grid Siatka gęstości.
+# @param routes Lista tras zwrócona przez batch.discover_routes.
+# @param track Rodzaj punktów: 'original' lub 'smoothed' (wszystkie metody wygładzania).
+# @param workers Liczba procesów (None - liczba rdzeni).
+# Plik, którego nie udało się wczytać lub ocenić, jest pomijany z komunikatem; pozostałe pliki są dodawane.
+# @return Krotka (nowa siatka, liczba dodanych plików).
+def add_routes(grid, routes, track='smoothed', workers=None):
+    jobs = []
+    for route in routes:
+        methods = sorted(route['methods'])
+        for method in (methods[:1] if track == 'original' else methods):
+            file_path = route['original'] if track == 'original' else route['methods'][method]
+            try:
+                source = file_source(file_path, track)
+            except OSError as error:
+                print(f"Pominięto {route['route']} / {method if track == 'smoothed' else 'original'}: {error}")
+                continue
+            if source not in grid.sources:
+                jobs.append((route, method, track, grid.cell_size, grid.error_sums is not None))
+    if not jobs:
+        return grid, 0
+    partial = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(track_grid, job) for job in jobs]
+        for (route, method, _, _, _), future in zip(jobs, futures):
+            try:
+                partial.append(future.result())
+            except Exception as error:
+                print(f"Pominięto {route['route']} / {method if track == 'smoothed' else 'original'}: {error}")
+    return merge_grids(grid, *partial), len(partial)
+
+def main():
+    parser = argparse.ArgumentParser(description='Trwała siatka gęstości punktów i błędów wielu śladów.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    add = commands.add_parser('add', help='Dodaje ślady tras do siatki')
+    add.add_argument('grid', help='Plik siatki (.npz); tworzony, jeśli nie istnieje')
+    add.add_argument('roots', nargs='*', help='Katalogi tras (domyślnie TRASA_*)')
+    add.add_argument('--track', default='smoothed', choices=('smoothed', 'original'), help='Rodzaj punktów')
+    add.add_argument('--errors', action='store_true', help='Zbiera też błędy punktów (tylko nowa siatka)')
+    add.add_argument('--cell-size', type=float, default=DEFAULT_CELL_SIZE, help='Bok komórki nowej siatki w stopniach')
+    add.add_argument('--workers', type=int, default=None, help='Liczba procesów')
+
+    merge = commands.add_parser('merge', help='Łączy siatki')
+    merge.add_argument('grid', help='Plik wynikowy')
+    merge.add_argument('inputs', nargs='+', help='Pliki łączonych siatek')
+
+    render = commands.add_parser('render', help='Rysuje mapę gęstości z siatki')
+    render.add_argument('grid', help='Plik siatki')
+    render.add_argument('--values', default='counts', choices=('counts', 'errors'))
+    render.add_argument('--output', default=None, help='Plik obrazu; jeśli nie podano, wykres jest wyświetlany')
+    args = parser.parse_args()
+
+    if args.command == 'add':
+        from batch import discover_routes
+        grid = open_grid(args.grid, args.cell_size, args.errors)
+        routes = discover_routes(args.roots or sorted(glob.glob('TRASA_*')))
+        grid, added = add_routes(grid, routes, args.track, args.workers)
+        save_grid(grid, args.grid)
+        print(f"Dodano {added} plików; siatka: {len(grid.keys)} komórek, {int(grid.counts.sum())} punktów, "
+              f"{len(grid.sources)} śladów")
+    elif args.command == 'merge':
+        grid = merge_grids(*(load_grid(path) for path in args.inputs))
+        save_grid(grid, args.grid)
+        print(f"Siatka: {len(grid.keys)} komórek, {int(grid.counts.sum())} punktów, {len(grid.sources)} śladów")
+    else:
+        from plotting import finish_figure, use_headless
+        if args.output is not None:
+            use_headless()
+        import matplotlib.pyplot as plt
+        grid = load_grid(args.grid)
+        fig, ax = plt.subplots(figsize=(10, 10))
+        image = draw_grid(ax, grid, args.values)
+        ax.set_xlabel('Latitude')
+        ax.set_ylabel('Longitude')
+        fig.colorbar(image, ax=ax, label='Frequency' if args.values == 'counts' else 'Mean error')
+        if args.output is None:
+            finish_figure(fig, 'density')
+        else:
+            name, extension = os.path.splitext(args.output)
+            finish_figure(fig, os.path.basename(name), os.path.dirname(args.output) or '.',
+                          (extension.lstrip('.') or 'png',))
+
+if __name__ == "__main__":
+    main()
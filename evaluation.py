@@ -0,0 +1,185 @@
+import math
+
+import numpy as np
+
+from geo import euclidean_distances
+from grouping import arrange, group_index, group_slices, segment_argmin, segment_ids
+from instrumentation import count, instrumented, stage
+from interpolation import LINEAR, resample_reference
+from metrics import CROSS_TRACK, calculate_errors
+from spatial_index import build_reference_index, query_closest
+
+##
+# \file evaluation.py
+# \brief Funkcje obliczające błędy danych wygładzonych i oryginalnych względem danych referencyjnych.
+#
+# Moduł zawiera grupowanie danych, wyszukiwanie reprezentatywnych punktów grup oraz funkcję oceniającą pojedynczy
+# zestaw danych (oryginalne, wygładzone, referencyjne), wykorzystywane przez main.py i tryb wsadowy batch.py.
+
+##
+# @brief Oblicza odległość euklidesową pomiędzy dwoma punktami.
+# @param p1 Pierwszy punkt w formacie (x, y).
+# @param p2 Drugi punkt w formacie (x, y).
+# @return Odległość euklidesowa pomiędzy p1 a p2.
+def euclidean_distance(p1, p2):
+    return np.sqrt((p2[0] - p1[0]) ** 2 + (p2[1] - p1[1]) ** 2)
+
+##
+# @brief Interpoluje dane referencyjne, aby uzyskać określoną liczbę punktów.
+# @param data Lista punktów referencyjnych w formacie (szerokość, długość).
+# @param num_points Liczba punktów do uzyskania po interpolacji.
+# @param kind Rodzaj interpolacji: 'linear' lub 'cubic'.
+# @param cache_dir Katalog binarnej pamięci podręcznej (track_cache.py); jeśli None, wynik nie jest zapamiętywany.
+# @return Tablica interpolowanych punktów w formacie (szerokość, długość).
+@instrumented('interpolate')
+def interpolate_reference(data, num_points, kind=LINEAR, cache_dir=None):
+    count(num_points)
+    if cache_dir is None:
+        return resample_reference(data, num_points, kind)
+    from track_cache import cached_array
+    return cached_array('interpolated_reference', data, (num_points, kind),
+                        lambda: resample_reference(data, num_points, kind), cache_dir)
+
+##
+# @brief Grupuje dane wygładzone według grup.
+# @param data Dane wygładzone w formacie (indeks, szerokość, długość, MAE, grupa, czas).
+# @return Słownik, gdzie kluczem jest numer grupy, a wartością tablica (wycinek danych) punktów tej grupy.
+def group_data(data):
+    data = np.asarray(data)
+    return group_slices(data, group_index(data[:, 4]))
+
+##
+# @brief Grupuje dane oryginalne na podstawie grup z danych wygładzonych.
+# @param original_data Dane oryginalne w formacie (indeks, szerokość, długość).
+# @param smoothed_data Dane wygładzone w formacie (indeks, szerokość, długość, MAE, grupa, czas).
+# @return Słownik, gdzie kluczem jest numer grupy, a wartością tablica (wycinek danych) punktów oryginalnych tej grupy.
+def group_data_by_original(original_data, smoothed_data):
+    num_points = min(len(original_data), len(smoothed_data))
+    return group_slices(np.asarray(original_data)[:num_points],
+                        group_index(np.asarray(smoothed_data)[:num_points, 4]))
+
+##
+# @brief Oblicza błędy grup jako redukcje segmentowe po wszystkich grupach naraz.
+#
+# Reprezentatywnym punktem grupy wygładzonej jest jej punkt najbliższy danym referencyjnym, a punktem grupy oryginalnej
+# jej punkt najbliższy punktowi reprezentatywnemu. Przy remisie wybierany jest pierwszy punkt grupy.
+# @param smoothed_coords Współrzędne (x, y) danych wygładzonych uporządkowane według grup.
+# @param smoothed_offsets Granice grup w smoothed_coords.
+# @param original_coords Współrzędne (x, y) danych oryginalnych uporządkowane według tych samych grup.
+# @param original_offsets Granice grup w original_coords.
+# @param ref_data Dane referencyjne.
+# @param ref_index Indeks przestrzenny danych referencyjnych.
+# @return Krotka (błędy grup wygładzonych, błędy grup oryginalnych).
+def segmented_groups_errors(smoothed_coords, smoothed_offsets, original_coords, original_offsets, ref_data, ref_index):
+    if len(original_offsets) != len(smoothed_offsets) or np.any(np.diff(original_offsets) == 0):
+        raise ValueError('Dane oryginalne nie zawierają punktów dla wszystkich grup danych wygładzonych')
+    ref_distances, ref_indices = query_closest(ref_index, ref_data, smoothed_coords)
+    rep_positions = segment_argmin(ref_distances, smoothed_offsets)
+    rep_points = smoothed_coords[rep_positions]
+    closest_ref_points = ref_data[ref_indices[rep_positions]]
+
+    distances_to_rep = euclidean_distances(rep_points[segment_ids(original_offsets)], original_coords)
+    closest_points_original = original_coords[segment_argmin(distances_to_rep, original_offsets)]
+
+    errors_smoothed = euclidean_distances(rep_points, closest_ref_points)
+    errors_original = euclidean_distances(closest_points_original, closest_ref_points)
+    return errors_smoothed, errors_original
+
+##
+# @brief Wyznacza zbiorcze miary z błędów grup.
+# @param errors_smoothed Błędy grup wygładzonych.
+# @param errors_original Błędy grup oryginalnych.
+# @return Krotka w formacie zwracanym przez calculate_groups_errors.
+def summarize_groups_errors(errors_smoothed, errors_original):
+    mean_error_smoothed = np.mean(errors_smoothed)
+    mean_error_original = np.mean(errors_original)
+
+    mse_smoothed = np.mean(errors_smoothed ** 2)
+    mse_original = np.mean(errors_original ** 2)
+
+    mae_smoothed = np.mean(np.abs(errors_smoothed))
+    mae_original = np.mean(np.abs(errors_original))
+
+    rmse_smoothed = math.sqrt(mse_smoothed)
+    rmse_original = math.sqrt(mse_original)
+
+    median_error_smoothed = np.median(errors_smoothed)
+    median_error_original = np.median(errors_original)
+
+    return mean_error_smoothed, mean_error_original, mse_smoothed, mse_original, mae_smoothed, mae_original, rmse_smoothed, rmse_original, median_error_smoothed, median_error_original, errors_smoothed
+
+##
+# @brief Oblicza błędy dla grup danych wygładzonych i oryginalnych w odniesieniu do danych referencyjnych.
+# @param grouped_smoothed_data Zgrupowane dane wygładzone.
+# @param grouped_original_data Zgrupowane dane oryginalne.
+# @param ref_data Dane referencyjne.
+# @param ref_index Indeks przestrzenny danych referencyjnych; jeśli None, budowany jest na potrzeby wywołania.
+# @return Krotka zawierająca średnie błędy, MSE, MAE, RMSE i mediany błędów dla danych wygładzonych i oryginalnych.
+def calculate_groups_errors(grouped_smoothed_data, grouped_original_data, ref_data, ref_index=None):
+    ref_data = np.asarray(ref_data)
+    if ref_index is None:
+        ref_index = build_reference_index(ref_data)
+    groups = list(grouped_smoothed_data)
+    smoothed_groups = [np.asarray(grouped_smoothed_data[group])[:, 1:3] for group in groups]
+    original_groups = [np.asarray(grouped_original_data[group])[:, 1:3] for group in groups]
+    errors = segmented_groups_errors(
+        np.concatenate(smoothed_groups), np.cumsum([0] + [len(points) for points in smoothed_groups]),
+        np.concatenate(original_groups), np.cumsum([0] + [len(points) for points in original_groups]),
+        ref_data, ref_index)
+    return summarize_groups_errors(*errors)
+
+##
+# @brief Znajduje najbliższy punkt do zadanego punktu docelowego wśród punktów referencyjnych.
+# @param target_point Punkt docelowy (x, y).
+# @param reference_points Lista punktów referencyjnych (x, y).
+# @return Najbliższy punkt referencyjny do target_point.
+def find_closest_point(target_point, reference_points):
+    reference_points = np.asarray(reference_points)
+    distances = euclidean_distance(target_point, reference_points[:, :2].T)
+    return reference_points[np.argmin(distances)]
+
+##
+# @brief Oblicza wszystkie błędy dla jednego zestawu danych oryginalnych, wygładzonych i referencyjnych.
+# @param original_data Dane oryginalne w formacie (indeks, szerokość, długość).
+# @param smoothed_data Dane wygładzone w formacie (indeks, szerokość, długość, MAE, grupa, czas).
+# @param ref_data Dane referencyjne (szerokość, długość) przed interpolacją.
+# @param metric Metryka błędów bez uwzględniania grup ('euclidean', 'haversine', 'equirectangular' lub 'cross_track';
+#               błąd poprzeczny liczony jest względem łamanej ref_data przed interpolacją).
+# @param interpolated_ref_data Gotowe interpolowane dane referencyjne; jeśli None, są wyznaczane z ref_data.
+# @param ref_index Indeks przestrzenny interpolowanych danych referencyjnych; jeśli None, jest budowany.
+# @param cache_dir Katalog pamięci podręcznej dla interpolowanych danych referencyjnych (opcjonalnie).
+# @return Słownik z kluczami 'interpolated_ref_data', 'grouped_smoothed_data', 'grouped_original_data',
+#         'groups' (krotka zwracana przez calculate_groups_errors), 'group_errors' (krotka wektorów błędów grup
+#         wygładzonych i oryginalnych) i 'no_groups' (wynik calculate_errors).
+def evaluate_track(original_data, smoothed_data, ref_data, metric='euclidean', interpolated_ref_data=None,
+                   ref_index=None, cache_dir=None):
+    if interpolated_ref_data is None:
+        interpolated_ref_data = interpolate_reference(ref_data, len(smoothed_data), cache_dir=cache_dir)
+    interpolated_ref_data = np.asarray(interpolated_ref_data)
+    smoothed_data = np.asarray(smoothed_data)
+    num_points = min(len(original_data), len(smoothed_data))
+    original_data = np.asarray(original_data)
+    with stage('group', items=len(smoothed_data)):
+        smoothed_index = group_index(smoothed_data[:, 4])
+        original_index = group_index(smoothed_data[:num_points, 4])
+        smoothed_coords = arrange(smoothed_data, smoothed_index)[:, 1:3]
+        original_coords = arrange(original_data[:num_points], original_index)[:, 1:3]
+        grouped_smoothed_data = group_slices(smoothed_data, smoothed_index)
+        grouped_original_data = group_slices(original_data[:num_points], original_index)
+    with stage('group_errors', items=len(smoothed_index.labels)):
+        if ref_index is None:
+            ref_index = build_reference_index(interpolated_ref_data)
+        errors = segmented_groups_errors(smoothed_coords, smoothed_index.offsets, original_coords,
+                                         original_index.offsets, interpolated_ref_data, ref_index)
+    # Dane oryginalne przycinane są do liczby punktów użytej w grupach (interpolacja ma len(smoothed_data) punktów)
+    with stage('errors', items=len(smoothed_data) + num_points):
+        no_groups = calculate_errors(smoothed_data, original_data[:num_points],
+                                     ref_data if metric == CROSS_TRACK else interpolated_ref_data, metric=metric)
+    return {
+        'interpolated_ref_data': interpolated_ref_data,
+        'grouped_smoothed_data': grouped_smoothed_data,
+        'grouped_original_data': grouped_original_data,
+        'groups': summarize_groups_errors(*errors),
+        'group_errors': errors,
+        'no_groups': no_groups,
+    }
@@ -0,0 +1,84 @@
+import numpy as np
+
+##
+# \file geo.py
+# \brief Wektorowe funkcje odległości dla tablic współrzędnych.
+#
+# Wszystkie funkcje przyjmują tablice punktów o kształcie (N, 2) w formacie (szerokość, długość) i zwracają wektor
+# N odległości pomiędzy odpowiadającymi sobie punktami, liczony jedną operacją na całych tablicach.
+
+EARTH_RADIUS_M = 6371000.0  # Promień Ziemi w metrach
+
+##
+# @brief Oblicza odległości euklidesowe (w stopniach) pomiędzy odpowiadającymi sobie punktami.
+# @param points1 Tablica punktów (x, y).
+# @param points2 Tablica punktów (x, y) o tej samej długości lub pojedynczy punkt.
+# @return Wektor odległości.
+def euclidean_distances(points1, points2):
+    points1 = np.asarray(points1, dtype=np.float64)
+    points2 = np.asarray(points2, dtype=np.float64)
+    return np.sqrt((points2[..., 0] - points1[..., 0]) ** 2 + (points2[..., 1] - points1[..., 1]) ** 2)
+
+##
+# @brief Oblicza odległości Haversine (w metrach) pomiędzy odpowiadającymi sobie punktami.
+# @param points1 Tablica punktów (szerokość, długość).
+# @param points2 Tablica punktów (szerokość, długość) o tej samej długości lub pojedynczy punkt.
+# @return Wektor odległości w metrach.
+def haversine_distances(points1, points2):
+    points1 = np.radians(np.asarray(points1, dtype=np.float64))
+    points2 = np.radians(np.asarray(points2, dtype=np.float64))
+    dlat = points2[..., 0] - points1[..., 0]
+    dlon = points2[..., 1] - points1[..., 1]
+    a = np.sin(dlat / 2) ** 2 + np.cos(points1[..., 0]) * np.cos(points2[..., 0]) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+##
+# @brief Oblicza odległości w przybliżeniu równoodległościowym (w metrach) pomiędzy odpowiadającymi sobie punktami.
+#
+# Przybliżenie jest wystarczająco dokładne dla odległości rzędu kilometrów i tańsze od wzoru Haversine.
+# @param points1 Tablica punktów (szerokość, długość).
+# @param points2 Tablica punktów (szerokość, długość) o tej samej długości lub pojedynczy punkt.
+# @return Wektor odległości w metrach.
+def equirectangular_distances(points1, points2):
+    points1 = np.radians(np.asarray(points1, dtype=np.float64))
+    points2 = np.radians(np.asarray(points2, dtype=np.float64))
+    x = (points2[..., 1] - points1[..., 1]) * np.cos((points1[..., 0] + points2[..., 0]) / 2)
+    y = points2[..., 0] - points1[..., 0]
+    return EARTH_RADIUS_M * np.sqrt(x ** 2 + y ** 2)
+
+## Dostępne metryki odległości
+DISTANCE_FUNCTIONS = {
+    'euclidean': euclidean_distances,
+    'haversine': haversine_distances,
+    'equirectangular': equirectangular_distances,
+}
+
+##
+# @brief Zwraca funkcję odległości o podanej nazwie.
+# @param metric Nazwa metryki: 'euclidean' (stopnie), 'haversine' lub 'equirectangular' (metry).
+# @return Funkcja przyjmująca dwie tablice punktów.
+def distance_function(metric):
+    try:
+        return DISTANCE_FUNCTIONS[metric]
+    except KeyError:
+        raise ValueError(f'Nieznana metryka odległości: {metric}') from None
+
+##
+# @brief Rzutuje punkty na lokalną płaszczyznę w metrach (przybliżenie równoodległościowe wokół punktu odniesienia).
+# @param points Tablica punktów (szerokość, długość).
+# @param origin Punkt odniesienia (szerokość, długość).
+# @return Tablica punktów (x, y) w metrach; x rośnie na wschód, y na północ.
+def to_local_metres(points, origin):
+    points = np.radians(np.asarray(points, dtype=np.float64))
+    lat0, lon0 = np.radians(np.asarray(origin, dtype=np.float64))
+    return EARTH_RADIUS_M * np.stack(((points[..., 1] - lon0) * np.cos(lat0), points[..., 0] - lat0), axis=-1)
+
+##
+# @brief Przelicza punkty z lokalnej płaszczyzny (to_local_metres) z powrotem na współrzędne geograficzne.
+# @param points Tablica punktów (x, y) w metrach.
+# @param origin Punkt odniesienia (szerokość, długość).
+# @return Tablica punktów (szerokość, długość).
+def from_local_metres(points, origin):
+    points = np.asarray(points, dtype=np.float64) / EARTH_RADIUS_M
+    lat0, lon0 = np.radians(np.asarray(origin, dtype=np.float64))
+    return np.degrees(np.stack((points[..., 1] + lat0, points[..., 0] / np.cos(lat0) + lon0), axis=-1))
@@ -0,0 +1,71 @@
+from collections import namedtuple
+
+import numpy as np
+
+##
+# \file grouping.py
+# \brief Podział danych na grupy jako ciągłe wycinki tablic oraz redukcje segmentowe po wszystkich grupach.
+#
+# Grupa opisana jest przedziałem [offsets[i], offsets[i + 1]) w tablicy uporządkowanej według grup. Dane z plików są
+# zwykle już uporządkowane, więc permutacja nie jest potrzebna, a grupy są widokami (bez kopiowania wierszy) tablicy
+# wejściowej. Kolejność grup odpowiada kolejności ich pierwszego wystąpienia w danych.
+
+## Indeks grup: etykiety (w kolejności pierwszego wystąpienia), permutacja porządkująca dane (lub None, jeśli dane są
+# już uporządkowane) oraz granice grup w danych uporządkowanych (len(labels) + 1 wartości).
+GroupIndex = namedtuple('GroupIndex', ['labels', 'order', 'offsets'])
+
+##
+# @brief Buduje indeks grup dla kolumny z numerami grup.
+# @param groups Wektor numerów grup dla kolejnych punktów.
+# @return Obiekt GroupIndex.
+def group_index(groups):
+    groups = np.asarray(groups)
+    if len(groups) == 0:
+        return GroupIndex(groups[:0], None, np.zeros(1, dtype=np.intp))
+    labels, first, inverse, counts = np.unique(groups, return_index=True, return_inverse=True, return_counts=True)
+    appearance = np.argsort(first)
+    rank = np.empty_like(appearance)
+    rank[appearance] = np.arange(len(appearance))
+    point_rank = rank[inverse.ravel()]
+    order = None if np.all(np.diff(point_rank) >= 0) else np.argsort(point_rank, kind='stable')
+    offsets = np.concatenate(([0], np.cumsum(counts[appearance])))
+    return GroupIndex(labels[appearance], order, offsets)
+
+##
+# @brief Porządkuje dane według grup (bez kopiowania, jeśli dane są już uporządkowane).
+# @param data Tablica danych (wiersze odpowiadają punktom).
+# @param index Indeks grup zbudowany dla tych danych.
+# @return Tablica uporządkowana według grup.
+def arrange(data, index):
+    data = np.asarray(data)
+    return data if index.order is None else data[index.order]
+
+##
+# @brief Zwraca słownik grup, w którym każda grupa jest wycinkiem uporządkowanej tablicy.
+# @param data Tablica danych.
+# @param index Indeks grup zbudowany dla tych danych.
+# @return Słownik numer grupy -> tablica punktów grupy.
+def group_slices(data, index):
+    arranged = arrange(data, index)
+    return {label: arranged[start:end]
+            for label, start, end in zip(index.labels, index.offsets[:-1], index.offsets[1:])}
+
+##
+# @brief Zwraca numer segmentu (kolejny numer grupy) dla każdego elementu danych uporządkowanych.
+# @param offsets Granice segmentów.
+# @return Wektor numerów segmentów.
+def segment_ids(offsets):
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+##
+# @brief Wyznacza położenie pierwszego minimum w każdym segmencie jedną operacją na całej tablicy.
+# @param values Wektor wartości uporządkowany według segmentów.
+# @param offsets Granice segmentów; segmenty nie mogą być puste.
+# @return Wektor indeksów (w values) pierwszego minimum każdego segmentu.
+def segment_argmin(values, offsets):
+    values = np.asarray(values)
+    minima = np.minimum.reduceat(values, offsets[:-1])
+    ids = segment_ids(offsets)
+    candidates = np.flatnonzero(values == minima[ids])
+    _, first = np.unique(ids[candidates], return_index=True)
+    return candidates[first]
@@ -0,0 +1,404 @@
+import argparse
+import asyncio
+import csv
+import functools
+import json
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from batch import RESULT_COLUMNS, result_rows
+from evaluation import evaluate_track
+from loader import (ORIGINAL, REFERENCE, align_reference_axes, load_file, original_array, reference_array,
+                    smoothed_array)
+from smoothing import KALMAN, METHODS, smooth_track
+
+##
+# \file ingest.py
+# \brief Usługa przyjmująca nagrania z wielu urządzeń jednocześnie (asyncio) i oceniająca je w puli procesów.
+#
+# Nagrania (XML z aplikacji lub pliki "Point N:Latitude:..." jak original.txt) przyjmowane są na dwa sposoby:
+# - z katalogu zrzutu: pliki pojawiające się w katalogu (lub w jego podkatalogach urządzeń) są przetwarzane, gdy ich
+#   rozmiar i czas modyfikacji przestaną się zmieniać, a następnie przenoszone do podkatalogu processed/ lub failed/;
+# - przez gniazdo lokalne (Unix lub TCP na 127.0.0.1): klient wysyła linię z nazwą nagrania (np. "telefon7/trasa.xml"),
+#   a po niej treść pliku i zamyka zapis; w odpowiedzi otrzymuje jedną linię JSON z wynikiem oceny.
+#
+# Każde nagranie jest wygładzane (smoothing.py), oceniane względem wspólnego pliku referencyjnego (evaluate_track),
+# a wiersze wyników dopisywane do tabeli CSV w formacie batch.py. Parsowanie i obliczenia wykonywane są w puli
+# procesów przez co najwyżej `workers` zadań naraz. Liczba przyjętych, a nieukończonych nagrań jest ograniczona
+# (workers + queue_size): po jej osiągnięciu katalog nie jest przeglądany, a połączenia nie są odczytywane, więc
+# producenci czekają (przeciwciśnienie), zamiast zapełniać pamięć.
+#
+# Przykład: python ingest.py serve --drop-dir zrzut --socket ingest.sock --reference referencyjneT4.txt --workers 4
+#           python ingest.py produce --socket ingest.sock --devices 8 originalT4.txt "Trasa 3.xml"
+
+DEFAULT_QUEUE_SIZE = 16  # Liczba nagrań oczekujących ponad liczbę procesów
+DEFAULT_POLL_INTERVAL = 1.0  # Odstęp (w sekundach) pomiędzy przeglądami katalogu zrzutu
+DEFAULT_OUTPUT_PATH = 'ingest_results.csv'
+CHUNK_SIZE = 1 << 16
+
+PROCESSED_DIR = 'processed'
+FAILED_DIR = 'failed'
+SPOOL_DIR = '.spool'
+RECORDING_EXTENSIONS = ('.txt', '.xml')
+
+##
+# @brief Wczytuje dane referencyjne (zapamiętywane w procesie roboczym do czasu zmiany pliku).
+# @param reference_path Ścieżka do pliku referencyjnego.
+# @param mtime_ns Czas modyfikacji pliku (część klucza).
+# @return Tablica punktów referencyjnych (szerokość, długość) przed wyrównaniem osi.
+@functools.lru_cache(maxsize=8)
+def _reference(reference_path, mtime_ns):
+    return reference_array(load_file(reference_path, REFERENCE)[1])
+
+##
+# @brief Ocenia jedno nagranie (funkcja wykonywana w procesie roboczym).
+# @param file_path Ścieżka do pliku nagrania.
+# @param name Nazwa nagrania w tabeli wyników (kolumna route).
+# @param reference_path Ścieżka do pliku referencyjnego.
+# @param method Metoda wygładzania.
+# @param metric Metryka błędów bez uwzględniania grup.
+# @return Lista wierszy tabeli wyników (batch.RESULT_COLUMNS).
+def evaluate_recording(file_path, name, reference_path, method=KALMAN, metric='euclidean'):
+    role, columns = load_file(file_path)
+    if role != ORIGINAL:
+        raise ValueError('Plik nie zawiera danych oryginalnych')
+    original_data = original_array(columns)
+    if len(original_data) == 0:
+        raise ValueError('Plik nie zawiera punktów')
+    smoothed_data = smoothed_array(smooth_track(columns, method))
+    ref_data = align_reference_axes(_reference(reference_path, os.stat(reference_path).st_mtime_ns),
+                                    original_data[:, 1:3])
+    evaluation = evaluate_track(original_data, smoothed_data, ref_data, metric=metric)
+    return result_rows(name, method, metric, evaluation, len(smoothed_data))
+
+##
+# @brief Dopisuje wiersze wyników do pliku CSV (nagłówek zapisywany dla nowego pliku).
+# @param rows Lista wierszy.
+# @param output_path Ścieżka pliku CSV.
+def append_results(rows, output_path):
+    new_file = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+    with open(output_path, 'a', newline='') as output_file:
+        writer = csv.DictWriter(output_file, fieldnames=RESULT_COLUMNS)
+        if new_file:
+            writer.writeheader()
+        writer.writerows(rows)
+
+##
+# @brief Zwraca bezpieczną nazwę nagrania (bez ścieżek bezwzględnych i odwołań do katalogu nadrzędnego).
+# @param name Nazwa podana przez producenta.
+# @return Znormalizowana nazwa względna.
+def safe_name(name):
+    parts = [part for part in name.replace('\\', '/').split('/') if part not in ('', '.', '..')]
+    if not parts:
+        raise ValueError('Pusta nazwa nagrania')
+    return '/'.join(parts)
+
+##
+# @brief Usługa przyjmowania nagrań.
+class IngestService:
+    ##
+    # @brief Konstruktor.
+    # @param reference_path Ścieżka do pliku referencyjnego.
+    # @param output_path Plik CSV z wynikami.
+    # @param method Metoda wygładzania.
+    # @param metric Metryka błędów bez uwzględniania grup.
+    # @param workers Liczba procesów (None - liczba rdzeni).
+    # @param queue_size Liczba nagrań oczekujących ponad liczbę procesów.
+    # @param executor Pula wykonawców; jeśli None, tworzona jest ProcessPoolExecutor(workers).
+    def __init__(self, reference_path, output_path=DEFAULT_OUTPUT_PATH, method=KALMAN, metric='euclidean',
+                 workers=None, queue_size=DEFAULT_QUEUE_SIZE, executor=None):
+        self.reference_path = os.path.abspath(reference_path)
+        self.output_path = output_path
+        self.method = method
+        self.metric = metric
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.executor = executor
+        self.processed = 0
+        self.failed = 0
+        self._queue = None
+        self._slots = None
+
+    ##
+    # @brief Przyjmuje nagranie do kolejki; czeka, jeśli osiągnięto limit nieukończonych nagrań.
+    # @param file_path Ścieżka do pliku nagrania.
+    # @param name Nazwa nagrania.
+    # @return Future z listą wierszy wyników (lub wyjątkiem).
+    async def submit(self, file_path, name):
+        await self._acquire()
+        return self._enqueue(file_path, name)
+
+    ##
+    # @brief Zajmuje miejsce dla nowego nagrania (przeciwciśnienie).
+    async def _acquire(self):
+        if self._slots.locked():
+            print("Wszystkie procesy zajęte - wstrzymano przyjmowanie nagrań", file=sys.stderr)
+        await self._slots.acquire()
+
+    ##
+    # @brief Wstawia nagranie do kolejki po zajęciu miejsca.
+    def _enqueue(self, file_path, name):
+        result = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((file_path, name, result))
+        return result
+
+    ##
+    # @brief Zadanie przekazujące nagrania z kolejki do puli procesów.
+    # @param executor Pula procesów.
+    async def _consume(self, executor):
+        loop = asyncio.get_running_loop()
+        while True:
+            file_path, name, result = await self._queue.get()
+            try:
+                rows = await loop.run_in_executor(executor, evaluate_recording, file_path, name,
+                                                  self.reference_path, self.method, self.metric)
+            except Exception as error:
+                # Dowolny błąd oceny (również nieoczekiwany lub awaria puli procesów) kończy tylko to nagranie:
+                # przekazywany jest do future, a zadanie obsługuje kolejne nagrania
+                self.failed += 1
+                print(f"Błąd {name}: {error}")
+                if not result.done():
+                    result.set_exception(error)
+            else:
+                self.processed += 1
+                append_results(rows, self.output_path)
+                print(f"Oceniono {name}: {rows[0]['points']} punktów, średni błąd {rows[0]['mean']}")
+                if not result.done():
+                    result.set_result(rows)
+            finally:
+                self._queue.task_done()
+                self._slots.release()
+
+    ##
+    # @brief Przegląda katalog zrzutu i przyjmuje nowe, niezmieniające się już pliki.
+    # @param drop_dir Katalog zrzutu.
+    # @param poll_interval Odstęp pomiędzy przeglądami (w sekundach).
+    # @param once Czy zakończyć po przyjęciu plików obecnych w katalogu.
+    async def watch(self, drop_dir, poll_interval=DEFAULT_POLL_INTERVAL, once=False):
+        candidates = {}  # ścieżka -> (rozmiar, czas modyfikacji) z poprzedniego przeglądu
+        accepted = set()
+        while True:
+            current = dict(scan_drop_dir(drop_dir))
+            for path, signature in current.items():
+                if path in accepted or (candidates.get(path) != signature and not once):
+                    continue
+                accepted.add(path)
+                name = safe_name(os.path.relpath(path, drop_dir))
+                result = await self.submit(path, name)
+                result.add_done_callback(functools.partial(_archive, drop_dir, path, name, accepted))
+            candidates = current
+            if once:
+                return
+            await asyncio.sleep(poll_interval)
+
+    ##
+    # @brief Obsługuje jedno połączenie gniazda: odbiera nagranie, ocenia je i odsyła wynik.
+    # @param reader Strumień odczytu.
+    # @param writer Strumień zapisu.
+    # @param spool_dir Katalog na odebrane nagrania.
+    async def _handle_upload(self, reader, writer, spool_dir):
+        name = None
+        try:
+            name = safe_name((await reader.readline()).decode('utf-8').strip())
+            # Miejsce zajmowane jest przed odczytem treści: przy zajętych procesach klient czeka
+            await self._acquire()
+            file_descriptor, spool_path = tempfile.mkstemp(dir=spool_dir, suffix=os.path.splitext(name)[1])
+            try:
+                with os.fdopen(file_descriptor, 'wb') as spool_file:
+                    while chunk := await reader.read(CHUNK_SIZE):
+                        spool_file.write(chunk)
+            except BaseException:
+                self._slots.release()
+                os.remove(spool_path)
+                raise
+            try:
+                rows = await self._enqueue(spool_path, name)
+                response = {'name': name, 'status': 'ok',
+                            'results': {row['track']: {'mean': row['mean'], 'median': row['median'],
+                                                       'group_mean': row['group_mean']} for row in rows}}
+            finally:
+                os.remove(spool_path)
+        except Exception as error:
+            response = {'name': name, 'status': 'error', 'error': str(error)}
+        writer.write((json.dumps(response) + '\n').encode('utf-8'))
+        await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+
+    ##
+    # @brief Uruchamia serwer gniazda lokalnego.
+    # @param socket_path Ścieżka gniazda Unix lub port TCP (liczba) na 127.0.0.1.
+    # @param spool_dir Katalog na odebrane nagrania.
+    # @return Obiekt serwera asyncio.
+    async def listen(self, socket_path, spool_dir):
+        os.makedirs(spool_dir, exist_ok=True)
+
+        async def handle(reader, writer):
+            await self._handle_upload(reader, writer, spool_dir)
+        if str(socket_path).isdigit():
+            return await asyncio.start_server(handle, '127.0.0.1', int(socket_path))
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        return await asyncio.start_unix_server(handle, socket_path)
+
+    ##
+    # @brief Uruchamia usługę.
+    # @param drop_dir Katalog zrzutu (opcjonalnie).
+    # @param socket_path Gniazdo lokalne (opcjonalnie).
+    # @param poll_interval Odstęp pomiędzy przeglądami katalogu zrzutu.
+    # @param once Czy zakończyć po ocenie plików obecnych w katalogu zrzutu (bez gniazda).
+    async def run(self, drop_dir=None, socket_path=None, poll_interval=DEFAULT_POLL_INTERVAL, once=False):
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.workers + self.queue_size)
+        executor = self.executor or ProcessPoolExecutor(max_workers=self.workers)
+        consumers = [asyncio.create_task(self._consume(executor)) for _ in range(self.workers)]
+        server = None
+        spool_dir = None
+        try:
+            if socket_path is not None and not once:
+                spool_dir = os.path.join(drop_dir, SPOOL_DIR) if drop_dir else tempfile.mkdtemp(prefix='ingest-')
+                server = await self.listen(socket_path, spool_dir)
+                print(f"Nasłuchiwanie na {socket_path}")
+            if drop_dir is not None:
+                await self.watch(drop_dir, poll_interval, once)
+            if once:
+                await self._queue.join()
+            else:
+                await asyncio.Event().wait()
+        finally:
+            if server is not None:
+                server.close()
+                await server.wait_closed()
+                shutil.rmtree(spool_dir, ignore_errors=True)
+                if not str(socket_path).isdigit() and os.path.exists(socket_path):
+                    os.remove(socket_path)
+            for consumer in consumers:
+                consumer.cancel()
+            await asyncio.gather(*consumers, return_exceptions=True)
+            if self.executor is None:
+                executor.shutdown()
+
+##
+# @brief Wyszukuje pliki nagrań w katalogu zrzutu i jego podkatalogach urządzeń.
+# @param drop_dir Katalog zrzutu.
+# @return Generator par (ścieżka, (rozmiar, czas modyfikacji)).
+def scan_drop_dir(drop_dir):
+    for directory, subdirectories, file_names in os.walk(drop_dir):
+        subdirectories[:] = sorted(name for name in subdirectories
+                                   if name not in (PROCESSED_DIR, FAILED_DIR) and not name.startswith('.'))
+        for name in sorted(file_names):
+            if name.startswith('.') or not name.lower().endswith(RECORDING_EXTENSIONS):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            yield path, (stat.st_size, stat.st_mtime_ns)
+
+##
+# @brief Przenosi oceniony plik do podkatalogu processed/ lub failed/ katalogu zrzutu.
+# @param drop_dir Katalog zrzutu.
+# @param path Ścieżka pliku.
+# @param name Nazwa nagrania (ścieżka względna).
+# @param accepted Zbiór przyjętych ścieżek, z którego usuwany jest plik.
+# @param result Zakończony future z wynikiem oceny.
+def _archive(drop_dir, path, name, accepted, result):
+    target = os.path.join(drop_dir, FAILED_DIR if result.exception() else PROCESSED_DIR, name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.move(path, target)
+    accepted.discard(path)
+
+##
+# @brief Wysyła nagranie przez gniazdo lokalne i zwraca odpowiedź usługi.
+# @param socket_path Ścieżka gniazda Unix lub port TCP na 127.0.0.1.
+# @param file_path Ścieżka pliku nagrania.
+# @param name Nazwa nagrania.
+# @return Słownik odpowiedzi.
+async def upload(socket_path, file_path, name):
+    if str(socket_path).isdigit():
+        reader, writer = await asyncio.open_connection('127.0.0.1', int(socket_path))
+    else:
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+    writer.write((name + '\n').encode('utf-8'))
+    with open(file_path, 'rb') as recording:
+        while chunk := recording.read(CHUNK_SIZE):
+            writer.write(chunk)
+            await writer.drain()
+    writer.write_eof()
+    response = json.loads(await reader.readline())
+    writer.close()
+    await writer.wait_closed()
+    return response
+
+##
+# @brief Lokalny producent zastępczy: wysyła te same nagrania z wielu "urządzeń" naraz.
+#
+# Nagrania wysyłane są przez gniazdo albo kopiowane do katalogu zrzutu (zapis do pliku ukrytego i zmiana nazwy,
+# aby usługa nie odczytała niepełnego pliku).
+# @param files Pliki nagrań.
+# @param devices Liczba symulowanych urządzeń.
+# @param socket_path Gniazdo usługi (opcjonalnie).
+# @param drop_dir Katalog zrzutu (opcjonalnie).
+# @return Lista odpowiedzi usługi (dla gniazda) lub ścieżek skopiowanych plików.
+async def produce(files, devices=1, socket_path=None, drop_dir=None):
+    uploads = [(f'urzadzenie{device}/{os.path.basename(path)}', path)
+               for device in range(devices) for path in files]
+    if socket_path is not None:
+        return await asyncio.gather(*(upload(socket_path, path, name) for name, path in uploads))
+    copied = []
+    for name, path in uploads:
+        target = os.path.join(drop_dir, name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temp_path = os.path.join(os.path.dirname(target), '.' + os.path.basename(target) + '.part')
+        shutil.copyfile(path, temp_path)
+        os.replace(temp_path, target)
+        copied.append(target)
+    return copied
+
+def main():
+    parser = argparse.ArgumentParser(description='Przyjmowanie i ocena nagrań z wielu urządzeń.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve = commands.add_parser('serve', help='Uruchamia usługę')
+    serve.add_argument('--reference', required=True, help='Plik z danymi referencyjnymi')
+    serve.add_argument('--drop-dir', default=None, help='Katalog zrzutu nagrań')
+    serve.add_argument('--socket', default=None, help='Ścieżka gniazda Unix lub port TCP na 127.0.0.1')
+    serve.add_argument('--output', default=DEFAULT_OUTPUT_PATH, help='Plik CSV z wynikami')
+    serve.add_argument('--method', default=KALMAN, choices=METHODS, help='Metoda wygładzania')
+    serve.add_argument('--metric', default='euclidean',
+                       choices=('euclidean', 'haversine', 'equirectangular', 'cross_track'))
+    serve.add_argument('--workers', type=int, default=None, help='Liczba procesów')
+    serve.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                       help='Liczba nagrań oczekujących ponad liczbę procesów')
+    serve.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                       help='Odstęp w sekundach pomiędzy przeglądami katalogu zrzutu')
+    serve.add_argument('--once', action='store_true', help='Ocenia pliki obecne w katalogu zrzutu i kończy')
+
+    producer = commands.add_parser('produce', help='Lokalny producent zastępczy')
+    producer.add_argument('files', nargs='+', help='Pliki nagrań')
+    producer.add_argument('--devices', type=int, default=1, help='Liczba symulowanych urządzeń')
+    producer.add_argument('--socket', default=None, help='Gniazdo usługi')
+    producer.add_argument('--drop-dir', default=None, help='Katalog zrzutu')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        if args.drop_dir is None and (args.socket is None or args.once):
+            parser.error('podaj --drop-dir lub --socket (bez --once)')
+        service = IngestService(args.reference, args.output, args.method, args.metric, args.workers, args.queue_size)
+        try:
+            asyncio.run(service.run(args.drop_dir, args.socket, args.poll_interval, args.once))
+        except KeyboardInterrupt:
+            pass
+        print(f"Ocenione nagrania: {service.processed}, błędy: {service.failed}")
+    else:
+        if (args.socket is None) == (args.drop_dir is None):
+            parser.error('podaj dokładnie jedno z --socket lub --drop-dir')
+        for response in asyncio.run(produce(args.files, args.devices, args.socket, args.drop_dir)):
+            print(json.dumps(response) if isinstance(response, dict) else response)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import functools
+import json
+import os
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager, nullcontext
+
+##
+# \file instrumentation.py
+# \brief Opcjonalny pomiar czasu, czasu procesora, szczytowej pamięci i liczby elementów etapów potoku.
+#
+# Etapy oznaczane są menedżerem kontekstu stage() lub dekoratorem instrumented(). Dopóki pomiar nie zostanie
+# włączony funkcją enable(), stage() zwraca wspólny, pusty menedżer kontekstu, a instrumented() wywołuje funkcję
+# bezpośrednio, więc oznaczenia mogą pozostać w kodzie produkcyjnym. Szczytowa pamięć mierzona jest modułem
+# tracemalloc tylko na żądanie (enable(memory=True)), ponieważ śledzenie alokacji spowalnia obliczenia.
+#
+# Wyniki dostępne są jako słownik (report), plik JSON (write_json) lub jedna płaska linia logu na przebieg
+# (log_line), np. "run=3f2a load.wall=0.012 load.cpu=0.011 load.items=520 interpolate.wall=0.001 ...".
+
+_NOOP = nullcontext()
+
+# Bieżący przebieg: None, gdy pomiar jest wyłączony
+_run = None
+
+##
+# @brief Włącza pomiar i rozpoczyna nowy przebieg.
+#
+# Śledzenie alokacji włączone wcześniej poza modułem (np. python -X tracemalloc) nie jest wyłączane przez disable().
+# @param memory Czy mierzyć szczytową pamięć etapów (tracemalloc).
+# @param run_id Identyfikator przebiegu; jeśli None, generowany jest losowo.
+def enable(memory=False, run_id=None):
+    global _run
+    # Przebieg rozpoczęty bez disable() przekazuje nowemu informację, czy to moduł włączył tracemalloc
+    owns_tracing = _run is not None and _run['owns_tracing']
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        owns_tracing = True
+    _run = {
+        'run': run_id or uuid.uuid4().hex[:8],
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'pid': os.getpid(),
+        'memory': memory,
+        'owns_tracing': owns_tracing,
+        'stages': [],
+        'stack': [],
+    }
+
+##
+# @brief Wyłącza pomiar.
+# @return Raport zakończonego przebiegu (jak report) lub None, jeśli pomiar nie był włączony.
+def disable():
+    global _run
+    result = report()
+    if _run is not None and _run['owns_tracing'] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _run = None
+    return result
+
+##
+# @brief Sprawdza, czy pomiar jest włączony.
+# @return True, jeśli pomiar jest włączony.
+def enabled():
+    return _run is not None
+
+##
+# @brief Oznacza etap potoku.
+#
+# Przykład: with stage('interpolate', items=num_points): ...
+# @param name Nazwa etapu.
+# @param items Liczba przetwarzanych elementów (opcjonalnie; można ją też podać później funkcją count).
+# @return Menedżer kontekstu.
+def stage(name, items=None):
+    if _run is None:
+        return _NOOP
+    return _measure(name, items)
+
+@contextmanager
+def _measure(name, items):
+    run = _run
+    record = {'name': name, 'depth': len(run['stack']), 'wall': 0.0, 'cpu': 0.0, 'items': items}
+    if run['memory']:
+        current, peak = tracemalloc.get_traced_memory()
+        if run['stack']:
+            run['stack'][-1]['_peak'] = max(run['stack'][-1]['_peak'], peak)
+        tracemalloc.reset_peak()
+        record['_baseline'] = record['_peak'] = current
+    run['stack'].append(record)
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    try:
+        yield
+    finally:
+        record['wall'] = time.perf_counter() - wall
+        record['cpu'] = time.process_time() - cpu
+        run['stack'].pop()
+        if run['memory']:
+            record['_peak'] = max(record['_peak'], tracemalloc.get_traced_memory()[1])
+            record['peak_memory'] = record['_peak'] - record.pop('_baseline')
+            if run['stack']:
+                run['stack'][-1]['_peak'] = max(run['stack'][-1]['_peak'], record['_peak'])
+            del record['_peak']
+        run['stages'].append(record)
+
+##
+# @brief Ustala liczbę elementów przetwarzanych w bieżącym etapie.
+# @param items Liczba elementów.
+def count(items):
+    if _run is not None and _run['stack']:
+        _run['stack'][-1]['items'] = int(items)
+
+##
+# @brief Dekorator oznaczający całą funkcję jako etap.
+# @param name Nazwa etapu; jeśli None, używana jest nazwa funkcji.
+# @return Dekorator.
+def instrumented(name=None):
+    def decorator(function):
+        stage_name = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _run is None:
+                return function(*args, **kwargs)
+            with _measure(stage_name, None):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+##
+# @brief Zwraca wyniki bieżącego przebiegu.
+# @return Słownik z kluczami 'run', 'started', 'pid' i 'stages' (lista etapów w kolejności zakończenia) lub None.
+def report():
+    if _run is None:
+        return None
+    return {key: value for key, value in _run.items() if key not in ('stack', 'memory', 'owns_tracing')}
+
+##
+# @brief Zapisuje wyniki bieżącego przebiegu do pliku JSON.
+# @param output_path Ścieżka pliku wynikowego.
+def write_json(output_path):
+    with open(output_path, 'w') as output_file:
+        json.dump(report(), output_file, indent=2)
+
+##
+# @brief Zwraca wyniki bieżącego przebiegu jako jedną płaską linię "klucz=wartość".
+# @return Linia tekstu lub pusty napis, jeśli pomiar jest wyłączony.
+def log_line():
+    if _run is None:
+        return ''
+    fields = [f"run={_run['run']}"]
+    for record in _run['stages']:
+        fields.append(f"{record['name']}.wall={record['wall']:.6f}")
+        fields.append(f"{record['name']}.cpu={record['cpu']:.6f}")
+        if 'peak_memory' in record:
+            fields.append(f"{record['name']}.peak_memory={record['peak_memory']}")
+        if record['items'] is not None:
+            fields.append(f"{record['name']}.items={record['items']}")
+    return ' '.join(fields)
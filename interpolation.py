@@ -0,0 +1,45 @@
+import numpy as np
+
+from geo import haversine_distances
+
+##
+# \file interpolation.py
+# \brief Przepróbkowanie ścieżki referencyjnej do zadanej liczby równo rozłożonych punktów.
+#
+# Odległości skumulowane wzdłuż ścieżki liczone są jedną operacją wektorową, a wszystkie nowe punkty wyznaczane są
+# jednym wywołaniem interpolacji liniowej (jak w main.py) lub funkcji sklejanej trzeciego stopnia (jak w extraction.py).
+
+LINEAR = 'linear'
+CUBIC = 'cubic'
+
+##
+# @brief Oblicza odległości skumulowane wzdłuż ścieżki.
+# @param data Tablica punktów (szerokość, długość).
+# @return Wektor odległości w metrach od pierwszego punktu, o długości len(data).
+def cumulative_distances(data):
+    data = np.asarray(data, dtype=np.float64)
+    return np.concatenate(([0.0], np.cumsum(haversine_distances(data[:-1, :2], data[1:, :2]))))
+
+##
+# @brief Interpoluje ścieżkę referencyjną, aby uzyskać określoną liczbę równo rozłożonych punktów.
+#
+# Punkty powtórzone (odcinki o zerowej długości) są pomijane, ponieważ interpolacja wymaga ściśle rosnących odległości.
+# @param data Tablica punktów referencyjnych (szerokość, długość).
+# @param num_points Liczba punktów do uzyskania po interpolacji.
+# @param kind Rodzaj interpolacji: LINEAR lub CUBIC (CubicSpline z SciPy).
+# @return Tablica interpolowanych punktów o kształcie (num_points, 2).
+def resample_reference(data, num_points, kind=LINEAR):
+    data = np.asarray(data, dtype=np.float64)[:, :2]
+    distances = cumulative_distances(data)
+    keep = np.concatenate(([True], np.diff(distances) > 0))
+    distances = distances[keep]
+    data = data[keep]
+    new_distances = np.linspace(0, distances[-1], num_points)
+
+    if kind == LINEAR:
+        return np.column_stack((np.interp(new_distances, distances, data[:, 0]),
+                                np.interp(new_distances, distances, data[:, 1])))
+    if kind == CUBIC:
+        from scipy.interpolate import CubicSpline
+        return CubicSpline(distances, data)(new_distances)
+    raise ValueError(f'Nieznany rodzaj interpolacji: {kind}')
@@ -0,0 +1,329 @@
+import os
+import re
+
+import numpy as np
+
+##
+# \file loader.py
+# \brief Jednoprzebiegowe wczytywanie plików z danymi oryginalnymi, wygładzonymi i referencyjnymi.
+#
+# Każdy plik jest czytany dokładnie raz. Rodzaj pliku ustalany jest na podstawie roli podanej w konfiguracji lub
+# rozpoznawany po pierwszej niepustej linii, a dane zwracane są jako słownik kolumn w postaci tablic NumPy.
+
+ORIGINAL = 'original'
+SMOOTHED = 'smoothed'
+REFERENCE = 'reference'
+ROLES = (ORIGINAL, SMOOTHED, REFERENCE)
+
+ORIGINAL_COLUMNS = ('index', 'lat', 'lon', 'altitude', 'accuracy', 'sx', 'sy', 'sz', 'time', 'azimuth')
+SMOOTHED_COLUMNS = ('index', 'lat', 'lon', 'mae', 'group', 'time')
+REFERENCE_COLUMNS = ('lat', 'lon')
+
+# Kolumny całkowitoliczbowe; pozostałe kolumny są typu float64
+INTEGER_COLUMNS = ('index', 'group', 'time')
+
+# Wzorce rozpoznające format pliku, kompilowane jednokrotnie
+_ORIGINAL_PATTERN = re.compile(r'Point (\d+):Latitude:([\d.]+)\sLongitude:([\d.]+)')
+_SMOOTHED_PATTERN = re.compile(
+    r'Point (\d+): Lat: ([\d.]+), Long: ([\d.]+), MAE: ([\d.E+-]+), Group: (\d+), Time: (\d+)')
+_REFERENCE_PATTERN = re.compile(r'([\d.]+), ([\d.]+)')
+
+# Odwzorowanie kluczy z plików oryginalnych na nazwy kolumn
+_ORIGINAL_KEYS = {
+    'Latitude': 'lat',
+    'Longitude': 'lon',
+    'Altitude': 'altitude',
+    'Accuracy': 'accuracy',
+    'SX': 'sx',
+    'SY': 'sy',
+    'SZ': 'sz',
+    'Time': 'time',
+    'Azimuth': 'azimuth',
+}
+_ORIGINAL_MEASUREMENTS = ('altitude', 'accuracy', 'sx', 'sy', 'sz', 'azimuth')
+
+##
+# @brief Rozpoznaje format linii z pliku z danymi.
+# @param line Linia tekstu.
+# @return Jedna z wartości ORIGINAL, SMOOTHED, REFERENCE lub None, jeśli format jest nieznany.
+def detect_format(line):
+    if _ORIGINAL_PATTERN.search(line):
+        return ORIGINAL
+    if _SMOOTHED_PATTERN.search(line):
+        return SMOOTHED
+    if _REFERENCE_PATTERN.search(line):
+        return REFERENCE
+    return None
+
+##
+# @brief Zamienia listy wartości na słownik tablic NumPy o ustalonych typach.
+# @param columns Słownik nazwa kolumny -> lista wartości.
+# @return Słownik nazwa kolumny -> tablica NumPy.
+def _to_arrays(columns):
+    return {name: np.array(values, dtype=np.int64 if name in INTEGER_COLUMNS else np.float64)
+            for name, values in columns.items()}
+
+##
+# @brief Tworzy pusty słownik kolumn dla danej roli.
+# @param role Rola pliku (ORIGINAL, SMOOTHED lub REFERENCE).
+# @return Słownik nazwa kolumny -> pusta tablica NumPy.
+def empty_columns(role):
+    names = {ORIGINAL: ORIGINAL_COLUMNS, SMOOTHED: SMOOTHED_COLUMNS, REFERENCE: REFERENCE_COLUMNS}[role]
+    return _to_arrays({name: [] for name in names})
+
+##
+# @brief Parsuje pola "Klucz:wartość" jednego punktu danych oryginalnych.
+#
+# Pola dzielone są bez użycia wyrażeń regularnych. Brakujące pola (np. Altitude, SZ i Azimuth w starszych nagraniach)
+# otrzymują wartość NaN, a brakujący czas wartość -1.
+# @param fields Tekst pól, np. "Latitude:50.1 Longitude:19.4 Accuracy:9.8 Time:1712828262278".
+# @return Krotka (szerokość, długość, czas, pomiary w kolejności _ORIGINAL_MEASUREMENTS) lub None, jeśli brakuje
+#         współrzędnych albo wartości są niepoprawne.
+def parse_original_fields(fields):
+    values = {}
+    for token in fields.split():
+        key, _, value = token.partition(':')
+        name = _ORIGINAL_KEYS.get(key)
+        if name is not None:
+            values[name] = value
+    try:
+        return (float(values['lat']), float(values['lon']), int(values.get('time', -1)),
+                [float(values.get(name, 'nan')) for name in _ORIGINAL_MEASUREMENTS])
+    except (KeyError, ValueError):
+        return None
+
+##
+# @brief Dopisuje jeden punkt danych oryginalnych do list kolumn.
+# @param columns Słownik nazwa kolumny -> lista (lub array.array) wartości.
+# @param index Numer punktu.
+# @param point Krotka zwrócona przez parse_original_fields.
+def append_original_point(columns, index, point):
+    lat, lon, time, measurements = point
+    columns['index'].append(index)
+    columns['lat'].append(lat)
+    columns['lon'].append(lon)
+    columns['time'].append(time)
+    for name, value in zip(_ORIGINAL_MEASUREMENTS, measurements):
+        columns[name].append(value)
+
+##
+# @brief Parsuje jedną linię w formacie danych oryginalnych ("Point N:Latitude:... Longitude:... ...").
+# @param line Linia tekstu.
+# @return Krotka (numer punktu, punkt w formacie parse_original_fields) lub None dla linii niepoprawnej.
+def parse_original_line(line):
+    point, _, fields = line.partition(':')
+    if not point.startswith('Point '):
+        return None
+    try:
+        index = int(point[6:])
+    except ValueError:
+        return None
+    parsed = parse_original_fields(fields)
+    return None if parsed is None else (index, parsed)
+
+##
+# @brief Parsuje linie w formacie danych oryginalnych ("Point N:Latitude:... Longitude:... ...").
+#
+# Linie bez szerokości i długości geograficznej są pomijane.
+# @param lines Iterowalny zbiór linii.
+# @return Słownik kolumn ORIGINAL_COLUMNS.
+def parse_original(lines):
+    columns = {name: [] for name in ORIGINAL_COLUMNS}
+    for line in lines:
+        parsed = parse_original_line(line)
+        if parsed is not None:
+            append_original_point(columns, *parsed)
+    return _to_arrays(columns)
+
+##
+# @brief Parsuje jedną linię w formacie danych wygładzonych.
+# @param line Linia tekstu.
+# @return Krotka wartości w kolejności SMOOTHED_COLUMNS lub None dla linii niepoprawnej.
+def parse_smoothed_line(line):
+    fields = line.split(', ')
+    if len(fields) < 5 or not fields[0].startswith('Point '):
+        return None
+    try:
+        point, _, lat = fields[0].partition(': Lat: ')
+        return (int(point[6:]), float(lat), float(fields[1][6:]), float(fields[2][5:]),
+                int(fields[3][7:]), int(fields[4][6:]))
+    except ValueError:
+        return None
+
+##
+# @brief Parsuje linie w formacie danych wygładzonych ("Point N: Lat: ..., Long: ..., MAE: ..., Group: ..., Time: ...").
+# @param lines Iterowalny zbiór linii.
+# @return Słownik kolumn SMOOTHED_COLUMNS.
+def parse_smoothed(lines):
+    columns = {name: [] for name in SMOOTHED_COLUMNS}
+    for line in lines:
+        row = parse_smoothed_line(line)
+        if row is None:
+            continue
+        for name, value in zip(SMOOTHED_COLUMNS, row):
+            columns[name].append(value)
+    return _to_arrays(columns)
+
+##
+# @brief Parsuje linie w formacie danych referencyjnych ("x, y," - kolejność osi jak w pliku źródłowym).
+# @param lines Iterowalny zbiór linii.
+# @return Słownik kolumn REFERENCE_COLUMNS.
+def parse_reference(lines):
+    lats = []
+    lons = []
+    for line in lines:
+        fields = line.split(',')
+        if len(fields) < 2:
+            continue
+        try:
+            lat = float(fields[0])
+            lon = float(fields[1])
+        except ValueError:
+            continue
+        lats.append(lat)
+        lons.append(lon)
+    return _to_arrays({'lat': lats, 'lon': lons})
+
+_PARSERS = {
+    ORIGINAL: parse_original,
+    SMOOTHED: parse_smoothed,
+    REFERENCE: parse_reference,
+}
+
+##
+# @brief Zwraca pierwszą niepustą linię otwartego pliku.
+# @param data_file Otwarty plik.
+# @return Pierwsza niepusta linia lub pusty napis.
+def _first_line(data_file):
+    for line in data_file:
+        if line.strip():
+            return line
+    return ''
+
+##
+# @brief Rozpoznaje rolę pliku z danymi na podstawie jego pierwszej niepustej linii.
+# @param file_path Ścieżka do pliku.
+# @return Jedna z wartości ORIGINAL, SMOOTHED, REFERENCE lub None.
+def sniff_file(file_path):
+    with open(file_path, 'r', encoding='utf-8') as data_file:
+        first_line = _first_line(data_file)
+    if is_waypoints_xml(first_line):
+        return ORIGINAL
+    return detect_format(first_line)
+
+##
+# @brief Sprawdza, czy plik jest nagraniem XML z punktami trasy (obsługiwanym przez waypoints.py).
+# @param first_line Pierwsza niepusta linia pliku.
+# @return True dla plików XML.
+def is_waypoints_xml(first_line):
+    return first_line.lstrip().startswith('<')
+
+##
+# @brief Wczytuje pojedynczy plik z danymi w jednym przebiegu.
+# @param file_path Ścieżka do pliku.
+# @param role Rola pliku; jeśli None, format rozpoznawany jest po pierwszej niepustej linii. Nagrania XML
+#             (waypoints.py) są zawsze danymi oryginalnymi.
+# @return Krotka (rola, słownik kolumn); rola jest None dla pliku pustego lub o nieznanym formacie.
+def load_file(file_path, role=None):
+    with open(file_path, 'r', encoding='utf-8') as data_file:
+        first_line = _first_line(data_file)
+        if is_waypoints_xml(first_line) and role in (None, ORIGINAL):
+            from waypoints import load_waypoints
+            return ORIGINAL, load_waypoints(file_path)
+        if role is None:
+            role = detect_format(first_line)
+        if role is None:
+            return None, {}
+        parser = _PARSERS[role]
+        data = parser(_chain_first(first_line, data_file))
+    return role, data
+
+##
+# @brief Zwraca ponownie pierwszą, już odczytaną linię, a następnie resztę pliku.
+# @param first_line Pierwsza odczytana linia.
+# @param data_file Otwarty plik.
+def _chain_first(first_line, data_file):
+    yield first_line
+    yield from data_file
+
+##
+# @brief Wczytuje wszystkie pliki z danymi wymienione w konfiguracji.
+#
+# Lista plików może być podana jako lista ścieżek (format rozpoznawany jest automatycznie) lub jako słownik
+# rola -> ścieżka (lub lista ścieżek). Dane z kilku plików o tej samej roli są łączone w kolejności wystąpienia.
+# @param data_files Lista ścieżek lub słownik rola -> ścieżka.
+# @param base_dir Katalog, względem którego rozwiązywane są ścieżki względne.
+# @param cache_dir Katalog binarnej pamięci podręcznej (track_cache.py); jeśli None, pliki są zawsze parsowane.
+# @return Słownik rola -> słownik kolumn, zawierający wszystkie trzy role.
+def load_data_files(data_files, base_dir=None, cache_dir=None):
+    base_dir = os.getcwd() if base_dir is None else base_dir
+    if cache_dir is None:
+        load = load_file
+    else:
+        from track_cache import load_file_cached
+
+        def load(path, role):
+            return load_file_cached(path, role, cache_dir)
+    if isinstance(data_files, dict):
+        entries = []
+        for role, paths in data_files.items():
+            if role not in ROLES:
+                raise ValueError(f'Nieznana rola pliku z danymi: {role}')
+            for path in [paths] if isinstance(paths, str) else paths:
+                entries.append((path, role))
+    else:
+        entries = [(path, None) for path in data_files]
+
+    parts = {role: [] for role in ROLES}
+    for path, role in entries:
+        role, data = load(os.path.join(base_dir, path), role)
+        if role is not None:
+            parts[role].append(data)
+
+    tracks = {}
+    for role in ROLES:
+        if not parts[role]:
+            tracks[role] = empty_columns(role)
+        elif len(parts[role]) == 1:
+            tracks[role] = parts[role][0]
+        else:
+            tracks[role] = {name: np.concatenate([part[name] for part in parts[role]]) for name in parts[role][0]}
+    return tracks
+
+##
+# @brief Składa dane oryginalne w tablicę o układzie (indeks, szerokość, długość) używanym w main.py.
+# @param columns Słownik kolumn danych oryginalnych.
+# @return Tablica NumPy o kształcie (N, 3).
+def original_array(columns):
+    return np.column_stack((columns['index'], columns['lat'], columns['lon'])).astype(np.float64)
+
+##
+# @brief Składa dane wygładzone w tablicę o układzie (indeks, szerokość, długość, MAE, grupa, czas) używanym w main.py.
+# @param columns Słownik kolumn danych wygładzonych.
+# @return Tablica NumPy o kształcie (N, 6).
+def smoothed_array(columns):
+    return np.column_stack([columns[name] for name in SMOOTHED_COLUMNS]).astype(np.float64)
+
+##
+# @brief Składa dane referencyjne w tablicę (szerokość, długość).
+# @param columns Słownik kolumn danych referencyjnych.
+# @return Tablica NumPy o kształcie (N, 2).
+def reference_array(columns):
+    return np.column_stack((columns['lat'], columns['lon']))
+
+##
+# @brief Ustala kolejność osi danych referencyjnych na podstawie śladu.
+#
+# Pliki referencyjne zapisywane są raz jako (szerokość, długość), a raz jako (długość, szerokość). Jeżeli zamiana
+# kolumn przybliża środek danych referencyjnych do środka śladu, kolumny są zamieniane.
+# @param ref_data Tablica danych referencyjnych o kształcie (N, 2).
+# @param track_coords Tablica współrzędnych śladu (szerokość, długość).
+# @return Tablica danych referencyjnych w formacie (szerokość, długość).
+def align_reference_axes(ref_data, track_coords):
+    if len(ref_data) == 0 or len(track_coords) == 0:
+        return ref_data
+    center = np.mean(track_coords, axis=0)
+    ref_center = np.mean(ref_data, axis=0)
+    if np.sum((ref_center[::-1] - center) ** 2) < np.sum((ref_center - center) ** 2):
+        return ref_data[:, ::-1].copy()
+    return ref_data
@@ -0,0 +1,146 @@
+import argparse
+import glob
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from geo import from_local_metres, to_local_metres
+from loader import REFERENCE, align_reference_axes, load_file, reference_array
+from metrics import summarize_errors
+from road_graph import DEFAULT_OSM_FILE, edge_coords, load_road_graph
+from spatial_index import DEFAULT_PIECE_LENGTH, build_segment_index, query_segments, segment_points
+
+##
+# \file map_matching.py
+# \brief Dopasowanie śladów do sieci dróg z pliku map.osm.
+#
+# Każdy punkt śladu rzutowany jest na najbliższy odcinek drogi. Odcinki indeksowane są w lokalnym układzie płaskim
+# (w metrach) wokół środka grafu, więc odległość od drogi jest wyrażona w metrach i może służyć jako miara błędu
+# śladu bez ręcznie rysowanej ścieżki referencyjnej. Punkty dalsze od drogi niż max_distance uznawane są
+# za niedopasowane. Wyszukiwanie najbliższego odcinka jest dokładne (spatial_index.query_segments), więc gęsto
+# podzielona jezdnia obok długiej krawędzi (droga dwujezdniowa, drogi równoległe) nie wypiera właściwej krawędzi.
+#
+# Przykład: python map_matching.py TRASA_4_1S --osm map.osm --cache-dir .track_cache --output-dir snapped
+
+## Domyślna maksymalna odległość punktu od drogi (w metrach), przy której punkt jest dopasowywany
+DEFAULT_MAX_DISTANCE = 30.0
+
+## Indeks dróg: graf, punkt odniesienia lokalnego układu płaskiego i indeks odcinków (krawędzi grafu)
+RoadIndex = namedtuple('RoadIndex', ['graph', 'origin', 'segments'])
+
+## Wynik dopasowania: punkty na drogach (szerokość, długość), odległości od drogi w metrach, numery krawędzi grafu,
+# położenia na krawędziach w przedziale [0, 1] i maska punktów dopasowanych
+MatchResult = namedtuple('MatchResult', ['points', 'distances', 'edges', 'fractions', 'matched'])
+
+##
+# @brief Buduje indeks odcinków dróg.
+# @param graph Graf dróg (road_graph.RoadGraph).
+# @param piece_length Maksymalna długość fragmentu odcinka w indeksie (w metrach).
+# @return Obiekt RoadIndex.
+def build_road_index(graph, piece_length=DEFAULT_PIECE_LENGTH):
+    if len(graph.edge_starts) == 0:
+        raise ValueError('Graf dróg nie zawiera żadnych odcinków')
+    origin = (graph.coords.min(axis=0) + graph.coords.max(axis=0)) / 2
+    starts, ends = edge_coords(graph)
+    segments = build_segment_index(to_local_metres(starts, origin), to_local_metres(ends, origin), piece_length)
+    return RoadIndex(graph, origin, segments)
+
+##
+# @brief Wczytuje graf dróg z pliku OSM i buduje dla niego indeks odcinków.
+# @param osm_path Ścieżka do pliku .osm.
+# @param cache_dir Katalog pamięci podręcznej grafu (opcjonalnie).
+# @return Obiekt RoadIndex.
+def load_road_index(osm_path=DEFAULT_OSM_FILE, cache_dir=None):
+    return build_road_index(load_road_graph(osm_path, cache_dir=cache_dir))
+
+##
+# @brief Dopasowuje punkty śladu do najbliższych odcinków dróg.
+# @param road_index Indeks dróg.
+# @param coords Tablica punktów (szerokość, długość).
+# @param max_distance Maksymalna odległość od drogi w metrach; dalsze punkty pozostają na swoim miejscu
+#                     i są oznaczane jako niedopasowane.
+# @return Obiekt MatchResult.
+def snap_points(road_index, coords, max_distance=DEFAULT_MAX_DISTANCE):
+    coords = np.asarray(coords, dtype=np.float64)[:, :2]
+    if len(coords) == 0:
+        return MatchResult(coords, np.zeros(0), np.zeros(0, dtype=np.intp), np.zeros(0), np.zeros(0, dtype=bool))
+    distances, edges, fractions = query_segments(road_index.segments, to_local_metres(coords, road_index.origin))
+    points = from_local_metres(segment_points(road_index.segments, edges, fractions), road_index.origin)
+    matched = distances <= max_distance
+    points[~matched] = coords[~matched]
+    return MatchResult(points, distances, edges, fractions, matched)
+
+##
+# @brief Wyznacza miary odległości śladu od sieci dróg.
+# @param result Wynik snap_points.
+# @return Obiekt metrics.ErrorMetrics z odległości wszystkich punktów (w metrach).
+def road_errors(result):
+    return summarize_errors(result.distances)
+
+##
+# @brief Wczytuje współrzędne (szerokość, długość) z pliku śladu dowolnego obsługiwanego formatu.
+#
+# Dla plików referencyjnych kolejność osi ustalana jest względem sieci dróg (loader.align_reference_axes).
+# @param file_path Ścieżka do pliku.
+# @param road_index Indeks dróg.
+# @return Krotka (rola, tablica współrzędnych) lub (None, None) dla pliku o nieznanym formacie.
+def load_track_coords(file_path, road_index):
+    role, columns = load_file(file_path)
+    if role is None:
+        return None, None
+    coords = reference_array(columns)
+    if role == REFERENCE:
+        coords = align_reference_axes(coords, road_index.graph.coords)
+    return role, coords
+
+##
+# @brief Zapisuje dopasowany ślad w formacie pliku referencyjnego ("szerokość, długość," w każdej linii).
+# @param points Tablica punktów (szerokość, długość).
+# @param output_path Ścieżka pliku wynikowego.
+def write_track(points, output_path):
+    with open(output_path, 'w', encoding='utf-8') as output_file:
+        for lat, lon in points:
+            output_file.write(f'{lat:.7f}, {lon:.7f},\n')
+
+##
+# @brief Rozwija listę ścieżek: katalogi zastępowane są zawartymi w nich plikami .txt i .xml (rekurencyjnie).
+# @param paths Lista ścieżek plików i katalogów.
+# @return Lista ścieżek plików.
+def expand_paths(paths):
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append(path)
+            continue
+        for directory, subdirectories, file_names in os.walk(path):
+            subdirectories.sort()
+            files += [os.path.join(directory, name) for name in sorted(file_names) if name.endswith(('.txt', '.xml'))]
+    return files
+
+def main():
+    parser = argparse.ArgumentParser(description='Dopasowanie śladów do sieci dróg z pliku OSM.')
+    parser.add_argument('paths', nargs='*', help='Pliki lub katalogi ze śladami (domyślnie TRASA_*)')
+    parser.add_argument('--osm', default=DEFAULT_OSM_FILE, help='Plik OpenStreetMap')
+    parser.add_argument('--cache-dir', default=None, help='Katalog binarnej pamięci podręcznej grafu dróg')
+    parser.add_argument('--max-distance', type=float, default=DEFAULT_MAX_DISTANCE,
+                        help='Maksymalna odległość punktu od drogi w metrach')
+    parser.add_argument('--output-dir', default=None, help='Katalog, do którego zapisywane są dopasowane ślady')
+    args = parser.parse_args()
+
+    road_index = load_road_index(args.osm, args.cache_dir)
+    for file_path in expand_paths(args.paths or sorted(glob.glob('TRASA_*'))):
+        role, coords = load_track_coords(file_path, road_index)
+        if role is None or len(coords) == 0:
+            continue
+        result = snap_points(road_index, coords, args.max_distance)
+        errors = road_errors(result)
+        print(f"{file_path}: {len(coords)} punktów, dopasowano {int(np.sum(result.matched))}, "
+              f"średnia odległość od drogi {errors.mean:.1f} m, mediana {errors.median:.1f} m")
+        if args.output_dir is not None:
+            os.makedirs(args.output_dir, exist_ok=True)
+            name = os.path.splitext(os.path.relpath(file_path))[0].replace(os.sep, '_')
+            write_track(result.points, os.path.join(args.output_dir, f'{name}.txt'))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+from collections import namedtuple
+
+import numpy as np
+
+from geo import distance_function
+
+##
+# \file metrics.py
+# \brief Obliczanie miar błędów dla kolejnych punktów bez uwzględniania grup.
+#
+# Wektor odległości pomiędzy punktami śladu a odpowiadającymi im punktami referencyjnymi liczony jest jednokrotnie,
+# a wszystkie miary (średnia, MSE, RMSE, mediana, percentyle, maksimum) wyznaczane są z tego samego wektora.
+
+DEFAULT_PERCENTILES = (50, 90, 95)
+
+## Metryka błędu poprzecznego (odległość od łamanej referencyjnej, w metrach; cross_track.py)
+CROSS_TRACK = 'cross_track'
+
+## Wynik obliczeń błędów dla jednego śladu.
+ErrorMetrics = namedtuple('ErrorMetrics', ['mean', 'mse', 'rmse', 'median', 'percentiles', 'max', 'errors'])
+
+##
+# @brief Oblicza odległości pomiędzy i-tym punktem śladu a i-tym punktem referencyjnym.
+#
+# Dla metryki CROSS_TRACK punkty nie są parowane, a błędem jest odległość punktu od łamanej referencyjnej.
+# @param track Tablica punktów śladu (szerokość, długość).
+# @param ref_data Tablica punktów referencyjnych (szerokość, długość), co najmniej tak długa jak ślad, lub (dla
+#                 CROSS_TRACK) gotowy indeks cross_track.PolylineIndex.
+# @param metric Nazwa metryki: 'euclidean' (stopnie), 'haversine', 'equirectangular' lub 'cross_track' (metry).
+# @return Wektor odległości dla kolejnych punktów.
+def point_errors(track, ref_data, metric='euclidean'):
+    if metric == CROSS_TRACK:
+        from cross_track import cross_track_errors
+        return cross_track_errors(track, ref_data)
+    track = np.asarray(track, dtype=np.float64)
+    ref_data = np.asarray(ref_data, dtype=np.float64)
+    if len(ref_data) < len(track):
+        raise ValueError(f'Za mało punktów referencyjnych ({len(ref_data)}) dla śladu o {len(track)} punktach')
+    return distance_function(metric)(track[:, :2], ref_data[:len(track), :2])
+
+##
+# @brief Wyznacza miary błędów z wektora odległości.
+# @param errors Wektor odległości.
+# @param percentiles Percentyle do wyznaczenia.
+# @return Obiekt ErrorMetrics.
+def summarize_errors(errors, percentiles=DEFAULT_PERCENTILES):
+    errors = np.asarray(errors, dtype=np.float64)
+    mse = float(np.mean(errors ** 2))
+    return ErrorMetrics(
+        mean=float(np.mean(errors)),
+        mse=mse,
+        rmse=float(np.sqrt(mse)),
+        median=float(np.median(errors)),
+        percentiles={p: float(v) for p, v in zip(percentiles, np.percentile(errors, percentiles))},
+        max=float(np.max(errors)),
+        errors=errors,
+    )
+
+##
+# @brief Oblicza miary błędów bez uwzględniania grup dla danych wygładzonych i oryginalnych.
+# @param smoothed_data Dane wygładzone w formacie (indeks, szerokość, długość, MAE, grupa, czas).
+# @param original_data Dane oryginalne w formacie (indeks, szerokość, długość) lub None.
+# @param ref_data Interpolowane dane referencyjne (szerokość, długość).
+# @param metric Nazwa metryki: 'euclidean' (stopnie), 'haversine', 'equirectangular' lub 'cross_track' (metry).
+# @param percentiles Percentyle do wyznaczenia.
+# @return Słownik {'smoothed': ErrorMetrics, 'original': ErrorMetrics}; klucz 'original' tylko gdy podano dane.
+def calculate_errors(smoothed_data, original_data, ref_data, metric='euclidean', percentiles=DEFAULT_PERCENTILES):
+    if metric == CROSS_TRACK:
+        from cross_track import build_polyline_index
+        ref_data = build_polyline_index(ref_data)
+    results = {'smoothed': summarize_errors(
+        point_errors(np.asarray(smoothed_data)[:, 1:3], ref_data, metric), percentiles)}
+    if original_data is not None:
+        results['original'] = summarize_errors(
+            point_errors(np.asarray(original_data)[:, 1:3], ref_data, metric), percentiles)
+    return results
@@ -0,0 +1,401 @@
+import argparse
+import math
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from cross_track import build_polyline_index, cross_track_errors
+from evaluation import interpolate_reference
+from geo import distance_function, euclidean_distances
+from loader import align_reference_axes, load_file, parse_original_line, parse_smoothed_line, reference_array
+from metrics import CROSS_TRACK, DEFAULT_PERCENTILES, ErrorMetrics
+from spatial_index import build_reference_index, query_closest
+
+##
+# \file online.py
+# \brief Ocena strumieniowa: błędy liczone na bieżąco dla punktów napływających z rosnącego pliku lub potoku.
+#
+# Punkty wygładzone (i opcjonalnie odpowiadające im punkty oryginalne) przetwarzane są po kolei, a w pamięci
+# przechowywane są tylko punkty bieżącej grupy. Średnia, MSE i RMSE liczone są akumulatorami Welforda, a mediana
+# i percentyle przybliżane algorytmem P^2 (Jain, Chlamtac) o stałej pamięci. Po zamknięciu grupy (pojawieniu się punktu
+# z inną wartością Group) wyznaczane są błędy grupy tak jak w evaluation.py i wypisywane bieżące miary.
+#
+# W odróżnieniu od main.py dane referencyjne interpolowane są do stałej liczby punktów (długość śladu nie jest znana
+# z góry), a błąd punktu bez uwzględniania grup to odległość od najbliższego punktu referencyjnego zamiast od punktu
+# referencyjnego o tym samym numerze (lub, dla metryki 'cross_track', odległość od łamanej referencyjnej).
+#
+# Przykład: python online.py --smoothed "smoothed Kalman.txt" --original originalT4.txt --reference referencyjneT4.txt
+#           --follow
+
+DEFAULT_REFERENCE_POINTS = 10000  # Liczba punktów interpolowanych danych referencyjnych
+DEFAULT_POLL_INTERVAL = 0.5  # Odstęp (w sekundach) pomiędzy sprawdzeniami rosnącego pliku
+
+## Wynik zamkniętej grupy: numer grupy, liczba punktów, błędy grupy wygładzonej i oryginalnej (None bez danych
+# oryginalnych) oraz bieżące miary błędów grup (ErrorMetrics bez listy błędów)
+GroupResult = namedtuple('GroupResult', ['group', 'points', 'error_smoothed', 'error_original', 'smoothed', 'original'])
+
+##
+# @brief Akumulator średniej, wariancji, MSE i maksimum (algorytm Welforda).
+class RunningStats:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.sum_squares = 0.0
+        self.max = -math.inf
+
+    ##
+    # @brief Dodaje pojedynczą wartość.
+    # @param value Wartość.
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.sum_squares += value * value
+        self.max = max(self.max, value)
+
+    ##
+    # @brief Dodaje wiele wartości naraz (łączenie statystyk wzorem Chana).
+    # @param values Wektor wartości.
+    def add_many(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        count = self.count + len(values)
+        batch_mean = float(np.mean(values))
+        delta = batch_mean - self.mean
+        self.m2 += float(np.sum((values - batch_mean) ** 2)) + delta * delta * self.count * len(values) / count
+        self.mean += delta * len(values) / count
+        self.count = count
+        self.sum_squares += float(np.sum(values ** 2))
+        self.max = max(self.max, float(np.max(values)))
+
+    ##
+    # @brief Zwraca wariancję wartości.
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else math.nan
+
+    ##
+    # @brief Zwraca średni kwadrat wartości (MSE dla błędów).
+    @property
+    def mse(self):
+        return self.sum_squares / self.count if self.count else math.nan
+
+##
+# @brief Przybliżony kwantyl strumienia algorytmem P^2 (pięć znaczników, stała pamięć).
+class P2Quantile:
+    ##
+    # @param quantile Kwantyl w przedziale (0, 1).
+    def __init__(self, quantile):
+        self.quantile = quantile
+        self.heights = []
+        self.positions = [0, 1, 2, 3, 4]
+        self.desired = [0.0, 2 * quantile, 4 * quantile, 2 + 2 * quantile, 4.0]
+        self.increments = [0.0, quantile / 2, quantile, (1 + quantile) / 2, 1.0]
+
+    ##
+    # @brief Dodaje pojedynczą wartość.
+    # @param value Wartość.
+    def add(self, value):
+        heights = self.heights
+        if len(heights) < 5:
+            heights.append(value)
+            heights.sort()
+            return
+
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = next(i for i in range(4) if value < heights[i + 1])
+        for i in range(cell + 1, 5):
+            self.positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Korekta znaczników środkowych wzorem parabolicznym (lub liniowym, jeśli parabola wychodzi poza sąsiadów)
+        positions = self.positions
+        for i in (1, 2, 3):
+            shift = self.desired[i] - positions[i]
+            if (shift >= 1 and positions[i + 1] - positions[i] > 1) or \
+                    (shift <= -1 and positions[i - 1] - positions[i] < -1):
+                step = 1 if shift > 0 else -1
+                height = heights[i] + step / (positions[i + 1] - positions[i - 1]) * (
+                    (positions[i] - positions[i - 1] + step) * (heights[i + 1] - heights[i])
+                    / (positions[i + 1] - positions[i])
+                    + (positions[i + 1] - positions[i] - step) * (heights[i] - heights[i - 1])
+                    / (positions[i] - positions[i - 1]))
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = heights[i] + step * (heights[i + step] - heights[i]) / (positions[i + step] - positions[i])
+                heights[i] = height
+                positions[i] += step
+
+    ##
+    # @brief Zwraca bieżące przybliżenie kwantyla (dokładne dla mniej niż pięciu wartości).
+    @property
+    def value(self):
+        if not self.heights:
+            return math.nan
+        if len(self.heights) < 5:
+            return float(np.percentile(self.heights, self.quantile * 100))
+        return self.heights[2]
+
+##
+# @brief Akumulator miar błędów: statystyki Welforda, mediana i percentyle P^2.
+class ErrorAccumulator:
+    ##
+    # @param percentiles Percentyle do wyznaczenia (jak w metrics.summarize_errors).
+    def __init__(self, percentiles=DEFAULT_PERCENTILES):
+        self.stats = RunningStats()
+        self.median = P2Quantile(0.5)
+        self.percentiles = {p: P2Quantile(p / 100) for p in percentiles}
+
+    ##
+    # @brief Dodaje błędy.
+    # @param errors Wektor błędów.
+    def add_many(self, errors):
+        errors = np.asarray(errors, dtype=np.float64)
+        self.stats.add_many(errors)
+        for error in errors.tolist():
+            self.median.add(error)
+            for quantile in self.percentiles.values():
+                quantile.add(error)
+
+    ##
+    # @brief Zwraca bieżące miary w formacie metrics.ErrorMetrics (pole errors ma wartość None).
+    # @return Obiekt ErrorMetrics.
+    def snapshot(self):
+        mse = self.stats.mse
+        return ErrorMetrics(
+            mean=self.stats.mean if self.stats.count else math.nan,
+            mse=mse,
+            rmse=math.sqrt(mse),
+            median=self.median.value,
+            percentiles={p: quantile.value for p, quantile in self.percentiles.items()},
+            max=self.stats.max if self.stats.count else math.nan,
+            errors=None,
+        )
+
+##
+# @brief Ocena strumieniowa jednego śladu względem danych referencyjnych.
+class OnlineEvaluator:
+    ##
+    # @param ref_data Dane referencyjne (przed interpolacją).
+    # @param num_points Liczba punktów interpolowanych danych referencyjnych.
+    # @param metric Metryka błędów bez uwzględniania grup ('euclidean', 'haversine', 'equirectangular' lub
+    #               'cross_track').
+    # @param percentiles Percentyle do wyznaczenia.
+    def __init__(self, ref_data, num_points=DEFAULT_REFERENCE_POINTS, metric='euclidean',
+                 percentiles=DEFAULT_PERCENTILES):
+        self.raw_ref_data = np.asarray(ref_data, dtype=np.float64)
+        self.num_points = num_points
+        self.distance = None if metric == CROSS_TRACK else distance_function(metric)
+        self.polyline_index = None
+        self.ref_data = None
+        self.ref_index = None
+        self.points = {'smoothed': ErrorAccumulator(percentiles), 'original': ErrorAccumulator(percentiles)}
+        self.groups = {'smoothed': ErrorAccumulator(percentiles), 'original': ErrorAccumulator(percentiles)}
+        self.group = None
+        self.smoothed_buffer = []
+        self.original_buffer = []
+
+    ##
+    # @brief Interpoluje dane referencyjne i buduje indeks (przy pierwszym punkcie, który ustala kolejność osi).
+    # @param point Pierwszy punkt śladu (szerokość, długość).
+    def _prepare_reference(self, point):
+        ref_data = align_reference_axes(self.raw_ref_data, np.asarray([point]))
+        self.ref_data = np.asarray(interpolate_reference(ref_data, self.num_points))
+        self.ref_index = build_reference_index(self.ref_data)
+        if self.distance is None:
+            self.polyline_index = build_polyline_index(ref_data)
+
+    ##
+    # @brief Oblicza błędy punktów bez uwzględniania grup.
+    # @param points Tablica punktów (szerokość, długość).
+    # @param indices Indeksy najbliższych punktów interpolowanych danych referencyjnych.
+    # @return Wektor błędów.
+    def _point_errors(self, points, indices):
+        if self.distance is None:
+            return cross_track_errors(points, self.polyline_index)
+        return self.distance(points, self.ref_data[indices])
+
+    ##
+    # @brief Dodaje kolejny punkt.
+    # @param smoothed_row Punkt wygładzony w kolejności loader.SMOOTHED_COLUMNS.
+    # @param original_point Odpowiadający mu punkt oryginalny (szerokość, długość) lub None.
+    # @return Wynik GroupResult dla grupy zamkniętej przez ten punkt lub None.
+    def add(self, smoothed_row, original_point=None):
+        group = smoothed_row[4]
+        result = None
+        if self.group is not None and group != self.group:
+            result = self.close_group()
+        if self.ref_data is None:
+            self._prepare_reference(smoothed_row[1:3])
+        self.group = group
+        self.smoothed_buffer.append(smoothed_row[1:3])
+        if original_point is not None:
+            self.original_buffer.append(original_point)
+        return result
+
+    ##
+    # @brief Zamyka bieżącą grupę: liczy błędy jej punktów i błąd grupy.
+    # @return Wynik GroupResult lub None, jeśli nie ma otwartej grupy.
+    def close_group(self):
+        if not self.smoothed_buffer:
+            return None
+        smoothed = np.asarray(self.smoothed_buffer, dtype=np.float64)
+        original = np.asarray(self.original_buffer, dtype=np.float64).reshape(-1, 2)
+        self.smoothed_buffer = []
+        self.original_buffer = []
+
+        distances, indices = query_closest(self.ref_index, self.ref_data, smoothed)
+        self.points['smoothed'].add_many(self._point_errors(smoothed, indices))
+
+        # Punkt reprezentatywny grupy i najbliższy mu punkt oryginalny (jak w evaluation.segmented_groups_errors)
+        representative = int(np.argmin(distances))
+        closest_ref_point = self.ref_data[indices[representative]]
+        error_smoothed = float(euclidean_distances(smoothed[representative], closest_ref_point))
+        self.groups['smoothed'].add_many([error_smoothed])
+
+        error_original = None
+        if len(original):
+            _, original_indices = query_closest(self.ref_index, self.ref_data, original)
+            self.points['original'].add_many(self._point_errors(original, original_indices))
+            closest_original = original[np.argmin(euclidean_distances(original, smoothed[representative]))]
+            error_original = float(euclidean_distances(closest_original, closest_ref_point))
+            self.groups['original'].add_many([error_original])
+
+        return GroupResult(self.group, len(smoothed), error_smoothed, error_original,
+                           self.groups['smoothed'].snapshot(),
+                           self.groups['original'].snapshot() if len(original) else None)
+
+    ##
+    # @brief Zwraca bieżące miary błędów.
+    # @return Słownik {'groups': {'smoothed', 'original'}, 'no_groups': {'smoothed', 'original'}} z obiektami
+    #         ErrorMetrics.
+    def summary(self):
+        return {
+            'groups': {name: accumulator.snapshot() for name, accumulator in self.groups.items()},
+            'no_groups': {name: accumulator.snapshot() for name, accumulator in self.points.items()},
+        }
+
+##
+# @brief Zwraca kolejne pełne linie pliku, czekając na dopisanie nowych linii (jak tail -f).
+# @param file_path Ścieżka do pliku.
+# @param poll_interval Odstęp (w sekundach) pomiędzy sprawdzeniami pliku.
+# @param idle_timeout Czas (w sekundach) bez nowych danych, po którym odczyt się kończy; jeśli None, odczyt trwa
+#                     bez końca.
+# @return Generator linii.
+def follow_lines(file_path, poll_interval=DEFAULT_POLL_INTERVAL, idle_timeout=None):
+    with open(file_path, 'r', encoding='utf-8') as data_file:
+        pending = ''
+        idle = 0.0
+        while True:
+            chunk = data_file.readline()
+            if chunk:
+                idle = 0.0
+                pending += chunk
+                if pending.endswith('\n'):
+                    yield pending
+                    pending = ''
+                continue
+            if idle_timeout is not None and idle >= idle_timeout:
+                break
+            time.sleep(poll_interval)
+            idle += poll_interval
+        if pending:
+            yield pending
+
+##
+# @brief Otwiera źródło linii: plik, rosnący plik lub standardowe wejście ('-').
+# @param path Ścieżka do pliku lub '-'.
+# @param follow Czy czekać na dopisywane linie.
+# @param idle_timeout Czas bez nowych danych, po którym kończy się odczyt rosnącego pliku.
+# @return Iterowalny zbiór linii.
+def open_lines(path, follow=False, idle_timeout=None):
+    if path == '-':
+        return sys.stdin
+    if follow:
+        return follow_lines(path, idle_timeout=idle_timeout)
+    return open(path, 'r', encoding='utf-8')
+
+##
+# @brief Łączy strumienie linii danych wygładzonych i oryginalnych w pary punktów.
+#
+# Punkty łączone są w kolejności wystąpienia (jak w evaluation.group_data_by_original); niepoprawne linie są pomijane.
+# @param smoothed_lines Linie danych wygładzonych.
+# @param original_lines Linie danych oryginalnych lub None.
+# @return Generator par (wiersz danych wygładzonych, punkt oryginalny (szerokość, długość) lub None).
+def iter_points(smoothed_lines, original_lines=None):
+    smoothed_rows = (row for row in map(parse_smoothed_line, smoothed_lines) if row is not None)
+    if original_lines is None:
+        for row in smoothed_rows:
+            yield row, None
+        return
+    original_points = ((point[0], point[1]) for _, point in
+                       (parsed for parsed in map(parse_original_line, original_lines) if parsed is not None))
+    for row in smoothed_rows:
+        yield row, next(original_points, None)
+
+##
+# @brief Wypisuje wynik zamkniętej grupy.
+# @param result Obiekt GroupResult.
+def print_group(result):
+    line = (f"Grupa {result.group} ({result.points} punktów): błąd wygładzonych {result.error_smoothed:.6e}; "
+            f"grupy wygładzone: średni {result.smoothed.mean:.6e}, RMSE {result.smoothed.rmse:.6e}, "
+            f"mediana ~{result.smoothed.median:.6e}")
+    if result.original is not None:
+        line += (f"; błąd oryginalnych {result.error_original:.6e}, grupy oryginalne: średni "
+                 f"{result.original.mean:.6e}, mediana ~{result.original.median:.6e}")
+    print(line, flush=True)
+
+##
+# @brief Przetwarza strumień punktów i wywołuje emit dla każdej zamkniętej grupy.
+# @param evaluator Obiekt OnlineEvaluator.
+# @param points Pary zwracane przez iter_points.
+# @param emit Funkcja przyjmująca GroupResult.
+# @return Miary końcowe (OnlineEvaluator.summary).
+def run_online(evaluator, points, emit=print_group):
+    for smoothed_row, original_point in points:
+        result = evaluator.add(smoothed_row, original_point)
+        if result is not None:
+            emit(result)
+    result = evaluator.close_group()
+    if result is not None:
+        emit(result)
+    return evaluator.summary()
+
+def main():
+    parser = argparse.ArgumentParser(description='Strumieniowa ocena danych wygładzonych.')
+    parser.add_argument('--smoothed', required=True, help="Plik z danymi wygładzonymi lub '-' (standardowe wejście)")
+    parser.add_argument('--original', default=None, help='Plik z danymi oryginalnymi (opcjonalnie)')
+    parser.add_argument('--reference', required=True, help='Plik z danymi referencyjnymi')
+    parser.add_argument('--follow', action='store_true', help='Czekaj na dopisywane punkty (rosnący plik)')
+    parser.add_argument('--idle-timeout', type=float, default=None,
+                        help='Czas w sekundach bez nowych punktów, po którym kończy się odczyt')
+    parser.add_argument('--num-points', type=int, default=DEFAULT_REFERENCE_POINTS,
+                        help='Liczba punktów interpolowanych danych referencyjnych')
+    parser.add_argument('--metric', default='euclidean', choices=('euclidean', 'haversine', 'equirectangular', 'cross_track'))
+    args = parser.parse_args()
+
+    _, ref_columns = load_file(args.reference)
+    evaluator = OnlineEvaluator(reference_array(ref_columns), args.num_points, args.metric)
+    smoothed_lines = open_lines(args.smoothed, args.follow, args.idle_timeout)
+    original_lines = None if args.original is None else open_lines(args.original, args.follow, args.idle_timeout)
+    summary = run_online(evaluator, iter_points(smoothed_lines, original_lines))
+
+    for name, label in (('smoothed', 'wygładzonych'), ('original', 'oryginalnych')):
+        if name == 'original' and args.original is None:
+            continue
+        metrics = summary['no_groups'][name]
+        print(f"Punkty {label}: średni błąd {metrics.mean}, RMSE {metrics.rmse}, mediana ~{metrics.median}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import os
+
+import numpy as np
+
+##
+# \file plotting.py
+# \brief Wykresy punktów, ścieżek, błędów i map gęstości dla jednego zestawu danych.
+#
+# Każda ścieżka rysowana jest jako pojedyncza kolekcja odcinków (LineCollection), a przerwy w ścieżce wyznaczane są
+# wektorowo na podstawie długości odcinków. Ścieżki mogą być uproszczone (simplify.py) z tolerancją w metrach przed
+# rysowaniem; przerwy wyznaczane są wtedy na pełnej rozdzielczości, a ich końce zawsze zachowywane.
+# W trybie bez okien (headless) wykresy zapisywane są do plików PNG/SVG zamiast wyświetlania ich przez plt.show().
+# Moduł matplotlib wczytywany jest dopiero przy tworzeniu wykresu.
+
+## Kolory kolejnych grup
+GROUP_COLORS = ['blue', 'green', 'red', 'cyan', 'magenta', 'yellow', 'black', 'orange', 'purple', 'brown']
+
+## Maksymalna długość odcinka ścieżki referencyjnej, powyżej której odcinek traktowany jest jako przerwa
+MAX_DISTANCE = 0.00018
+
+##
+# @brief Przełącza matplotlib na backend bez okien (Agg), używany przy zapisie wykresów do plików.
+def use_headless():
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+
+##
+# @brief Zwraca moduł matplotlib.pyplot.
+# @return Moduł pyplot.
+def _pyplot():
+    import matplotlib.pyplot as plt
+    return plt
+
+##
+# @brief Buduje odcinki pomiędzy kolejnymi punktami ścieżki, pomijając odcinki dłuższe niż max_distance.
+# @param coords Tablica punktów (x, y).
+# @param max_distance Maksymalna długość odcinka; jeśli None, zwracane są wszystkie odcinki.
+# @param simplify_tolerance Tolerancja uproszczenia ścieżki w metrach (Douglas-Peucker); jeśli None, ścieżka
+#        nie jest upraszczana.
+# @return Tablica odcinków o kształcie (M, 2, 2).
+def path_segments(coords, max_distance=None, simplify_tolerance=None):
+    coords = np.asarray(coords, dtype=np.float64)[:, :2]
+    if max_distance is not None:
+        lengths = np.sqrt(np.sum((coords[1:] - coords[:-1]) ** 2, axis=1))
+        gaps = lengths >= max_distance
+    else:
+        gaps = np.zeros(max(len(coords) - 1, 0), dtype=bool)
+    if simplify_tolerance is not None and len(coords) > 2:
+        from simplify import simplify_indices
+        # Końce przerw są zachowywane, więc uproszczony odcinek jest przerwą tylko wtedy, gdy jest nią odcinek
+        # pełnej ścieżki zaczynający się w tym samym punkcie
+        gap_starts = np.flatnonzero(gaps)
+        indices = simplify_indices(coords, simplify_tolerance, breaks=np.concatenate((gap_starts, gap_starts + 1)))
+        segments = np.stack((coords[indices[:-1]], coords[indices[1:]]), axis=1)
+        return segments[~gaps[indices[:-1]]]
+    segments = np.stack((coords[:-1], coords[1:]), axis=1)
+    return segments[~gaps]
+
+##
+# @brief Rysuje ścieżkę jako pojedynczą kolekcję odcinków.
+# @param ax Oś wykresu.
+# @param coords Tablica punktów (x, y).
+# @param color Kolor ścieżki.
+# @param max_distance Maksymalna długość odcinka (przerwy w ścieżce); jeśli None, rysowane są wszystkie odcinki.
+# @param label Etykieta ścieżki w legendzie.
+# @param simplify_tolerance Tolerancja uproszczenia ścieżki w metrach (opcjonalnie).
+# @return Dodana kolekcja LineCollection.
+def add_path(ax, coords, color, max_distance=None, label=None, simplify_tolerance=None):
+    from matplotlib.collections import LineCollection
+    collection = LineCollection(path_segments(coords, max_distance, simplify_tolerance), colors=color, label=label)
+    ax.add_collection(collection)
+    ax.autoscale_view()
+    return collection
+
+##
+# @brief Wyświetla wykres lub, jeśli podano katalog, zapisuje go do plików i zamyka.
+# @param fig Figura.
+# @param name Nazwa pliku (bez rozszerzenia).
+# @param output_dir Katalog docelowy; jeśli None, wykres jest wyświetlany.
+# @param formats Rozszerzenia plików, np. ('png', 'svg').
+# @return Lista zapisanych ścieżek (pusta przy wyświetlaniu).
+def finish_figure(fig, name, output_dir=None, formats=('png',)):
+    plt = _pyplot()
+    if output_dir is None:
+        plt.show()
+        return []
+    os.makedirs(output_dir, exist_ok=True)
+    paths = [os.path.join(output_dir, f'{name}.{extension}') for extension in formats]
+    for path in paths:
+        fig.savefig(path)
+    plt.close(fig)
+    return paths
+
+##
+# @brief Tworzy wykres punktów oryginalnych z podziałem na grupy.
+# @param grouped_original_data Słownik numer grupy -> tablica punktów oryginalnych (indeks, szerokość, długość).
+# @return Figura.
+def plot_groups(grouped_original_data):
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(10, 7))
+
+    # Rysowanie punktów oryginalnych danych z kolorami grup
+    for group, points in grouped_original_data.items():
+        points = np.asarray(points)
+        ax.scatter(points[:, 1], points[:, 2], label=f'Group {int(group)}',
+                   color=GROUP_COLORS[int(group) % len(GROUP_COLORS)])
+
+    ax.set_xlabel('Latitude')
+    ax.set_ylabel('Longitude')
+    ax.legend(bbox_to_anchor=(1.05, 1.2), loc='upper left')
+    ax.set_title('Wykres punktów oryginalnych z podziałem na grupy.')
+    return fig
+
+##
+# @brief Tworzy wykres punktów i ścieżek: oryginalnej, wygładzonej i referencyjnej.
+# @param original_data Dane oryginalne w formacie (indeks, szerokość, długość).
+# @param smoothed_data Dane wygładzone w formacie (indeks, szerokość, długość, MAE, grupa, czas).
+# @param ref_path Interpolowane dane referencyjne (szerokość, długość).
+# @param max_distance Maksymalna długość odcinka ścieżki referencyjnej.
+# @param simplify_tolerance Tolerancja uproszczenia rysowanych ścieżek w metrach (opcjonalnie).
+# @return Figura.
+def plot_paths(original_data, smoothed_data, ref_path, max_distance=MAX_DISTANCE, simplify_tolerance=None):
+    plt = _pyplot()
+    fig, axs = plt.subplots(1, 2, figsize=(15, 10))
+
+    # Wykres punktowy
+    axs[0].scatter(original_data[:, 1], original_data[:, 2], label='Original points')
+    axs[0].scatter(smoothed_data[:, 1], smoothed_data[:, 2], label='Smoothed points')
+    axs[0].scatter(ref_path[:, 0], ref_path[:, 1], label='Referential points')
+    axs[0].set_xlabel('Latitude')
+    axs[0].set_ylabel('Longitude')
+    axs[0].legend()
+
+    # Wykres linii; punkty wygładzone uporządkowane według grupy i czasu
+    smoothed_data = smoothed_data[np.lexsort((smoothed_data[:, 5], smoothed_data[:, 4]))]
+    add_path(axs[1], original_data[:, 1:3], 'blue', label='Original path', simplify_tolerance=simplify_tolerance)
+    add_path(axs[1], smoothed_data[:, 1:3], 'orange', label='Smoothed path', simplify_tolerance=simplify_tolerance)
+    add_path(axs[1], ref_path, 'green', max_distance=max_distance, label='Referential path',
+             simplify_tolerance=simplify_tolerance)
+
+    axs[1].set_xlabel('Latitude')
+    axs[1].set_ylabel('Longitude')
+    axs[1].legend()
+
+    fig.tight_layout()
+    return fig
+
+##
+# @brief Tworzy wykres błędów kolejnych punktów oraz mapy gęstości punktów wygładzonych i oryginalnych.
+# @param errors Błędy kolejnych punktów danych wygładzonych.
+# @param smoothed_data Dane wygładzone w formacie (indeks, szerokość, długość, MAE, grupa, czas).
+# @param original_data Dane oryginalne w formacie (indeks, szerokość, długość).
+# @param density_grids Para siatek gęstości (density.py) dla danych wygładzonych i oryginalnych; jeśli podano, mapy
+#                      gęstości rysowane są z ich liczników zamiast kubełkowania punktów tego śladu.
+# @return Figura.
+def plot_errors(errors, smoothed_data, original_data, density_grids=None):
+    plt = _pyplot()
+    fig, axs = plt.subplots(1, 3, figsize=(15, 10))
+
+    # Wykres błędów kolejnych punktów
+    axs[0].plot(np.arange(len(errors)), errors, label='Errors')
+    axs[0].set_xlabel('Index')
+    axs[0].set_ylabel('Error')
+    axs[0].legend()
+
+    # Wykres heatmapy
+    for ax, data, grid in zip(axs[1:], (smoothed_data, original_data), density_grids or (None, None)):
+        if grid is None:
+            hb = ax.hexbin(data[:, 1], data[:, 2], gridsize=50, cmap='inferno')
+        else:
+            from density import draw_grid
+            hb = draw_grid(ax, grid)
+        ax.set_xlabel('Latitude')
+        ax.set_ylabel('Longitude')
+        fig.colorbar(hb, ax=ax, label='Frequency')
+
+    fig.tight_layout()
+    return fig
+
+##
+# @brief Tworzy wszystkie trzy wykresy dla wyniku evaluate_track i wyświetla je lub zapisuje do plików.
+# @param original_data Dane oryginalne.
+# @param smoothed_data Dane wygładzone.
+# @param evaluation Słownik zwrócony przez evaluation.evaluate_track.
+# @param output_dir Katalog docelowy; jeśli None, wykresy są wyświetlane.
+# @param prefix Przedrostek nazw plików.
+# @param formats Rozszerzenia plików.
+# @param max_distance Maksymalna długość odcinka ścieżki referencyjnej.
+# @param density_grids Para siatek gęstości dla map gęstości (zob. plot_errors; opcjonalnie).
+# @param simplify_tolerance Tolerancja uproszczenia rysowanych ścieżek w metrach (opcjonalnie).
+# @return Lista zapisanych ścieżek.
+def plot_evaluation(original_data, smoothed_data, evaluation, output_dir=None, prefix='', formats=('png',),
+                    max_distance=MAX_DISTANCE, density_grids=None, simplify_tolerance=None):
+    paths = []
+    paths += finish_figure(plot_groups(evaluation['grouped_original_data']), prefix + 'groups', output_dir, formats)
+    paths += finish_figure(plot_paths(original_data, smoothed_data, evaluation['interpolated_ref_data'],
+                                      max_distance, simplify_tolerance), prefix + 'paths', output_dir, formats)
+    paths += finish_figure(plot_errors(evaluation['no_groups']['smoothed'].errors, smoothed_data, original_data,
+                                       density_grids), prefix + 'errors', output_dir, formats)
+    return paths
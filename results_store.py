@@ -0,0 +1,226 @@
+import argparse
+import csv
+import hashlib
+import json
+import sqlite3
+import time
+
+import numpy as np
+
+from batch import RESULT_COLUMNS
+from track_cache import file_digest
+
+##
+# \file results_store.py
+# \brief Trwała baza wyników oceny (SQLite) z kluczami zależnymi od zawartości plików wejściowych.
+#
+# Każdy wynik (trasa x metoda x ślad) zapisywany jest raz, pod kluczem będącym skrótem zawartości plików
+# oryginalnego, wygładzonego i referencyjnego oraz ustawień oceny (metryka, wersja formatu). Przebieg (run) wskazuje
+# wyniki, które obejmował - zarówno obliczone, jak i ponownie użyte - więc ponowne uruchomienie batch.py --store
+# przelicza tylko kombinacje, których pliki lub ustawienia się zmieniły. Razem z miarami przechowywane są wektory
+# błędów grup i punktów (float64). Tabele mają indeksy na przebiegu, trasie, metodzie i kluczu, dzięki czemu
+# porównanie wyników z wielu przebiegów to jedno zapytanie.
+#
+# Przykład: python batch.py --store results.db
+#           python results_store.py results.db history --route TRASA_1_1S --method Kalman
+
+STORE_VERSION = 1  # Zmiana sposobu liczenia wyników unieważnia zapisane klucze
+
+## Kolumny wyniku zapisywane w tabeli results (nazwy trasy i metody należą do przebiegu - te same pliki mogą
+# występować pod różnymi nazwami)
+_STORED_COLUMNS = tuple(column for column in RESULT_COLUMNS if column not in ('route', 'method'))
+_METRIC_COLUMNS = RESULT_COLUMNS[RESULT_COLUMNS.index('groups') + 1:]
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started TEXT NOT NULL,
+    description TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    input_key TEXT NOT NULL,
+    track TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    points INTEGER,
+    groups INTEGER,
+    {', '.join(f'{column} REAL' for column in _METRIC_COLUMNS)},
+    group_errors BLOB,
+    point_errors BLOB,
+    UNIQUE (input_key, track)
+);
+CREATE TABLE IF NOT EXISTS run_results (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    route TEXT NOT NULL,
+    method TEXT NOT NULL,
+    result_id INTEGER NOT NULL REFERENCES results(id),
+    computed INTEGER NOT NULL,
+    PRIMARY KEY (run_id, route, method, result_id)
+);
+CREATE INDEX IF NOT EXISTS run_results_route_method ON run_results (route, method);
+CREATE INDEX IF NOT EXISTS run_results_result ON run_results (result_id);
+"""
+
+##
+# @brief Otwiera (i w razie potrzeby tworzy) bazę wyników.
+# @param store_path Ścieżka do pliku bazy SQLite.
+# @return Połączenie sqlite3 (wiersze jako sqlite3.Row).
+def open_store(store_path):
+    connection = sqlite3.connect(store_path)
+    connection.row_factory = sqlite3.Row
+    connection.executescript(_SCHEMA)
+    return connection
+
+##
+# @brief Wyznacza klucz wyniku z zawartości plików wejściowych i ustawień oceny.
+# @param original_path Plik z danymi oryginalnymi.
+# @param smoothed_path Plik z danymi wygładzonymi.
+# @param reference_path Plik z danymi referencyjnymi.
+# @param metric Metryka błędów bez uwzględniania grup.
+# @param digests Słownik ścieżka -> skrót zawartości, uzupełniany i używany, aby każdy plik czytać raz (opcjonalnie).
+# @return Skrót SHA-1 (szesnastkowy).
+def result_key(original_path, smoothed_path, reference_path, metric, digests=None):
+    digests = {} if digests is None else digests
+    parts = []
+    for path in (original_path, smoothed_path, reference_path):
+        if path not in digests:
+            digests[path] = file_digest(path)
+        parts.append(digests[path])
+    return hashlib.sha1('\0'.join(parts + [metric, str(STORE_VERSION)]).encode('utf-8')).hexdigest()
+
+##
+# @brief Rozpoczyna nowy przebieg.
+# @param connection Połączenie z bazą.
+# @param description Opis przebiegu (opcjonalnie).
+# @return Numer przebiegu.
+def start_run(connection, description=None):
+    with connection:
+        cursor = connection.execute('INSERT INTO runs (started, description) VALUES (?, ?)',
+                                    (time.strftime('%Y-%m-%dT%H:%M:%S'), description))
+    return cursor.lastrowid
+
+##
+# @brief Dołącza do przebiegu zapisane wcześniej wyniki o podanym kluczu.
+# @param connection Połączenie z bazą.
+# @param run_id Numer przebiegu.
+# @param input_key Klucz wyniku.
+# @param route Nazwa trasy w bieżącym przebiegu.
+# @param method Nazwa metody w bieżącym przebiegu.
+# @return Lista wierszy tabeli wyników (batch.RESULT_COLUMNS) lub None, jeśli klucza nie ma w bazie.
+def reuse_results(connection, run_id, input_key, route, method):
+    stored = connection.execute('SELECT * FROM results WHERE input_key = ? ORDER BY track DESC',
+                                (input_key,)).fetchall()
+    if not stored:
+        return None
+    with connection:
+        connection.executemany('INSERT OR IGNORE INTO run_results (run_id, route, method, result_id, computed) '
+                               'VALUES (?, ?, ?, ?, 0)', [(run_id, route, method, row['id']) for row in stored])
+    return [dict({column: row[column] for column in _STORED_COLUMNS}, route=route, method=method) for row in stored]
+
+##
+# @brief Odczytuje wektory błędów zapisanych wyników o podanym kluczu.
+# @param connection Połączenie z bazą.
+# @param input_key Klucz wyniku.
+# @return Słownik ślad -> (wektor błędów grup, wektor błędów punktów).
+def stored_errors(connection, input_key):
+    return {row['track']: result_errors(row) for row in
+            connection.execute('SELECT * FROM results WHERE input_key = ?', (input_key,))}
+
+##
+# @brief Zapisuje obliczone wyniki jednej kombinacji trasa x metoda.
+# @param connection Połączenie z bazą.
+# @param run_id Numer przebiegu.
+# @param input_key Klucz wyniku.
+# @param rows Wiersze tabeli wyników (po jednym na ślad).
+# @param errors Słownik ślad -> (wektor błędów grup, wektor błędów punktów) (opcjonalnie).
+def store_results(connection, run_id, input_key, rows, errors=None):
+    errors = errors or {}
+    columns = ('input_key',) + _STORED_COLUMNS + ('group_errors', 'point_errors')
+    with connection:
+        for row in rows:
+            group_errors, point_errors = errors.get(row['track'], (None, None))
+            values = [input_key] + [row[column] for column in _STORED_COLUMNS] + [
+                _blob(group_errors), _blob(point_errors)]
+            # Te same pliki mogą występować w kilku trasach lub metodach - wynik zapisywany jest raz
+            connection.execute(
+                f"INSERT OR IGNORE INTO results ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                values)
+            result_id = connection.execute('SELECT id FROM results WHERE input_key = ? AND track = ?',
+                                           (input_key, row['track'])).fetchone()['id']
+            connection.execute('INSERT OR IGNORE INTO run_results (run_id, route, method, result_id, computed) '
+                               'VALUES (?, ?, ?, ?, 1)', (run_id, row['route'], row['method'], result_id))
+
+##
+# @brief Zamienia wektor błędów na BLOB.
+def _blob(values):
+    return None if values is None else np.ascontiguousarray(values, dtype=np.float64).tobytes()
+
+##
+# @brief Odczytuje wektory błędów wyniku.
+# @param row Wiersz tabeli results.
+# @return Krotka (wektor błędów grup, wektor błędów punktów); brakujące wektory to None.
+def result_errors(row):
+    return tuple(None if row[column] is None else np.frombuffer(row[column], dtype=np.float64)
+                 for column in ('group_errors', 'point_errors'))
+
+##
+# @brief Zwraca wyniki z wielu przebiegów jednym zapytaniem.
+# @param connection Połączenie z bazą.
+# @param route Nazwa trasy (opcjonalnie).
+# @param method Nazwa metody (opcjonalnie).
+# @param track Ślad: 'smoothed' lub 'original' (opcjonalnie).
+# @param run_id Numer przebiegu (opcjonalnie).
+# @return Lista wierszy (sqlite3.Row) z kolumnami wyników oraz run, started i computed, w kolejności przebiegów.
+def query_results(connection, route=None, method=None, track=None, run_id=None):
+    conditions, values = [], []
+    for column, value in (('run_results.route', route), ('run_results.method', method), ('results.track', track),
+                          ('run_results.run_id', run_id)):
+        if value is not None:
+            conditions.append(f'{column} = ?')
+            values.append(value)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    return connection.execute(
+        f'SELECT results.*, run_results.route, run_results.method, run_results.run_id AS run, runs.started, '
+        f'run_results.computed FROM run_results JOIN results ON results.id = run_results.result_id '
+        f'JOIN runs ON runs.id = run_results.run_id {where} '
+        f'ORDER BY run_results.run_id, run_results.route, run_results.method, results.track DESC', values).fetchall()
+
+def main():
+    parser = argparse.ArgumentParser(description='Przeglądanie bazy wyników oceny.')
+    parser.add_argument('store', help='Plik bazy SQLite')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('runs', help='Lista przebiegów')
+    history = commands.add_parser('history', help='Wyniki z wszystkich przebiegów')
+    export = commands.add_parser('export', help='Eksport wyników przebiegu do CSV (format batch.py)')
+    for command in (history, export):
+        command.add_argument('--route', default=None)
+        command.add_argument('--method', default=None)
+        command.add_argument('--track', default=None, choices=('smoothed', 'original'))
+        command.add_argument('--run', type=int, default=None, help='Numer przebiegu')
+    export.add_argument('--output', default='results.csv', help='Plik wynikowy CSV')
+    args = parser.parse_args()
+
+    connection = open_store(args.store)
+    if args.command == 'runs':
+        for row in connection.execute(
+                'SELECT runs.id, runs.started, runs.description, COUNT(run_results.result_id) AS results, '
+                'COALESCE(SUM(run_results.computed), 0) AS computed FROM runs '
+                'LEFT JOIN run_results ON run_results.run_id = runs.id GROUP BY runs.id ORDER BY runs.id'):
+            print(f"{row['id']:>4}  {row['started']}  wyniki: {row['results']}, obliczone: {row['computed']}  "
+                  f"{row['description'] or ''}")
+        return
+
+    rows = query_results(connection, args.route, args.method, args.track, args.run)
+    if args.command == 'export':
+        with open(args.output, 'w', newline='') as output_file:
+            writer = csv.DictWriter(output_file, fieldnames=RESULT_COLUMNS)
+            writer.writeheader()
+            writer.writerows({column: row[column] for column in RESULT_COLUMNS} for row in rows)
+        print(f"Zapisano {len(rows)} wierszy do {args.output}")
+        return
+    for row in rows:
+        print(json.dumps({'run': row['run'], 'started': row['started'], 'computed': bool(row['computed']),
+                          **{column: row[column] for column in RESULT_COLUMNS}}))
+
+if __name__ == "__main__":
+    main()
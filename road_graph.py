@@ -0,0 +1,142 @@
+import xml.etree.ElementTree as ET
+from array import array
+from collections import namedtuple
+
+import numpy as np
+
+##
+# \file road_graph.py
+# \brief Zwarty graf dróg budowany strumieniowo z pliku OpenStreetMap (map.osm).
+#
+# Plik czytany jest jednokrotnie przez ElementTree.iterparse, a przetworzone elementy są od razu usuwane z drzewa,
+# więc pamięć nie rośnie z rozmiarem pliku. Graf przechowywany jest w tablicach NumPy: identyfikatory i współrzędne
+# węzłów leżących na drogach oraz krawędzie (pary numerów węzłów) z identyfikatorem drogi OSM. Dzięki temu graf można
+# zapisać w binarnej pamięci podręcznej (track_cache.py) i odczytać przez mapowanie pamięci.
+
+DEFAULT_OSM_FILE = 'map.osm'
+
+## Wartości znacznika highway, które nie opisują przejezdnej drogi
+EXCLUDED_HIGHWAYS = frozenset(('proposed', 'construction', 'abandoned', 'razed', 'platform', 'bus_stop', 'elevator'))
+
+## Kolumny grafu dróg zapisywane w pamięci podręcznej
+GRAPH_COLUMNS = ('node_ids', 'lat', 'lon', 'edge_starts', 'edge_ends', 'edge_ways')
+
+## Graf dróg: identyfikatory OSM węzłów, współrzędne węzłów (szerokość, długość) oraz krawędzie jako numery węzłów
+# początkowych i końcowych z identyfikatorem drogi OSM, do której należą
+RoadGraph = namedtuple('RoadGraph', ['node_ids', 'coords', 'edge_starts', 'edge_ends', 'edge_ways'])
+
+##
+# @brief Sprawdza, czy droga o podanych znacznikach należy do sieci dróg.
+# @param tags Słownik znaczników drogi OSM.
+# @param highways Dopuszczalne wartości znacznika highway; jeśli None, dopuszczane są wszystkie poza EXCLUDED_HIGHWAYS.
+# @return True, jeśli droga ma trafić do grafu.
+def is_road(tags, highways=None):
+    highway = tags.get('highway')
+    if highway is None or tags.get('area') == 'yes':
+        return False
+    if highways is None:
+        return highway not in EXCLUDED_HIGHWAYS
+    return highway in highways
+
+##
+# @brief Wczytuje węzły i drogi z pliku OSM w jednym przebiegu.
+# @param osm_path Ścieżka do pliku .osm.
+# @param highways Dopuszczalne wartości znacznika highway (zob. is_road).
+# @return Słownik kolumn: 'node_ids', 'lat', 'lon' (wszystkie węzły), 'way_ids', 'way_offsets' (granice dróg
+#         w 'way_nodes') i 'way_nodes' (identyfikatory węzłów kolejnych dróg).
+def parse_osm(osm_path, highways=None):
+    node_ids, lats, lons = array('q'), array('d'), array('d')
+    way_ids, way_offsets, way_nodes = array('q'), array('q', [0]), array('q')
+
+    root = None
+    for event, element in ET.iterparse(osm_path, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = element
+            continue
+        if element.tag == 'node':
+            node_ids.append(int(element.get('id')))
+            lats.append(float(element.get('lat')))
+            lons.append(float(element.get('lon')))
+        elif element.tag == 'way':
+            tags = {tag.get('k'): tag.get('v') for tag in element.iterfind('tag')}
+            if is_road(tags, highways):
+                way_ids.append(int(element.get('id')))
+                way_nodes.extend(int(nd.get('ref')) for nd in element.iterfind('nd'))
+                way_offsets.append(len(way_nodes))
+        elif element.tag not in ('relation', 'osm'):
+            continue
+        # Usunięcie przetworzonego elementu najwyższego poziomu z drzewa
+        root.clear()
+
+    return {
+        'node_ids': np.frombuffer(node_ids, dtype=np.int64),
+        'lat': np.frombuffer(lats, dtype=np.float64),
+        'lon': np.frombuffer(lons, dtype=np.float64),
+        'way_ids': np.frombuffer(way_ids, dtype=np.int64),
+        'way_offsets': np.frombuffer(way_offsets, dtype=np.int64),
+        'way_nodes': np.frombuffer(way_nodes, dtype=np.int64),
+    }
+
+##
+# @brief Buduje kolumny grafu dróg z wyniku parse_osm.
+#
+# Krawędziami są kolejne pary węzłów każdej drogi; pary, w których brakuje węzła w pliku, są pomijane. W grafie
+# zostają tylko węzły leżące na drogach, ponumerowane od zera.
+# @param osm Słownik zwrócony przez parse_osm.
+# @return Słownik kolumn GRAPH_COLUMNS.
+def build_graph_columns(osm):
+    order = np.argsort(osm['node_ids'], kind='stable')
+    sorted_ids = osm['node_ids'][order]
+    way_nodes = osm['way_nodes']
+
+    positions = np.minimum(np.searchsorted(sorted_ids, way_nodes), max(len(sorted_ids) - 1, 0))
+    known = sorted_ids[positions] == way_nodes if len(sorted_ids) else np.zeros(len(way_nodes), dtype=bool)
+    node_rows = order[positions] if len(sorted_ids) else positions
+
+    # Para (i, i + 1) jest krawędzią, jeśli oba węzły należą do tej samej drogi i występują w pliku
+    way_of_node = np.repeat(np.arange(len(osm['way_ids'])), np.diff(osm['way_offsets']))
+    pairs = np.flatnonzero((way_of_node[:-1] == way_of_node[1:]) & known[:-1] & known[1:])
+
+    used, inverse = np.unique(np.concatenate((node_rows[pairs], node_rows[pairs + 1])), return_inverse=True)
+    inverse = inverse.ravel()
+    return {
+        'node_ids': osm['node_ids'][used],
+        'lat': osm['lat'][used],
+        'lon': osm['lon'][used],
+        'edge_starts': inverse[:len(pairs)].astype(np.int64),
+        'edge_ends': inverse[len(pairs):].astype(np.int64),
+        'edge_ways': osm['way_ids'][way_of_node[pairs]],
+    }
+
+##
+# @brief Składa graf dróg z kolumn.
+# @param columns Słownik kolumn GRAPH_COLUMNS.
+# @return Obiekt RoadGraph.
+def graph_from_columns(columns):
+    return RoadGraph(np.asarray(columns['node_ids']), np.column_stack((columns['lat'], columns['lon'])),
+                     np.asarray(columns['edge_starts']), np.asarray(columns['edge_ends']),
+                     np.asarray(columns['edge_ways']))
+
+##
+# @brief Wczytuje graf dróg z pliku OSM, opcjonalnie korzystając z binarnej pamięci podręcznej.
+# @param osm_path Ścieżka do pliku .osm.
+# @param highways Dopuszczalne wartości znacznika highway (zob. is_road).
+# @param cache_dir Katalog pamięci podręcznej (track_cache.py); jeśli None, plik jest zawsze parsowany.
+# @return Obiekt RoadGraph.
+def load_road_graph(osm_path=DEFAULT_OSM_FILE, highways=None, cache_dir=None):
+    def compute():
+        return build_graph_columns(parse_osm(osm_path, highways))
+
+    if cache_dir is None:
+        return graph_from_columns(compute())
+    from track_cache import cached_file_columns
+    params = () if highways is None else tuple(sorted(highways))
+    return graph_from_columns(cached_file_columns(osm_path, 'road_graph', params, compute, cache_dir))
+
+##
+# @brief Zwraca współrzędne początków i końców wszystkich krawędzi grafu.
+# @param graph Graf dróg.
+# @return Krotka tablic (początki, końce) w formacie (szerokość, długość).
+def edge_coords(graph):
+    return graph.coords[graph.edge_starts], graph.coords[graph.edge_ends]
@@ -0,0 +1,164 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from cross_track import build_polyline_index, project_on_polyline
+from evaluation import evaluate_track, summarize_groups_errors
+from geo import from_local_metres, haversine_distances
+from metrics import summarize_errors
+
+##
+# \file segmentation.py
+# \brief Podział śladów na odcinki w miejscach przerw w nagraniu i równoległa ocena odcinków.
+#
+# Ślad dzielony jest tam, gdzie odstęp czasu pomiędzy kolejnymi punktami (pole Time) lub odległość pomiędzy nimi
+# przekracza próg; granice wyznaczane są wektorowo z różnic kolejnych wartości. Każdy odcinek oceniany jest osobno
+# (interpolacja, błędy, wykresy) w puli procesów, względem fragmentu łamanej referencyjnej pomiędzy rzutami
+# pierwszego i ostatniego punktu odcinka, a wyniki odcinków są łączone w jedną ocenę całego śladu.
+#
+# Przykład: python segmentation.py --config config.yaml --workers 4 --figures odcinki
+
+DEFAULT_GAP_FACTOR = 3.0  # Przerwa: odstęp czasu większy niż tyle median odstępów pomiędzy punktami
+DEFAULT_MAX_JUMP = 40.0  # Przerwa: odległość (w metrach) pomiędzy kolejnymi punktami
+MIN_SEGMENT_POINTS = 2  # Odcinki krótsze są pomijane
+MIN_REFERENCE_LENGTH = 1.0  # Odcinki, których rzut na łamaną referencyjną jest krótszy (w metrach), są pomijane
+
+##
+# @brief Wyznacza granice odcinków śladu.
+# @param times Czasy kolejnych punktów (w milisekundach).
+# @param coords Tablica punktów (szerokość, długość).
+# @param max_time_gap Maksymalny odstęp czasu (w milisekundach); jeśli None, gap_factor razy mediana odstępów.
+# @param max_jump Maksymalna odległość (w metrach) pomiędzy kolejnymi punktami odcinka.
+# @param gap_factor Mnożnik mediany odstępów czasu używany, gdy nie podano max_time_gap.
+# @return Wektor granic odcinków [0, ..., N] (jak GroupIndex.offsets).
+def split_offsets(times, coords, max_time_gap=None, max_jump=DEFAULT_MAX_JUMP, gap_factor=DEFAULT_GAP_FACTOR):
+    times = np.asarray(times, dtype=np.float64)
+    coords = np.asarray(coords, dtype=np.float64)[:, :2]
+    if len(coords) < 2:
+        return np.array([0, len(coords)])
+    intervals = np.diff(times)
+    if max_time_gap is None:
+        valid = intervals[intervals > 0]
+        max_time_gap = gap_factor * np.median(valid) if len(valid) else np.inf
+    breaks = (intervals > max_time_gap) | (haversine_distances(coords[:-1], coords[1:]) > max_jump)
+    return np.concatenate(([0], np.flatnonzero(breaks) + 1, [len(coords)]))
+
+##
+# @brief Wycina fragment łamanej pomiędzy dwoma położeniami wzdłuż łamanej.
+# @param index Indeks łamanej (cross_track.PolylineIndex).
+# @param start Położenie początku fragmentu wzdłuż łamanej (w metrach).
+# @param end Położenie końca fragmentu wzdłuż łamanej (w metrach).
+# @return Tablica punktów fragmentu (szerokość, długość).
+def cut_polyline(index, start, end):
+    starts = index.segments.starts
+    ends = index.segments.ends
+    vertices = np.vstack((starts, ends[-1:]))
+    along = np.append(index.offsets, index.offsets[-1] + np.sqrt(np.sum((ends[-1] - starts[-1]) ** 2)))
+    inner = vertices[(along > start) & (along < end)]
+    bounds = np.column_stack((np.interp((start, end), along, vertices[:, 0]),
+                              np.interp((start, end), along, vertices[:, 1])))
+    return from_local_metres(np.vstack((bounds[:1], inner, bounds[1:])), index.origin)
+
+##
+# @brief Ocenia jeden odcinek śladu (funkcja wykonywana w procesie roboczym).
+# @param job Krotka (numer odcinka, dane oryginalne, dane wygładzone, fragment danych referencyjnych, metryka,
+#            katalog wykresów lub None).
+# @return Krotka (numer odcinka, słownik zwrócony przez evaluate_track bez danych pośrednich).
+def evaluate_segment(job):
+    number, original_data, smoothed_data, ref_data, metric, figures_dir = job
+    evaluation = evaluate_track(original_data, smoothed_data, ref_data, metric=metric)
+    if figures_dir is not None:
+        from plotting import plot_evaluation, use_headless
+        use_headless()
+        plot_evaluation(original_data, smoothed_data, evaluation, figures_dir, prefix=f'segment_{number}_')
+    return number, {key: evaluation[key] for key in ('groups', 'group_errors', 'no_groups')}
+
+##
+# @brief Dzieli ślad na odcinki i ocenia je równolegle.
+# @param original_data Dane oryginalne w formacie (indeks, szerokość, długość).
+# @param smoothed_data Dane wygładzone w formacie (indeks, szerokość, długość, MAE, grupa, czas).
+# @param ref_data Dane referencyjne (szerokość, długość) całej trasy.
+# @param metric Metryka błędów bez uwzględniania grup.
+# @param workers Liczba procesów; jeśli None, liczba rdzeni.
+# @param figures_dir Katalog, do którego zapisywane są wykresy odcinków (opcjonalnie).
+# @param max_time_gap Maksymalny odstęp czasu w milisekundach (zob. split_offsets).
+# @param max_jump Maksymalna odległość pomiędzy kolejnymi punktami w metrach.
+# @return Krotka (granice odcinków, lista wyników odcinków (None dla odcinków pominiętych), wynik połączony).
+def evaluate_segments(original_data, smoothed_data, ref_data, metric='euclidean', workers=None, figures_dir=None,
+                      max_time_gap=None, max_jump=DEFAULT_MAX_JUMP):
+    num_points = min(len(original_data), len(smoothed_data))
+    original_data = np.asarray(original_data)[:num_points]
+    smoothed_data = np.asarray(smoothed_data)[:num_points]
+    offsets = split_offsets(smoothed_data[:, 5], original_data[:, 1:3], max_time_gap, max_jump)
+    polyline = build_polyline_index(ref_data)
+
+    jobs = []
+    for number, (start, end) in enumerate(zip(offsets[:-1], offsets[1:])):
+        if end - start < MIN_SEGMENT_POINTS:
+            continue
+        along = project_on_polyline(polyline, smoothed_data[start:end, 1:3]).along_track
+        if along.max() - along.min() < MIN_REFERENCE_LENGTH:
+            continue
+        segment_ref = cut_polyline(polyline, along.min(), along.max())
+        jobs.append((number, original_data[start:end], smoothed_data[start:end], segment_ref, metric, figures_dir))
+
+    if not jobs:
+        raise ValueError('Brak odcinków do oceny')
+    results = [None] * (len(offsets) - 1)
+    if workers == 1:
+        for number, evaluation in map(evaluate_segment, jobs):
+            results[number] = evaluation
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for number, evaluation in executor.map(evaluate_segment, jobs):
+                results[number] = evaluation
+    return offsets, results, merge_evaluations([result for result in results if result is not None])
+
+##
+# @brief Łączy wyniki odcinków w jedną ocenę śladu.
+# @param evaluations Lista wyników evaluate_segment.
+# @return Słownik z kluczami 'groups' i 'no_groups' w formacie evaluate_track.
+def merge_evaluations(evaluations):
+    errors_smoothed = np.concatenate([evaluation['group_errors'][0] for evaluation in evaluations])
+    errors_original = np.concatenate([evaluation['group_errors'][1] for evaluation in evaluations])
+    no_groups = {track: summarize_errors(np.concatenate([evaluation['no_groups'][track].errors
+                                                         for evaluation in evaluations]))
+                 for track in evaluations[0]['no_groups']}
+    return {'groups': summarize_groups_errors(errors_smoothed, errors_original),
+            'group_errors': (errors_smoothed, errors_original), 'no_groups': no_groups}
+
+def main():
+    from main import DEFAULT_CONFIG_PATH, load_config, load_tracks
+
+    parser = argparse.ArgumentParser(description='Ocena śladu podzielonego na odcinki w miejscach przerw.')
+    parser.add_argument('--config', default=DEFAULT_CONFIG_PATH, help='Plik konfiguracyjny')
+    parser.add_argument('--workers', type=int, default=None, help='Liczba procesów')
+    parser.add_argument('--max-time-gap', type=float, default=None,
+                        help='Maksymalny odstęp czasu w milisekundach (domyślnie 3 mediany odstępów)')
+    parser.add_argument('--max-jump', type=float, default=DEFAULT_MAX_JUMP,
+                        help='Maksymalna odległość pomiędzy kolejnymi punktami w metrach')
+    parser.add_argument('--figures', default=None, help='Katalog, do którego zapisywane są wykresy odcinków')
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    original_data, smoothed_data, ref_data = load_tracks(config)
+    if args.figures is not None:
+        os.makedirs(args.figures, exist_ok=True)
+    offsets, results, merged = evaluate_segments(original_data, smoothed_data, ref_data,
+                                                 config.get('metric', 'euclidean'), args.workers, args.figures,
+                                                 args.max_time_gap, args.max_jump)
+    for number, (start, end) in enumerate(zip(offsets[:-1], offsets[1:])):
+        if results[number] is None:
+            print(f"Odcinek {number}: punkty {start}-{end - 1}, pominięty")
+            continue
+        print(f"Odcinek {number}: punkty {start}-{end - 1}, średni błąd grup {results[number]['groups'][0]}, "
+              f"średni błąd bez grup {results[number]['no_groups']['smoothed'].mean}")
+    print("Średni błąd najlepszych z grup wygładzonych: ", merged['groups'][0])
+    print("Średni błąd najlepszych z grup oryginalnych: ", merged['groups'][1])
+    print("Średni błąd bez uwzględniania grup danych wygładzonych: ", merged['no_groups']['smoothed'].mean)
+    print("Średni błąd bez uwzględniania grup danych oryginalnych: ", merged['no_groups']['original'].mean)
+
+if __name__ == "__main__":
+    main()
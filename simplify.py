@@ -0,0 +1,188 @@
+import argparse
+import heapq
+import os
+
+import numpy as np
+
+from geo import to_local_metres
+from grouping import segment_argmin, segment_ids
+
+##
+# \file simplify.py
+# \brief Upraszczanie śladów (Douglas-Peucker, Visvalingam-Whyatt) z tolerancją w metrach.
+#
+# Uproszczenie zwraca indeksy zachowanych punktów pełnego śladu, więc każdy punkt uproszczonego śladu wskazuje
+# punkt oryginalny, a każdy punkt pełnego śladu można przypisać do odcinka uproszczonego śladu (simplified_segments).
+# Błędy nadal liczone są na pełnej rozdzielczości; uproszczenie służy do rysowania (mniej odcinków w LineCollection),
+# zapisu (mniej bajtów) i wyszukiwania najbliższego odcinka łamanej referencyjnej (mniej odcinków w indeksie).
+#
+# Douglas-Peucker wykonywany jest poziomami: w każdej iteracji odległości wszystkich punktów wewnętrznych wszystkich
+# otwartych przedziałów liczone są jedną operacją wektorową, a przedziały z punktem dalszym niż tolerancja dzielone
+# są w tym punkcie. Visvalingam-Whyatt (kolejka priorytetowa) usuwa kolejno punkty o najmniejszym polu trójkąta,
+# dopóki pole jest mniejsze niż kwadrat tolerancji.
+#
+# Przykład: python simplify.py "smoothed Kalman.txt" --tolerance 2 --output uproszczone.txt --index-output indeksy.npy
+
+DOUGLAS_PEUCKER = 'douglas-peucker'
+VISVALINGAM = 'visvalingam'
+SIMPLIFY_METHODS = (DOUGLAS_PEUCKER, VISVALINGAM)
+
+DEFAULT_TOLERANCE = 1.0  # Tolerancja w metrach
+
+##
+# @brief Wyznacza odległości punktów od odcinków (w układzie płaskim).
+# @param points Tablica punktów (x, y).
+# @param starts Początki odcinków (x, y).
+# @param ends Końce odcinków (x, y).
+# @return Wektor odległości.
+def _segment_distances(points, starts, ends):
+    direction = ends - starts
+    length2 = np.sum(direction ** 2, axis=1)
+    safe_length2 = np.where(length2 > 0, length2, 1.0)
+    fractions = np.clip(np.sum((points - starts) * direction, axis=1) / safe_length2, 0.0, 1.0)
+    fractions = np.where(length2 > 0, fractions, 0.0)
+    return np.sqrt(np.sum((points - starts - fractions[:, None] * direction) ** 2, axis=1))
+
+##
+# @brief Upraszcza łamaną algorytmem Douglasa-Peuckera (wektorowo, poziomami).
+# @param points Tablica punktów (x, y) w metrach.
+# @param tolerance Maksymalna odległość pominiętego punktu od uproszczonej łamanej (w metrach).
+# @param breaks Indeksy punktów, które muszą zostać zachowane (np. końce odcinków pomiędzy przerwami).
+# @return Wektor bool: czy punkt jest zachowany.
+def douglas_peucker(points, tolerance, breaks=()):
+    points = np.asarray(points, dtype=np.float64)
+    keep = np.zeros(len(points), dtype=bool)
+    if len(points) == 0:
+        return keep
+    fixed = np.unique(np.concatenate(([0, len(points) - 1], np.asarray(breaks, dtype=np.int64))))
+    keep[fixed] = True
+    lo, hi = fixed[:-1], fixed[1:]
+    while True:
+        open_ranges = hi - lo > 1
+        lo, hi = lo[open_ranges], hi[open_ranges]
+        if not len(lo):
+            return keep
+        # Punkty wewnętrzne wszystkich przedziałów, uporządkowane według przedziałów
+        sizes = hi - lo - 1
+        offsets = np.concatenate(([0], np.cumsum(sizes)))
+        ranges = segment_ids(offsets)
+        inner = lo[ranges] + 1 + np.arange(offsets[-1]) - offsets[ranges]
+        distances = _segment_distances(points[inner], points[lo[ranges]], points[hi[ranges]])
+        farthest = segment_argmin(-distances, offsets)
+        split = distances[farthest] > tolerance
+        middle = inner[farthest[split]]
+        keep[middle] = True
+        lo, hi = np.concatenate((lo[split], middle)), np.concatenate((middle, hi[split]))
+
+##
+# @brief Upraszcza łamaną algorytmem Visvalingama-Whyatta.
+# @param points Tablica punktów (x, y) w metrach.
+# @param tolerance Punkty, których efektywne pole trójkąta jest mniejsze niż tolerance^2 (m^2), są usuwane.
+# @param breaks Indeksy punktów, które muszą zostać zachowane.
+# @return Wektor bool: czy punkt jest zachowany.
+def visvalingam(points, tolerance, breaks=()):
+    points = np.asarray(points, dtype=np.float64)
+    count = len(points)
+    keep = np.ones(count, dtype=bool)
+    if count < 3:
+        return keep
+    fixed = np.zeros(count, dtype=bool)
+    fixed[[0, count - 1]] = True
+    fixed[np.asarray(breaks, dtype=np.int64)] = True
+    previous = np.arange(-1, count - 1)
+    following = np.arange(1, count + 1)
+    xs, ys = points[:, 0].tolist(), points[:, 1].tolist()
+
+    def area(index):
+        a, c = previous[index], following[index]
+        return abs((xs[a] - xs[index]) * (ys[c] - ys[index]) - (xs[c] - xs[index]) * (ys[a] - ys[index])) / 2.0
+
+    # Pola początkowe liczone wektorowo
+    before, after = points[:-2] - points[1:-1], points[2:] - points[1:-1]
+    cross = np.abs(before[:, 0] * after[:, 1] - after[:, 0] * before[:, 1]) / 2.0
+    areas = np.concatenate(([np.inf], cross, [np.inf]))
+    threshold = tolerance ** 2
+    heap = [(value, index) for index, value in enumerate(areas.tolist()) if not fixed[index] and value < threshold]
+    heapq.heapify(heap)
+    current = areas.tolist()
+    floor = 0.0
+    while heap:
+        value, index = heapq.heappop(heap)
+        if not keep[index] or value != current[index]:
+            continue
+        # Efektywne pole nie maleje (punkt nie może zostać usunięty przed sąsiadem o większym polu)
+        floor = max(floor, value)
+        keep[index] = False
+        a, c = previous[index], following[index]
+        following[a], previous[c] = c, a
+        for neighbour in (a, c):
+            if fixed[neighbour]:
+                continue
+            current[neighbour] = max(area(neighbour), floor)
+            if current[neighbour] < threshold:
+                heapq.heappush(heap, (current[neighbour], neighbour))
+    return keep
+
+SIMPLIFIERS = {DOUGLAS_PEUCKER: douglas_peucker, VISVALINGAM: visvalingam}
+
+##
+# @brief Upraszcza ślad podany we współrzędnych geograficznych.
+# @param coords Tablica punktów (szerokość, długość).
+# @param tolerance Tolerancja w metrach.
+# @param method DOUGLAS_PEUCKER lub VISVALINGAM.
+# @param breaks Indeksy punktów, które muszą zostać zachowane.
+# @return Posortowany wektor indeksów zachowanych punktów (zawsze z pierwszym i ostatnim punktem).
+def simplify_indices(coords, tolerance=DEFAULT_TOLERANCE, method=DOUGLAS_PEUCKER, breaks=()):
+    try:
+        simplifier = SIMPLIFIERS[method]
+    except KeyError:
+        raise ValueError(f'Nieznana metoda upraszczania: {method}') from None
+    coords = np.asarray(coords, dtype=np.float64)[:, :2]
+    if len(coords) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.flatnonzero(simplifier(to_local_metres(coords, coords.mean(axis=0)), tolerance, breaks))
+
+##
+# @brief Przypisuje każdy punkt pełnego śladu do odcinka uproszczonego śladu.
+# @param indices Indeksy zachowanych punktów (simplify_indices).
+# @param num_points Liczba punktów pełnego śladu.
+# @return Wektor numerów odcinków uproszczonego śladu (odcinek i łączy punkty indices[i] i indices[i + 1]).
+def simplified_segments(indices, num_points):
+    return np.clip(np.searchsorted(indices, np.arange(num_points), side='right') - 1, 0, max(len(indices) - 2, 0))
+
+def main():
+    from loader import ORIGINAL, REFERENCE, SMOOTHED, load_file
+
+    parser = argparse.ArgumentParser(description='Upraszczanie śladu z tolerancją w metrach.')
+    parser.add_argument('input', help='Plik z danymi oryginalnymi, wygładzonymi lub referencyjnymi')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='Tolerancja w metrach')
+    parser.add_argument('--method', default=DOUGLAS_PEUCKER, choices=SIMPLIFY_METHODS)
+    parser.add_argument('--output', default=None, help='Plik wynikowy w formacie pliku wejściowego')
+    parser.add_argument('--index-output', default=None,
+                        help='Plik .npy z indeksami zachowanych punktów w pełnym śladzie')
+    args = parser.parse_args()
+
+    role, columns = load_file(args.input)
+    if role is None:
+        parser.error(f'nieznany format pliku: {args.input}')
+    coords = np.column_stack((columns['lat'], columns['lon']))
+    indices = simplify_indices(coords, args.tolerance, args.method)
+    print(f"Zachowano {len(indices)} z {len(coords)} punktów ({args.method}, tolerancja {args.tolerance} m)")
+    if args.index_output is not None:
+        np.save(args.index_output, indices)
+    if args.output is not None:
+        simplified = {name: np.asarray(values)[indices] for name, values in columns.items()}
+        if role == ORIGINAL:
+            from benchmark import write_original
+            write_original(simplified, args.output)
+        elif role == SMOOTHED:
+            from smoothing import write_smoothed
+            write_smoothed(simplified, args.output)
+        elif role == REFERENCE:
+            from benchmark import write_reference
+            write_reference(coords[indices], args.output)
+        print(f"Zapisano {args.output} ({os.path.getsize(args.output)} B, "
+              f"oryginalnie {os.path.getsize(args.input)} B)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+import argparse
+import os
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from geo import from_local_metres, haversine_distances, to_local_metres
+from loader import ORIGINAL, load_file
+
+##
+# \file smoothing.py
+# \brief Wektorowe metody wygładzania śladów (MA, WMA, FMA, Kalman, LOWESS, MAAzimuth, MAFuzzy).
+#
+# Każda metoda przyjmuje kolumny danych oryginalnych (loader.py, waypoints.py) i zwraca kolumny danych wygładzonych
+# w układzie plików "smoothed <Metoda>.txt" (indeks, szerokość, długość, MAE, grupa, czas). Ślad dzielony jest na
+# odcinki w miejscach skoków położenia, a odcinki na grupy o ograniczonej liczbie punktów, tak jak w plikach
+# z aplikacji. Okna metod nie przekraczają granic odcinków.
+#
+# Średnie ruchome liczone są splotem (np.convolve) na tablicy, w której odcinki rozdzielone są zerami, metody z wagami
+# zależnymi od punktu środkowego (MAAzimuth, MAFuzzy, LOWESS) - na widokach okien (sliding_window_view), a filtr Kalmana
+# - równoległym skanem prefiksowym (Hillis-Steele) złożeń przekształceń kolejnych kroków filtru. Żadna metoda nie
+# zawiera pętli po punktach.
+#
+# Brakujące lub nieskończone wartości dokładności (accuracy) zastępowane są medianą pozostałych, a brakujący azymut
+# (np. w orig.txt) - kierunkiem ruchu wyznaczonym z położeń, więc żadna metoda nie zwraca NaN dla poprawnych położeń.
+#
+# Przykład: python smoothing.py TRASA_4_1S/originalT4.txt --methods MA Kalman --output-dir wyniki
+
+MA = 'MA'
+WMA = 'WMA'
+FMA = 'FMA'
+KALMAN = 'Kalman'
+LOWESS = 'LOWESS'
+MA_AZIMUTH = 'MAAzimuth'
+MA_FUZZY = 'MAFuzzy'
+METHODS = (MA, WMA, FMA, KALMAN, LOWESS, MA_AZIMUTH, MA_FUZZY)
+
+SMOOTHED_PREFIX = 'smoothed '
+
+## Maksymalna liczba punktów w grupie. Reguła z assign_groups odtwarza grupy plików z aplikacji tylko dla TRASA_4_1S
+# (16 punktów) i TRASA_4_2S (10 punktów); grup pozostałych tras nie odtwarza żadna wartość.
+DEFAULT_GROUP_SIZE = 10
+DEFAULT_MAX_JUMP = 6.0  # Odległość (w metrach) pomiędzy kolejnymi punktami, od której zaczyna się nowy odcinek
+DEFAULT_HALF_WIDTH = 4  # Liczba punktów po każdej stronie punktu środkowego okna
+DEFAULT_PROCESS_NOISE = 3.0  # Wariancja szumu procesu filtru Kalmana (m^2 na sekundę)
+DEFAULT_FUZZY_SPREAD = 5.0  # Odległość (w metrach), przy której przynależność rozmyta spada do 0.5
+DEFAULT_ACCURACY = 10.0  # Dokładność (w metrach) przyjmowana, gdy żaden punkt nie ma poprawnej dokładności
+
+##
+# @brief Wyznacza odcinki i grupy śladu.
+#
+# Nowy odcinek (i grupa) zaczyna się, gdy odległość od poprzedniego punktu przekracza max_jump; w obrębie odcinka nowa
+# grupa zaczyna się co group_size punktów.
+# @param coords Tablica punktów (szerokość, długość).
+# @param group_size Maksymalna liczba punktów w grupie.
+# @param max_jump Maksymalna odległość (w metrach) pomiędzy kolejnymi punktami odcinka.
+# @return Krotka (numery odcinków, numery grup) dla kolejnych punktów.
+def assign_groups(coords, group_size=DEFAULT_GROUP_SIZE, max_jump=DEFAULT_MAX_JUMP):
+    coords = np.asarray(coords, dtype=np.float64)
+    jumps = np.concatenate(([True], haversine_distances(coords[:-1], coords[1:]) > max_jump))[:len(coords)]
+    segments = np.cumsum(jumps) - 1
+    segment_starts = np.flatnonzero(jumps)
+    positions = np.arange(len(coords)) - segment_starts[segments]
+    groups = np.cumsum(positions % group_size == 0) - 1
+    return segments, groups
+
+##
+# @brief Rozkłada wartości na tablicę, w której kolejne odcinki rozdzielone są half_width wartościami fill.
+# @param values Tablica wartości o kształcie (N, ...).
+# @param segments Numery odcinków kolejnych punktów.
+# @param half_width Liczba wartości rozdzielających odcinki (także na początku i na końcu).
+# @param fill Wartość wypełnienia.
+# @return Krotka (tablica rozłożona, położenia punktów w tej tablicy).
+def _pad_segments(values, segments, half_width, fill):
+    positions = np.arange(len(values)) + (segments + 1) * half_width
+    length = (len(values) + (segments[-1] + 2) * half_width) if len(values) else 2 * half_width
+    padded = np.full((length,) + values.shape[1:], fill, dtype=np.float64)
+    padded[positions] = values
+    return padded, positions
+
+##
+# @brief Liczy ważoną średnią ruchomą splotem z jądrem, bez przekraczania granic odcinków.
+# @param values Tablica wartości (N, K).
+# @param segments Numery odcinków.
+# @param kernel Jądro splotu o długości 2 * half_width + 1.
+# @param weights Wagi punktów (N,) lub None.
+# @return Tablica wygładzonych wartości (N, K).
+def _convolve_segments(values, segments, kernel, weights=None):
+    half_width = len(kernel) // 2
+    weights = np.ones(len(values)) if weights is None else np.asarray(weights, dtype=np.float64)
+    padded_weights, positions = _pad_segments(weights, segments, half_width, 0.0)
+    padded_values, _ = _pad_segments(values * weights[:, None], segments, half_width, 0.0)
+    norm = np.convolve(padded_weights, kernel, mode='same')[positions]
+    columns = [np.convolve(padded_values[:, k], kernel, mode='same')[positions] for k in range(values.shape[1])]
+    return np.column_stack(columns) / norm[:, None]
+
+##
+# @brief Zwraca okna wartości wokół każdego punktu (widoki bez kopiowania), z NaN poza odcinkiem punktu.
+# @param values Tablica wartości (N,) lub (N, K).
+# @param segments Numery odcinków.
+# @param half_width Liczba punktów po każdej stronie punktu środkowego.
+# @return Tablica okien o kształcie (N, 2 * half_width + 1) lub (N, 2 * half_width + 1, K).
+def _windows(values, segments, half_width):
+    values = np.asarray(values, dtype=np.float64)
+    padded, positions = _pad_segments(values, segments, half_width, np.nan)
+    windows = sliding_window_view(padded, 2 * half_width + 1, axis=0)[positions - half_width]
+    return windows if values.ndim == 1 else np.moveaxis(windows, -1, 1)
+
+##
+# @brief Liczy średnią ważoną z okien; wagi NaN (poza odcinkiem) są pomijane.
+#
+# Jeśli wszystkie wagi okna są zerowe, wynikiem jest punkt środkowy okna.
+# @param windows Okna wartości (N, W, K).
+# @param weights Wagi (N, W).
+# @return Tablica (N, K).
+def _window_average(windows, weights):
+    weights = np.where(np.isnan(windows[..., 0]) | np.isnan(weights), 0.0, weights)
+    totals = weights.sum(axis=1)
+    empty = totals <= 0
+    weights[empty, windows.shape[1] // 2] = 1.0
+    totals[empty] = 1.0
+    return np.einsum('nw,nwk->nk', weights, np.nan_to_num(windows)) / totals[:, None]
+
+##
+# @brief Zwraca dokładności pomiarów (co najmniej 1 m); brakujące i nieskończone wartości zastępuje medianą pozostałych.
+# @param columns Kolumny danych oryginalnych.
+# @return Wektor dokładności w metrach.
+def _accuracy(columns):
+    accuracy = np.asarray(columns['accuracy'], dtype=np.float64)
+    valid = np.isfinite(accuracy)
+    if not np.all(valid):
+        fill = np.median(accuracy[valid]) if np.any(valid) else DEFAULT_ACCURACY
+        accuracy = np.where(valid, accuracy, fill)
+    return np.maximum(accuracy, 1.0)
+
+##
+# @brief Wyznacza kierunek ruchu (azymut w stopniach, zgodnie z ruchem wskazówek zegara od północy) z położeń.
+#
+# Kierunek w punkcie to kierunek od poprzedniego do następnego punktu odcinka (na końcach odcinka - od lub do
+# sąsiedniego punktu). Dla punktów bez przemieszczenia kierunek jest NaN.
+# @param xy Punkty śladu (x, y) w metrach.
+# @param segments Numery odcinków kolejnych punktów.
+# @return Wektor azymutów.
+def heading_from_positions(xy, segments):
+    indices = np.arange(len(xy))
+    previous = np.where(np.concatenate(([False], segments[1:] == segments[:-1])), indices - 1, indices)
+    following = np.where(np.concatenate((segments[1:] == segments[:-1], [False])), indices + 1, indices)
+    delta = xy[following] - xy[previous]
+    heading = np.degrees(np.arctan2(delta[:, 0], delta[:, 1]))
+    return np.where(np.any(delta != 0, axis=1), heading, np.nan)
+
+##
+# @brief Średnia ruchoma (MA).
+# @param xy Punkty śladu (x, y) w metrach.
+# @param segments Numery odcinków kolejnych punktów.
+# @param columns Kolumny danych oryginalnych.
+# @param half_width Liczba punktów po każdej stronie punktu środkowego okna.
+# @return Wygładzone punkty (x, y) w metrach.
+def moving_average(xy, segments, columns, half_width=DEFAULT_HALF_WIDTH):
+    return _convolve_segments(xy, segments, np.ones(2 * half_width + 1))
+
+##
+# @brief Średnia ruchoma z wagami malejącymi liniowo wraz z odległością od punktu środkowego (WMA).
+# @param xy Punkty śladu (x, y) w metrach.
+# @param segments Numery odcinków kolejnych punktów.
+# @param columns Kolumny danych oryginalnych.
+# @param half_width Liczba punktów po każdej stronie punktu środkowego okna.
+# @return Wygładzone punkty (x, y) w metrach.
+def weighted_moving_average(xy, segments, columns, half_width=DEFAULT_HALF_WIDTH):
+    kernel = half_width + 1.0 - np.abs(np.arange(-half_width, half_width + 1))
+    return _convolve_segments(xy, segments, kernel)
+
+##
+# @brief Średnia ruchoma ważona dokładnością pomiaru (FMA); waga punktu to 1 / accuracy^2.
+# @param xy Punkty śladu (x, y) w metrach.
+# @param segments Numery odcinków kolejnych punktów.
+# @param columns Kolumny danych oryginalnych.
+# @param half_width Liczba punktów po każdej stronie punktu środkowego okna.
+# @return Wygładzone punkty (x, y) w metrach.
+def accuracy_moving_average(xy, segments, columns, half_width=DEFAULT_HALF_WIDTH):
+    accuracy = _accuracy(columns)
+    return _convolve_segments(xy, segments, np.ones(2 * half_width + 1), 1.0 / accuracy ** 2)
+
+##
+# @brief Średnia ruchoma z wagami max(cos(różnica azymutu względem punktu środkowego), 0) (MAAzimuth).
+#
+# Brakujące lub nieskończone azymuty (np. plik bez pola Azimuth) zastępowane są kierunkiem ruchu wyznaczonym
+# z położeń (heading_from_positions). Punkt, dla którego azymutu nie da się wyznaczyć, ma wagę 1 w każdym oknie,
+# a punkt środkowy zawsze ma wagę 1.
+# @param xy Punkty śladu (x, y) w metrach.
+# @param segments Numery odcinków kolejnych punktów.
+# @param columns Kolumny danych oryginalnych.
+# @param half_width Liczba punktów po każdej stronie punktu środkowego okna.
+# @return Wygładzone punkty (x, y) w metrach.
+def azimuth_moving_average(xy, segments, columns, half_width=DEFAULT_HALF_WIDTH):
+    azimuth = np.asarray(columns.get('azimuth', np.full(len(xy), np.nan)), dtype=np.float64)
+    missing = ~np.isfinite(azimuth)
+    if np.any(missing):
+        azimuth = np.where(missing, heading_from_positions(xy, segments), azimuth)
+    azimuth = np.radians(azimuth)
+    window_azimuth = _windows(azimuth, segments, half_width)
+    inside = ~np.isnan(_windows(np.zeros(len(xy)), segments, half_width))
+    with np.errstate(invalid='ignore'):
+        weights = np.maximum(np.cos(window_azimuth - azimuth[:, None]), 0.0)
+    # Nieznany azymut (punktu okna lub środkowego) nie zmienia wagi
+    weights = np.where(inside & np.isnan(weights), 1.0, weights)
+    weights[:, half_width] = 1.0
+    return _window_average(_windows(xy, segments, half_width), weights)
+
+##
+# @brief Rozmyta średnia ruchoma (MAFuzzy); przynależność punktu okna to 1 / (1 + (d / spread)^2), gdzie d to jego
+# odległość od punktu środkowego.
+# @param xy Punkty śladu (x, y) w metrach.
+# @param segments Numery odcinków kolejnych punktów.
+# @param columns Kolumny danych oryginalnych.
+# @param half_width Liczba punktów po każdej stronie punktu środkowego okna.
+# @param spread Odległość (w metrach), przy której przynależność spada do 0.5.
+# @return Wygładzone punkty (x, y) w metrach.
+def fuzzy_moving_average(xy, segments, columns, half_width=DEFAULT_HALF_WIDTH, spread=DEFAULT_FUZZY_SPREAD):
+    windows = _windows(xy, segments, half_width)
+    distances = np.sqrt(np.sum((windows - xy[:, None, :]) ** 2, axis=-1))
+    return _window_average(windows, 1.0 / (1.0 + (distances / spread) ** 2))
+
+##
+# @brief Lokalna regresja liniowa względem czasu z wagami trójsześciennymi w oknie (LOWESS).
+# @param xy Punkty śladu (x, y) w metrach.
+# @param segments Numery odcinków kolejnych punktów.
+# @param columns Kolumny danych oryginalnych.
+# @param half_width Liczba punktów po każdej stronie punktu środkowego okna.
+# @return Wygładzone punkty (x, y) w metrach.
+def lowess(xy, segments, columns, half_width=DEFAULT_HALF_WIDTH):
+    times = np.asarray(columns['time'], dtype=np.float64) / 1000.0
+    offsets = _windows(times, segments, half_width) - times[:, None]
+    span = np.nanmax(np.abs(offsets), axis=1)[:, None] * (1.0 + 1e-9)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        weights = np.nan_to_num((1.0 - np.abs(offsets / span) ** 3) ** 3)
+    weights[:, half_width] = np.maximum(weights[:, half_width], 1.0)
+    offsets = np.nan_to_num(offsets)
+    windows = np.nan_to_num(_windows(xy, segments, half_width))
+
+    s0 = weights.sum(axis=1)
+    s1 = np.sum(weights * offsets, axis=1)
+    s2 = np.sum(weights * offsets ** 2, axis=1)
+    t0 = np.einsum('nw,nwk->nk', weights, windows)
+    t1 = np.einsum('nw,nwk->nk', weights * offsets, windows)
+    determinant = s0 * s2 - s1 ** 2
+    regular = determinant > 1e-12 * np.maximum(s0 * s2, 1e-300)
+    fitted = t0 / s0[:, None]
+    # Okna z jednym punktem lub jednym czasem: średnia ważona zamiast regresji
+    fitted[regular] = ((s2[regular, None] * t0[regular] - s1[regular, None] * t1[regular])
+                       / determinant[regular, None])
+    return fitted
+
+##
+# @brief Wyznacza, które elementy skanu prefiksowego łączone są w kroku o danym przesunięciu.
+#
+# Element k łączony jest z elementem k - shift tylko w obrębie tego samego odcinka, więc odcinki liczone są
+# niezależnie (wartości z poprzednich odcinków, także NaN, nie wpływają na kolejne).
+# @param first Indeks pierwszego punktu odcinka każdego punktu.
+# @param shift Przesunięcie kroku skanu.
+# @return Maska elementów first[shift:].
+def _scan_mask(first, shift):
+    return first[shift:] <= np.arange(shift, len(first)) - shift
+
+##
+# @brief Składa (skanem prefiksowym) ciąg przekształceń x -> a * x + b w obrębie odcinków.
+# @param a Współczynniki (N,).
+# @param b Wyrazy wolne (N, K).
+# @param first Indeks pierwszego punktu odcinka każdego punktu.
+# @return Wartości x_k dla kolejnych kroków, przy a = 0 na początku każdego odcinka.
+def _scan_affine(a, b, first):
+    a = a.copy()
+    b = b.copy()
+    shift = 1
+    while shift < len(a):
+        mask = _scan_mask(first, shift)
+        target = np.flatnonzero(mask) + shift
+        b[target] = a[target, None] * b[target - shift] + b[target]
+        a[target] = a[target] * a[target - shift]
+        shift *= 2
+    return b
+
+##
+# @brief Składa (skanem prefiksowym) ciąg homografii P -> (m00 * P + m01) / (m10 * P + m11) w obrębie odcinków.
+# @param matrices Macierze przekształceń (N, 2, 2).
+# @param first Indeks pierwszego punktu odcinka każdego punktu.
+# @return Wartości P_k dla kolejnych kroków, przy pierwszym przekształceniu każdego odcinka stałym.
+def _scan_moebius(matrices, first):
+    m00, m01, m10, m11 = (matrices[:, i, j].copy() for i, j in ((0, 0), (0, 1), (1, 0), (1, 1)))
+    shift = 1
+    while shift < len(m00):
+        target = np.flatnonzero(_scan_mask(first, shift)) + shift
+        source = target - shift
+        # Iloczyn macierzy M_k @ M_{k-shift} liczony elementami, z normalizacją zapobiegającą przepełnieniu
+        p00 = m00[target] * m00[source] + m01[target] * m10[source]
+        p01 = m00[target] * m01[source] + m01[target] * m11[source]
+        p10 = m10[target] * m00[source] + m11[target] * m10[source]
+        p11 = m10[target] * m01[source] + m11[target] * m11[source]
+        scale = np.maximum(np.maximum(np.abs(p00), np.abs(p01)), np.maximum(np.abs(p10), np.abs(p11)))
+        m00[target], m01[target], m10[target], m11[target] = p00 / scale, p01 / scale, p10 / scale, p11 / scale
+        shift *= 2
+    return (m00 + m01) / (m10 + m11)
+
+##
+# @brief Filtr Kalmana z modelem stałego położenia (błądzenie losowe), osobno dla obu osi.
+#
+# Wariancja pomiaru to accuracy^2 (brakujące dokładności zastępowane są medianą), a wariancja procesu rośnie liniowo
+# z czasem pomiędzy punktami. Filtr jest inicjowany pierwszym pomiarem każdego odcinka, a skany nie łączą kroków
+# z różnych odcinków. Rekurencje wariancji (homografia) i stanu (przekształcenie afiniczne)
+# są łączne, więc cały ślad liczony jest skanem prefiksowym w O(log N) operacjach na tablicach.
+# @param xy Punkty śladu (x, y) w metrach.
+# @param segments Numery odcinków kolejnych punktów.
+# @param columns Kolumny danych oryginalnych.
+# @param process_noise Wariancja szumu procesu (m^2 na sekundę).
+# @return Wygładzone punkty (x, y) w metrach.
+def kalman(xy, segments, columns, process_noise=DEFAULT_PROCESS_NOISE):
+    noise = _accuracy(columns) ** 2
+    dt = np.diff(np.asarray(columns['time'], dtype=np.float64), prepend=columns['time'][0]) / 1000.0
+    q = process_noise * np.where(np.isfinite(dt), np.maximum(dt, 0.0), 0.0)
+    starts = np.concatenate(([True], segments[1:] != segments[:-1]))
+    first = np.flatnonzero(starts)[np.cumsum(starts) - 1]
+
+    # Wariancja a posteriori: P_k = (P_{k-1} + q_k) * R_k / (P_{k-1} + q_k + R_k); na początku odcinka P_k = R_k
+    matrices = np.empty((len(xy), 2, 2))
+    matrices[:, 0, 0] = np.where(starts, 0.0, noise)
+    matrices[:, 0, 1] = np.where(starts, noise, q * noise)
+    matrices[:, 1, 0] = np.where(starts, 0.0, 1.0)
+    matrices[:, 1, 1] = np.where(starts, 1.0, q + noise)
+    gains = _scan_moebius(matrices, first) / noise
+
+    # Stan: x_k = (1 - K_k) * x_{k-1} + K_k * z_k
+    gains[starts] = 1.0
+    return _scan_affine(1.0 - gains, gains[:, None] * xy, first)
+
+## Metody wygładzania: nazwa -> funkcja (punkty w metrach, numery odcinków, kolumny danych oryginalnych)
+SMOOTHERS = {
+    MA: moving_average,
+    WMA: weighted_moving_average,
+    FMA: accuracy_moving_average,
+    KALMAN: kalman,
+    LOWESS: lowess,
+    MA_AZIMUTH: azimuth_moving_average,
+    MA_FUZZY: fuzzy_moving_average,
+}
+
+##
+# @brief Wygładza ślad wybraną metodą.
+#
+# Kolumna MAE zawiera dla każdego punktu średnią odległość euklidesową (w stopniach) pomiędzy punktami wygładzonymi
+# a oryginalnymi jego grupy.
+# @param columns Kolumny danych oryginalnych (ORIGINAL_COLUMNS).
+# @param method Nazwa metody z METHODS.
+# @param group_size Maksymalna liczba punktów w grupie.
+# @param max_jump Odległość (w metrach) pomiędzy kolejnymi punktami, od której zaczyna się nowy odcinek.
+# @param params Dodatkowe parametry metody (np. half_width, process_noise, spread).
+# @return Słownik kolumn SMOOTHED_COLUMNS.
+def smooth_track(columns, method, group_size=DEFAULT_GROUP_SIZE, max_jump=DEFAULT_MAX_JUMP, **params):
+    try:
+        smoother = SMOOTHERS[method]
+    except KeyError:
+        raise ValueError(f'Nieznana metoda wygładzania: {method}') from None
+    coords = np.column_stack((columns['lat'], columns['lon'])).astype(np.float64)
+    if len(coords) == 0:
+        return {'index': np.zeros(0, dtype=np.int64), 'lat': np.zeros(0), 'lon': np.zeros(0), 'mae': np.zeros(0),
+                'group': np.zeros(0, dtype=np.int64), 'time': np.zeros(0, dtype=np.int64)}
+    segments, groups = assign_groups(coords, group_size, max_jump)
+
+    origin = coords[0]
+    smoothed = from_local_metres(smoother(to_local_metres(coords, origin), segments, columns, **params), origin)
+
+    deviations = np.sqrt(np.sum((smoothed - coords) ** 2, axis=1))
+    group_starts = np.flatnonzero(np.concatenate(([True], groups[1:] != groups[:-1])))
+    mae = np.add.reduceat(deviations, group_starts) / np.diff(np.append(group_starts, len(coords)))
+    return {
+        'index': np.arange(len(coords), dtype=np.int64),
+        'lat': smoothed[:, 0],
+        'lon': smoothed[:, 1],
+        'mae': mae[groups],
+        'group': groups.astype(np.int64),
+        'time': np.asarray(columns['time'], dtype=np.int64),
+    }
+
+##
+# @brief Zapisuje dane wygładzone w formacie "Point N: Lat: ..., Long: ..., MAE: ..., Group: ..., Time: ...".
+# @param columns Słownik kolumn SMOOTHED_COLUMNS.
+# @param output_path Ścieżka pliku wynikowego.
+def write_smoothed(columns, output_path):
+    with open(output_path, 'w', encoding='utf-8') as output_file:
+        for index, lat, lon, mae, group, time in zip(columns['index'].tolist(), columns['lat'].tolist(),
+                                                     columns['lon'].tolist(), columns['mae'].tolist(),
+                                                     columns['group'].tolist(), columns['time'].tolist()):
+            # MAE zapisywane jak w plikach z aplikacji (wykładnik z wielką literą E)
+            mae = repr(mae).replace('e', 'E')
+            output_file.write(f'Point {index}: Lat: {lat!r}, Long: {lon!r}, MAE: {mae}, Group: {group}, Time: {time}\n')
+
+def main():
+    parser = argparse.ArgumentParser(description='Wygładzanie danych oryginalnych wybranymi metodami.')
+    parser.add_argument('original', help='Plik z danymi oryginalnymi (tekstowy lub nagranie XML)')
+    parser.add_argument('--methods', nargs='+', default=list(METHODS), choices=METHODS, help='Metody wygładzania')
+    parser.add_argument('--output-dir', required=True, help='Katalog wynikowy')
+    parser.add_argument('--force', action='store_true', help='Nadpisuje istniejące pliki wynikowe')
+    parser.add_argument('--group-size', type=int, default=DEFAULT_GROUP_SIZE, help='Maksymalna liczba punktów w grupie')
+    parser.add_argument('--max-jump', type=float, default=DEFAULT_MAX_JUMP,
+                        help='Odległość w metrach, od której zaczyna się nowy odcinek')
+    parser.add_argument('--half-width', type=int, default=DEFAULT_HALF_WIDTH,
+                        help='Liczba punktów po każdej stronie punktu środkowego okna')
+    args = parser.parse_args()
+
+    output_paths = {method: os.path.join(args.output_dir, f'{SMOOTHED_PREFIX}{method}.txt') for method in args.methods}
+    existing = [path for path in output_paths.values() if os.path.exists(path)]
+    if existing and not args.force:
+        parser.error(f"pliki wynikowe już istnieją (użyj --force, aby je nadpisać): {', '.join(existing)}")
+
+    _, columns = load_file(args.original, ORIGINAL)
+    os.makedirs(args.output_dir, exist_ok=True)
+    for method, output_path in output_paths.items():
+        params = {} if method == KALMAN else {'half_width': args.half_width}
+        smoothed = smooth_track(columns, method, args.group_size, args.max_jump, **params)
+        write_smoothed(smoothed, output_path)
+        print(f"Zapisano {len(smoothed['index'])} punktów do {output_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+from collections import namedtuple
+
+import numpy as np
+
+from grouping import segment_argmin
+
+##
+# \file spatial_index.py
+# \brief Indeks przestrzenny punktów referencyjnych do wyszukiwania najbliższych sąsiadów.
+#
+# Indeks (drzewo k-wymiarowe) budowany jest raz dla interpolowanych danych referencyjnych i odpowiada na zapytania
+# dla całych tablic punktów naraz, zamiast liniowego przeszukiwania wszystkich punktów referencyjnych w Pythonie.
+# Indeks odcinków (np. dróg z map.osm) dzieli dłuższe odcinki na fragmenty i indeksuje środki fragmentów; odległość do
+# kandydatów liczona jest dokładnie przez rzut punktu na odcinek, a drugie przeszukanie w promieniu (najlepsza
+# odległość + piece_length / 2) gwarantuje, że znaleziony odcinek jest rzeczywiście najbliższy. SciPy wczytywany jest
+# dopiero przy budowie pierwszego indeksu.
+
+## Domyślna maksymalna długość fragmentu odcinka w indeksie odcinków (w jednostkach współrzędnych)
+DEFAULT_PIECE_LENGTH = 10.0
+
+## Domyślna liczba fragmentów-kandydatów sprawdzanych dla każdego punktu
+DEFAULT_CANDIDATES = 8
+
+## Indeks odcinków: drzewo środków fragmentów, numer odcinka każdego fragmentu oraz początki i końce odcinków
+SegmentIndex = namedtuple('SegmentIndex', ['tree', 'piece_segments', 'starts', 'ends', 'piece_length'])
+
+##
+# @brief Buduje indeks przestrzenny dla punktów referencyjnych.
+# @param reference_points Tablica punktów referencyjnych (x, y).
+# @return Drzewo cKDTree zbudowane na punktach referencyjnych.
+def build_reference_index(reference_points):
+    from scipy.spatial import cKDTree
+
+    return cKDTree(np.asarray(reference_points, dtype=np.float64)[:, :2])
+
+##
+# @brief Wyszukuje najbliższe punkty referencyjne dla wielu punktów jednocześnie.
+#
+# Odległości liczone są ponownie dla znalezionych par tym samym wzorem co euclidean_distance w evaluation.py, dzięki czemu
+# wartości (i wybór minimum na ich podstawie) są takie same jak przy liniowym przeszukiwaniu.
+# @param index Indeks zbudowany funkcją build_reference_index.
+# @param reference_points Tablica punktów referencyjnych, na której zbudowano indeks.
+# @param points Tablica punktów docelowych (x, y).
+# @return Krotka (odległości, indeksy najbliższych punktów referencyjnych).
+def query_closest(index, reference_points, points):
+    points = np.asarray(points, dtype=np.float64)[:, :2]
+    _, indices = index.query(points)
+    closest = np.asarray(reference_points)[indices]
+    distances = np.sqrt((closest[:, 0] - points[:, 0]) ** 2 + (closest[:, 1] - points[:, 1]) ** 2)
+    return distances, indices
+
+##
+# @brief Buduje indeks przestrzenny odcinków.
+#
+# Każdy odcinek dzielony jest na fragmenty nie dłuższe niż piece_length, a drzewo budowane jest na środkach fragmentów.
+# Najbliższy punkt każdego odcinka leży w odległości najwyżej piece_length / 2 od środka jednego z jego fragmentów.
+# @param starts Tablica początków odcinków (x, y) w układzie płaskim (np. w metrach).
+# @param ends Tablica końców odcinków (x, y).
+# @param piece_length Maksymalna długość fragmentu odcinka.
+# @return Obiekt SegmentIndex.
+def build_segment_index(starts, ends, piece_length=DEFAULT_PIECE_LENGTH):
+    from scipy.spatial import cKDTree
+
+    starts = np.asarray(starts, dtype=np.float64)[:, :2]
+    ends = np.asarray(ends, dtype=np.float64)[:, :2]
+    lengths = np.sqrt(np.sum((ends - starts) ** 2, axis=1))
+    pieces = np.maximum(np.ceil(lengths / piece_length).astype(np.intp), 1)
+    piece_segments = np.repeat(np.arange(len(starts)), pieces)
+    first_piece = np.cumsum(pieces) - pieces
+    fractions = (np.arange(len(piece_segments)) - first_piece[piece_segments] + 0.5) / pieces[piece_segments]
+    midpoints = starts[piece_segments] + fractions[:, None] * (ends - starts)[piece_segments]
+    return SegmentIndex(cKDTree(midpoints), piece_segments, starts, ends, piece_length)
+
+##
+# @brief Rzutuje punkty na wskazane odcinki.
+# @param index Indeks odcinków.
+# @param points Tablica punktów (x, y) o kształcie (..., 2).
+# @param segments Numery odcinków o kształcie zgodnym z points[..., 0].
+# @return Krotka (odległości, położenia rzutów na odcinkach w przedziale [0, 1]).
+def project_on_segments(index, points, segments):
+    starts = index.starts[segments]
+    directions = index.ends[segments] - starts
+    offsets = points - starts
+    squared_lengths = np.sum(directions ** 2, axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fractions = np.sum(offsets * directions, axis=-1) / squared_lengths
+    fractions = np.clip(np.nan_to_num(fractions), 0.0, 1.0)
+    distances = np.sqrt(np.sum((offsets - fractions[..., None] * directions) ** 2, axis=-1))
+    return distances, fractions
+
+##
+# @brief Wyszukuje najbliższy odcinek dla wielu punktów jednocześnie.
+#
+# Pierwsze przeszukanie sprawdza odcinki `candidates` najbliższych fragmentów. Odcinek bliższy niż znaleziony ma
+# fragment, którego środek leży w promieniu (znaleziona odległość + piece_length / 2), więc dla punktów, dla których
+# najdalszy z kandydatów leży bliżej niż ten promień (np. przy gęstej równoległej łamanej obok długiego odcinka),
+# wykonywane jest drugie przeszukanie wszystkich fragmentów w promieniu. Wynik jest taki sam jak przy sprawdzeniu
+# wszystkich odcinków.
+# @param index Indeks zbudowany funkcją build_segment_index.
+# @param points Tablica punktów (x, y).
+# @param candidates Liczba najbliższych fragmentów, których odcinki są sprawdzane w pierwszym przeszukaniu.
+# @return Krotka (odległości, numery odcinków, położenia rzutów na odcinkach w przedziale [0, 1]).
+def query_segments(index, points, candidates=DEFAULT_CANDIDATES):
+    points = np.asarray(points, dtype=np.float64)[:, :2]
+    candidates = min(candidates, len(index.piece_segments))
+    piece_distances, pieces = index.tree.query(points, k=candidates)
+    piece_distances = piece_distances.reshape(len(points), candidates)
+    segments = index.piece_segments[pieces.reshape(len(points), candidates)]
+    distances, fractions = project_on_segments(index, points[:, None, :], segments)
+    best = np.argmin(distances, axis=1)[:, None]
+    distances = np.take_along_axis(distances, best, axis=1)[:, 0]
+    segments = np.take_along_axis(segments, best, axis=1)[:, 0]
+    fractions = np.take_along_axis(fractions, best, axis=1)[:, 0]
+
+    # Drugie przeszukanie: fragmenty w promieniu, które mogły zostać pominięte przez k najbliższych
+    radii = distances + index.piece_length / 2
+    radii += 1e-9 * np.maximum(radii, 1.0)  # margines na błędy zaokrągleń
+    incomplete = np.flatnonzero(piece_distances[:, -1] <= radii)
+    if len(incomplete) and candidates < len(index.piece_segments):
+        nearby = index.tree.query_ball_point(points[incomplete], radii[incomplete])
+        counts = np.array([len(found) for found in nearby])
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        owners = np.repeat(incomplete, counts)
+        nearby_segments = index.piece_segments[np.concatenate(nearby).astype(np.intp)]
+        nearby_distances, nearby_fractions = project_on_segments(index, points[owners], nearby_segments)
+        closest = segment_argmin(nearby_distances, offsets)
+        better = nearby_distances[closest] < distances[incomplete]
+        improved = incomplete[better]
+        distances[improved] = nearby_distances[closest[better]]
+        segments[improved] = nearby_segments[closest[better]]
+        fractions[improved] = nearby_fractions[closest[better]]
+    return distances, segments, fractions
+
+##
+# @brief Zwraca punkty leżące na odcinkach w podanych położeniach.
+# @param index Indeks odcinków.
+# @param segments Numery odcinków.
+# @param fractions Położenia na odcinkach w przedziale [0, 1].
+# @return Tablica punktów (x, y).
+def segment_points(index, segments, fractions):
+    starts = index.starts[segments]
+    return starts + np.asarray(fractions)[:, None] * (index.ends[segments] - starts)
@@ -0,0 +1,240 @@
+import argparse
+import csv
+import inspect
+import itertools
+import os
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from evaluation import evaluate_track, interpolate_reference
+from loader import (ORIGINAL, REFERENCE, align_reference_axes, load_file, original_array, reference_array,
+                    smoothed_array, sniff_file)
+from smoothing import DEFAULT_GROUP_SIZE, DEFAULT_MAX_JUMP, METHODS, SMOOTHERS, smooth_track
+from spatial_index import build_reference_index
+from track_cache import file_digest
+
+##
+# \file sweep.py
+# \brief Przegląd siatki parametrów metod wygładzania z jednokrotnie wyznaczonymi danymi wspólnymi.
+#
+# Dla każdej metody podawana jest siatka wartości parametrów (np. half_width, process_noise, group_size); oceniane są
+# wszystkie kombinacje. Dane wspólne dla wszystkich kombinacji - wczytany ślad oryginalny, dane referencyjne,
+# interpolowane dane referencyjne i ich indeks przestrzenny - wyznaczane są raz i zapamiętywane w pamięci podręcznej
+# LRU o kluczach zależnych od zawartości plików wejściowych (skrót SHA-1), a następnie przekazywane jednokrotnie
+# do każdego procesu puli. Kombinacje rozdzielane są pomiędzy procesy, a wynikiem jest tabela uszeregowana według
+# wybranej miary (MSE, RMSE, mediana błędów z grupami i bez grup).
+#
+# Przykład: python sweep.py --grid Kalman.process_noise=1,3,10 MA.half_width=2,4,8 --output sweep.csv
+#
+# Siatkę można też podać w pliku konfiguracyjnym:
+# sweep:
+#   Kalman: {process_noise: [1, 3, 10]}
+#   MA: {half_width: [2, 4, 8], group_size: [10, 16]}
+
+MEMO_SIZE = 16  # Liczba zapamiętywanych wyników pośrednich
+RANK_COLUMNS = ('rmse', 'mse', 'median', 'mean', 'group_rmse', 'group_mse', 'group_median', 'group_mean')
+GROUPING_PARAMETERS = ('group_size', 'max_jump')
+
+## Dane wspólne wszystkich kombinacji: kolumny i tablica danych oryginalnych, dane referencyjne, interpolowane
+# dane referencyjne i ich indeks przestrzenny
+SweepInputs = namedtuple('SweepInputs', ['original', 'original_data', 'ref_data', 'interpolated_ref_data', 'ref_index'])
+
+## Kolumny tabeli wyników
+SWEEP_COLUMNS = ('rank', 'method', 'params', 'points', 'groups', 'mean', 'mse', 'rmse', 'median',
+                 'group_mean', 'group_mse', 'group_rmse', 'group_median')
+
+_memo = OrderedDict()
+
+# Dane wspólne w procesie roboczym (ustawiane przez _init_worker)
+_worker_inputs = None
+
+##
+# @brief Zwraca wynik zapamiętany pod kluczem lub wylicza go i zapamiętuje (usuwając najdawniej używany wpis).
+# @param key Klucz (krotka zależna od zawartości danych wejściowych).
+# @param compute Funkcja bez argumentów wyliczająca wynik.
+# @return Wynik.
+def memoize(key, compute):
+    if key in _memo:
+        _memo.move_to_end(key)
+        return _memo[key]
+    value = compute()
+    _memo[key] = value
+    if len(_memo) > MEMO_SIZE:
+        _memo.popitem(last=False)
+    return value
+
+##
+# @brief Wyznacza (lub pobiera z pamięci podręcznej) dane wspólne wszystkich kombinacji parametrów.
+# @param original_path Plik z danymi oryginalnymi (tekstowy lub nagranie XML).
+# @param reference_path Plik z danymi referencyjnymi.
+# @return Obiekt SweepInputs.
+def shared_inputs(original_path, reference_path):
+    original_key = file_digest(original_path)
+    reference_key = file_digest(reference_path)
+    original = memoize(('original', original_key), lambda: load_file(original_path, ORIGINAL)[1])
+    original_data = memoize(('original_data', original_key), lambda: original_array(original))
+    ref_data = memoize(('reference', reference_key, original_key), lambda: align_reference_axes(
+        reference_array(load_file(reference_path, REFERENCE)[1]), original_data[:, 1:3]))
+    # Wygładzanie zachowuje liczbę punktów, więc interpolowane dane referencyjne są wspólne dla wszystkich kombinacji
+    interpolated_ref_data = memoize(('interpolated', reference_key, original_key, len(original_data)),
+                                    lambda: interpolate_reference(ref_data, len(original_data)))
+    ref_index = memoize(('ref_index', reference_key, original_key, len(original_data)),
+                        lambda: build_reference_index(interpolated_ref_data))
+    return SweepInputs(original, original_data, ref_data, interpolated_ref_data, ref_index)
+
+##
+# @brief Rozwija siatkę parametrów w listę kombinacji.
+# @param grid Słownik metoda -> słownik parametr -> lista wartości.
+# @return Lista par (metoda, słownik parametrów).
+def expand_grid(grid):
+    combinations = []
+    for method, parameters in grid.items():
+        if method not in SMOOTHERS:
+            raise ValueError(f'Nieznana metoda wygładzania: {method}')
+        accepted = set(inspect.signature(SMOOTHERS[method]).parameters) - {'xy', 'segments', 'columns'}
+        unknown = set(parameters or {}) - accepted - set(GROUPING_PARAMETERS)
+        if unknown:
+            raise ValueError(f"Nieznane parametry metody {method}: {', '.join(sorted(unknown))} "
+                             f"(dostępne: {', '.join(sorted(accepted | set(GROUPING_PARAMETERS)))})")
+        names = sorted(parameters or {})
+        values = [value if isinstance(value, list) else [value] for value in (parameters[name] for name in names)]
+        combinations.extend((method, dict(zip(names, combination))) for combination in itertools.product(*values))
+    return combinations
+
+##
+# @brief Odczytuje siatkę parametrów z napisów "Metoda.parametr=w1,w2,..." (lub "Metoda" - parametry domyślne).
+# @param specs Lista napisów.
+# @return Słownik metoda -> słownik parametr -> lista wartości.
+def parse_grid(specs):
+    grid = {}
+    for spec in specs:
+        target, separator, values = spec.partition('=')
+        method, _, name = target.partition('.')
+        if bool(name) != bool(separator) or (separator and not values):
+            raise ValueError(f'Niepoprawny opis siatki: {spec} (oczekiwano Metoda.parametr=w1,w2 lub Metoda)')
+        parameters = grid.setdefault(method, {})
+        if name:
+            parameters[name] = [_number(value) for value in values.split(',')]
+    return grid
+
+##
+# @brief Zamienia napis na liczbę całkowitą lub zmiennoprzecinkową.
+def _number(text):
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+##
+# @brief Zapamiętuje dane wspólne w procesie roboczym (inicjalizator puli).
+# @param inputs Obiekt SweepInputs.
+def _init_worker(inputs):
+    global _worker_inputs
+    _worker_inputs = inputs
+
+##
+# @brief Ocenia jedną kombinację parametrów (funkcja wykonywana w procesie roboczym).
+# @param job Krotka (metoda, słownik parametrów, metryka).
+# @return Słownik wiersza tabeli wyników (bez kolumny rank).
+def evaluate_parameters(job):
+    method, params, metric = job
+    inputs = _worker_inputs
+    smoothing_params = {name: value for name, value in params.items() if name not in GROUPING_PARAMETERS}
+    smoothed = smooth_track(inputs.original, method, group_size=params.get('group_size', DEFAULT_GROUP_SIZE),
+                            max_jump=params.get('max_jump', DEFAULT_MAX_JUMP), **smoothing_params)
+    smoothed_data = smoothed_array(smoothed)
+    evaluation = evaluate_track(inputs.original_data, smoothed_data, inputs.ref_data, metric=metric,
+                                interpolated_ref_data=inputs.interpolated_ref_data, ref_index=inputs.ref_index)
+    mean, _, mse, _, _, _, rmse, _, median, _, _ = evaluation['groups']
+    metrics = evaluation['no_groups']['smoothed']
+    return {
+        'method': method, 'params': ' '.join(f'{name}={value}' for name, value in params.items()),
+        'points': len(smoothed_data), 'groups': len(evaluation['grouped_smoothed_data']),
+        'mean': metrics.mean, 'mse': metrics.mse, 'rmse': metrics.rmse, 'median': metrics.median,
+        'group_mean': float(mean), 'group_mse': float(mse), 'group_rmse': float(rmse), 'group_median': float(median),
+    }
+
+##
+# @brief Ocenia wszystkie kombinacje parametrów i szereguje wyniki.
+# @param original_path Plik z danymi oryginalnymi.
+# @param reference_path Plik z danymi referencyjnymi.
+# @param grid Słownik metoda -> słownik parametr -> lista wartości.
+# @param metric Metryka błędów bez uwzględniania grup.
+# @param rank_by Kolumna, według której szeregowane są wyniki (rosnąco).
+# @param workers Liczba procesów (None - liczba rdzeni, 1 - bez puli procesów).
+# @return Lista wierszy tabeli wyników (SWEEP_COLUMNS) od najlepszego.
+def run_sweep(original_path, reference_path, grid, metric='euclidean', rank_by='rmse', workers=None):
+    if rank_by not in RANK_COLUMNS:
+        raise ValueError(f'Nieznana miara szeregowania: {rank_by}')
+    jobs = [(method, params, metric) for method, params in expand_grid(grid)]
+    inputs = shared_inputs(original_path, reference_path)
+    if workers == 1:
+        _init_worker(inputs)
+        rows = [evaluate_parameters(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(inputs,)) as executor:
+            rows = list(executor.map(evaluate_parameters, jobs))
+    rows.sort(key=lambda row: row[rank_by])
+    return [dict(row, rank=rank) for rank, row in enumerate(rows, 1)]
+
+##
+# @brief Zapisuje tabelę wyników do pliku CSV.
+# @param rows Lista wierszy tabeli wyników.
+# @param output_path Ścieżka do pliku wynikowego.
+def write_sweep(rows, output_path):
+    with open(output_path, 'w', newline='') as output_file:
+        writer = csv.DictWriter(output_file, fieldnames=SWEEP_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+##
+# @brief Wyszukuje pliki danych oryginalnych i referencyjnych w konfiguracji (klucz data_files).
+# @param config Słownik konfiguracji.
+# @return Krotka (ścieżka danych oryginalnych, ścieżka danych referencyjnych); brakujące pozycje to None.
+def config_paths(config):
+    data_files = config.get('data_files', [])
+    if isinstance(data_files, dict):
+        roles = {role: paths if isinstance(paths, str) else paths[0] for role, paths in data_files.items()}
+    else:
+        roles = {}
+        for path in data_files:
+            roles.setdefault(sniff_file(path), path)
+    return roles.get(ORIGINAL), roles.get(REFERENCE)
+
+def main():
+    from main import DEFAULT_CONFIG_PATH, load_config
+
+    parser = argparse.ArgumentParser(description='Przegląd siatki parametrów metod wygładzania.')
+    parser.add_argument('--config', default=DEFAULT_CONFIG_PATH, help='Plik konfiguracyjny (data_files, sweep)')
+    parser.add_argument('--original', default=None, help='Plik z danymi oryginalnymi (domyślnie z konfiguracji)')
+    parser.add_argument('--reference', default=None, help='Plik z danymi referencyjnymi (domyślnie z konfiguracji)')
+    parser.add_argument('--grid', nargs='+', default=None,
+                        help='Siatka parametrów, np. Kalman.process_noise=1,3,10 MA.half_width=2,4 (lub "WMA")')
+    parser.add_argument('--metric', default='euclidean',
+                        choices=('euclidean', 'haversine', 'equirectangular', 'cross_track'))
+    parser.add_argument('--rank-by', default='rmse', choices=RANK_COLUMNS, help='Miara szeregowania wyników')
+    parser.add_argument('--workers', type=int, default=None, help='Liczba procesów')
+    parser.add_argument('--output', default=None, help='Plik CSV z tabelą wyników')
+    parser.add_argument('--top', type=int, default=20, help='Liczba wypisywanych najlepszych wierszy')
+    args = parser.parse_args()
+
+    config = load_config(args.config) if os.path.exists(args.config) else {}
+    original_path, reference_path = config_paths(config)
+    original_path = args.original or original_path
+    reference_path = args.reference or reference_path
+    if original_path is None or reference_path is None:
+        parser.error('podaj --original i --reference lub data_files w konfiguracji')
+    grid = parse_grid(args.grid) if args.grid else config.get('sweep') or {method: {} for method in METHODS}
+
+    rows = run_sweep(original_path, reference_path, grid, args.metric, args.rank_by, args.workers)
+    if args.output is not None:
+        write_sweep(rows, args.output)
+    print(f"{'#':>3}  {'metoda':<10} {'parametry':<36} {'MSE':>11} {'RMSE':>11} {'mediana':>11} "
+          f"{'MSE grup':>11} {'RMSE grup':>11} {'med. grup':>11}")
+    for row in rows[:args.top]:
+        print(f"{row['rank']:>3}  {row['method']:<10} {row['params']:<36} {row['mse']:>11.4e} {row['rmse']:>11.4e} "
+              f"{row['median']:>11.4e} {row['group_mse']:>11.4e} {row['group_rmse']:>11.4e} "
+              f"{row['group_median']:>11.4e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import os
+import shutil
+
+import pytest
+
+from batch import Skipped, discover_routes, parse_reference_map, run_batch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_route(directory, reference=True):
+    directory.mkdir(parents=True)
+    shutil.copyfile(os.path.join(ROOT, 'TRASA_4_1S', 'originalT4.txt'), directory / 'originalT4.txt')
+    shutil.copyfile(os.path.join(ROOT, 'TRASA_4_1S', 'smoothed Kalman.txt'), directory / 'smoothed Kalman.txt')
+    if reference:
+        shutil.copyfile(os.path.join(ROOT, 'referencyjneT4.txt'), directory / 'referencyjneT4.txt')
+
+
+def test_parse_reference_map_rejects_missing_path():
+    assert parse_reference_map(['TRASA_2_*=referencyjneT2.txt']) == {'TRASA_2_*': 'referencyjneT2.txt'}
+    with pytest.raises(ValueError):
+        parse_reference_map(['TRASA_3'])
+
+
+def test_reference_map_assigns_root_reference_and_reports_skipped(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_route(tmp_path / 'TRASA_A', reference=False)
+    make_route(tmp_path / 'TRASA_B', reference=False)
+    make_route(tmp_path / 'TRASA_C')
+    shutil.copyfile(os.path.join(ROOT, 'referencyjneT4.txt'), tmp_path / 'referencyjneT4.txt')
+    skipped = []
+    routes = discover_routes(['TRASA_A', 'TRASA_B', 'TRASA_C'],
+                             reference_map=parse_reference_map(['TRASA_A=referencyjneT4.txt']), skipped=skipped)
+    assert [(route['route'], route['reference']) for route in routes] == [
+        ('TRASA_A', 'referencyjneT4.txt'), ('TRASA_C', os.path.join('TRASA_C', 'referencyjneT4.txt'))]
+    assert [(entry.route, entry.method) for entry in skipped] == [('TRASA_B', None)]
+
+
+def test_failed_route_load_does_not_abort_batch(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_route(tmp_path / 'TRASA_C')
+    routes = discover_routes(['TRASA_C'])
+    broken = dict(routes[0], route='TRASA_X', original=str(tmp_path / 'brak.txt'))
+    skipped = []
+    rows = run_batch([broken] + routes, workers=1, skipped=skipped)
+    assert {row['route'] for row in rows} == {'TRASA_C'} and len(rows) == 2
+    assert len(skipped) == 1 and skipped[0][:2] == ('TRASA_X', None)
+    assert isinstance(skipped[0], Skipped)
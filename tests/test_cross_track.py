@@ -0,0 +1,45 @@
+import numpy as np
+
+from cross_track import build_polyline_index, cross_track_errors, project_on_polyline
+from geo import from_local_metres, to_local_metres
+from spatial_index import project_on_segments
+
+ORIGIN = np.array([50.29, 18.67])
+
+
+def brute_force(index, points):
+    segments = np.broadcast_to(np.arange(len(index.segments.starts)), (len(points), len(index.segments.starts)))
+    distances, fractions = project_on_segments(index.segments, points[:, None, :], segments)
+    return distances.min(axis=1)
+
+
+def out_and_back():
+    # Droga dwujezdniowa: długi prosty odcinek w jedną stronę i gęsto próbkowany powrót 3 m obok
+    there = np.array([[0.0, 0.0], [800.0, 0.0]])
+    back = np.column_stack((np.linspace(800.0, 0.0, 801), np.full(801, 3.0)))
+    return from_local_metres(np.vstack((there, back)), ORIGIN)
+
+
+def test_projection_matches_brute_force_on_dual_carriageway():
+    ref = out_and_back()
+    index = build_polyline_index(ref)
+    rng = np.random.default_rng(0)
+    local = np.column_stack((rng.uniform(-20, 820, 3000), rng.uniform(-6, 9, 3000)))
+    track = from_local_metres(local, ORIGIN)
+    projection = project_on_polyline(index, track)
+    expected = brute_force(index, to_local_metres(track, index.origin))
+    np.testing.assert_allclose(projection.distances, expected, rtol=0, atol=1e-6)
+
+
+def test_point_near_long_segment_projects_onto_it():
+    ref = out_and_back()
+    track = from_local_metres(np.array([[400.0, 1.0]]), ORIGIN)
+    projection = project_on_polyline(build_polyline_index(ref), track)
+    assert np.isclose(projection.distances[0], 1.0, atol=1e-3)
+    assert projection.segments[0] == 0
+    assert np.isclose(projection.along_track[0], 400.0, atol=1e-2)
+
+
+def test_errors_on_reference_are_zero():
+    ref = out_and_back()
+    np.testing.assert_allclose(cross_track_errors(ref, ref), 0.0, atol=1e-6)
@@ -0,0 +1,104 @@
+import os
+
+import numpy as np
+
+from density import (DEFAULT_CELL_SIZE, add_points, add_routes, coarsen_grid, draw_grid, empty_grid, grid_tiles,
+                     key_cells, merge_grids)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def track(center, count, seed):
+    rng = np.random.default_rng(seed)
+    return np.asarray(center) + np.cumsum(rng.normal(0, 0.00005, (count, 2)), axis=0)
+
+
+def tile_lookup(tiles, cell_size, rows, cols):
+    # Wartość obrazu kafelka w środku każdej komórki
+    values = np.full(len(rows), np.nan)
+    centers_lat, centers_lon = (rows + 0.5) * cell_size, (cols + 0.5) * cell_size
+    for image, (lat0, lat1, lon0, lon1) in tiles:
+        inside = (centers_lat >= lat0) & (centers_lat < lat1) & (centers_lon >= lon0) & (centers_lon < lon1)
+        size = image.shape[0]
+        i = ((centers_lon[inside] - lon0) / (lon1 - lon0) * size).astype(int)
+        j = ((centers_lat[inside] - lat0) / (lat1 - lat0) * size).astype(int)
+        values[inside] = image[i, j]
+    return values
+
+
+def test_tiles_hold_every_cell_value():
+    grid = add_points(empty_grid(errors=True), track([50.13, 19.43], 5000, 0), np.arange(5000.0))
+    tiles, low, high = grid_tiles(grid, 'errors', tile_size=16)
+    rows, cols = key_cells(grid.keys)
+    expected = grid.error_sums / grid.counts
+    np.testing.assert_allclose(tile_lookup(tiles, grid.cell_size, rows, cols), expected)
+    assert low == expected.min() and high == expected.max()
+    filled = sum(np.count_nonzero(np.isfinite(image)) for image, _ in tiles)
+    assert filled == len(grid.keys)
+
+
+def test_distant_regions_do_not_densify_bounding_box():
+    # Dwa obszary ~500 km od siebie: prostokąt obejmujący to ~4.5e7 x 4.5e7 komórek
+    grid = add_points(empty_grid(), track([50.13, 19.43], 2000, 1))
+    grid = add_points(grid, track([54.35, 18.65], 2000, 2))
+    tiles, _, _ = grid_tiles(grid, tile_size=64)
+    assert sum(image.size for image, _ in tiles) <= 16 * 64 * 64
+    rows, cols = key_cells(grid.keys)
+    np.testing.assert_array_equal(tile_lookup(tiles, grid.cell_size, rows, cols), grid.counts)
+
+
+def test_pixel_budget_coarsens_grid():
+    rng = np.random.default_rng(3)
+    points = np.column_stack((rng.uniform(49.0, 54.8, 200000), rng.uniform(14.1, 24.1, 200000)))
+    grid = add_points(empty_grid(), points)
+    tiles, _, _ = grid_tiles(grid, max_pixels=2 ** 18)
+    assert sum(image.size for image, _ in tiles) <= 2 ** 18
+    assert sum(np.nansum(image) for image, _ in tiles) == len(points)
+
+
+def test_coarsen_preserves_totals():
+    grid = add_points(empty_grid(errors=True), track([50.13, 19.43], 3000, 4), np.ones(3000))
+    coarse = coarsen_grid(grid, 4)
+    assert coarse.cell_size == grid.cell_size * 4
+    assert coarse.counts.sum() == grid.counts.sum()
+    assert np.isclose(coarse.error_sums.sum(), grid.error_sums.sum())
+    assert len(coarse.keys) < len(grid.keys)
+
+
+def test_merge_equals_adding_all_points():
+    first, second = track([50.13, 19.43], 1000, 5), track([50.13, 19.43], 1000, 6)
+    merged = merge_grids(add_points(empty_grid(), first, source='a'), add_points(empty_grid(), second, source='b'))
+    combined = add_points(empty_grid(), np.vstack((first, second)))
+    np.testing.assert_array_equal(merged.keys, combined.keys)
+    np.testing.assert_array_equal(merged.counts, combined.counts)
+    assert merged.sources == ('a', 'b')
+    assert add_points(merged, first, source='a') is merged
+
+
+def test_draw_grid_headless():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    grid = add_points(empty_grid(DEFAULT_CELL_SIZE), track([50.13, 19.43], 500, 7))
+    fig, ax = plt.subplots()
+    image = draw_grid(ax, grid, max_pixels=2 ** 16)
+    fig.colorbar(image, ax=ax)
+    assert len(ax.images) >= 1
+    assert all(artist.norm is image.norm for artist in ax.images)
+    plt.close(fig)
+
+
+def test_broken_route_is_skipped_and_others_added(tmp_path):
+    route_dir = os.path.join(ROOT, 'TRASA_4_1S')
+    good = {'route': 'TRASA_4_1S', 'original': os.path.join(route_dir, 'originalT4.txt'),
+            'reference': os.path.join(route_dir, 'referencyjneT4.txt'),
+            'methods': {'Kalman': os.path.join(route_dir, 'smoothed Kalman.txt')}}
+    # Plik wygładzony istnieje, ale brak pliku oryginalnego: błąd pojawia się w procesie roboczym
+    smoothed_copy = tmp_path / 'smoothed Kalman.txt'
+    smoothed_copy.write_bytes(open(good['methods']['Kalman'], 'rb').read())
+    broken = dict(good, route='TRASA_X', original=str(tmp_path / 'brak.txt'), methods={'Kalman': str(smoothed_copy)})
+    missing = dict(good, route='TRASA_Y', methods={'Kalman': str(tmp_path / 'brak smoothed.txt')})
+    grid, added = add_routes(empty_grid(errors=True), [broken, missing, good], workers=1)
+    assert added == 1 and len(grid.sources) == 1
+    assert grid.counts.sum() > 0
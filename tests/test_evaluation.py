@@ -0,0 +1,24 @@
+import numpy as np
+
+from evaluation import evaluate_track
+
+
+def track(count, offset, seed):
+    rng = np.random.default_rng(seed)
+    lat = 50.0 + np.linspace(0, 0.01, count) + rng.normal(0, offset, count)
+    lon = 19.0 + np.linspace(0, 0.005, count) + rng.normal(0, offset, count)
+    return np.column_stack((np.arange(count), lat, lon))
+
+
+def test_original_longer_than_smoothed_by_one_point():
+    original_data = track(209, 1e-4, 0)
+    smoothed = track(208, 5e-5, 1)
+    smoothed_data = np.column_stack((smoothed, np.zeros(208), np.arange(208) // 10, np.arange(208)))
+    ref_data = track(40, 0, 2)[:, 1:3]
+    result = evaluate_track(original_data, smoothed_data, ref_data)
+    truncated = evaluate_track(original_data[:208], smoothed_data, ref_data)
+    for track_name in ('smoothed', 'original'):
+        assert len(result['no_groups'][track_name].errors) == 208
+        np.testing.assert_array_equal(result['no_groups'][track_name].errors,
+                                      truncated['no_groups'][track_name].errors)
+    np.testing.assert_array_equal(result['groups'][:10], truncated['groups'][:10])
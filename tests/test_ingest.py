@@ -0,0 +1,66 @@
+import asyncio
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import ingest
+from ingest import FAILED_DIR, PROCESSED_DIR, IngestService, upload
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RECORDING = os.path.join(ROOT, 'originalT4.txt')
+REFERENCE = os.path.join(ROOT, 'referencyjneT4.txt')
+
+
+def service(tmp_path):
+    # Pula wątków zamiast procesów: szybszy start i możliwość podmiany evaluate_recording w testach
+    return IngestService(REFERENCE, str(tmp_path / 'wyniki.csv'), workers=1, queue_size=1,
+                         executor=ThreadPoolExecutor(max_workers=1))
+
+
+def drop(tmp_path, name, source=None, content=None):
+    path = tmp_path / 'zrzut' / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if source is not None:
+        shutil.copyfile(source, path)
+    else:
+        path.write_text(content)
+    return path
+
+
+def test_malformed_file_is_archived_and_next_file_evaluated(tmp_path):
+    drop(tmp_path, 'telefon1/a_zepsuty.xml', content='<map><bad')
+    drop(tmp_path, 'telefon1/b_trasa.txt', source=RECORDING)
+    ingest_service = service(tmp_path)
+    asyncio.run(ingest_service.run(str(tmp_path / 'zrzut'), once=True))
+    assert (ingest_service.failed, ingest_service.processed) == (1, 1)
+    assert (tmp_path / 'zrzut' / FAILED_DIR / 'telefon1' / 'a_zepsuty.xml').exists()
+    assert (tmp_path / 'zrzut' / PROCESSED_DIR / 'telefon1' / 'b_trasa.txt').exists()
+    assert (tmp_path / 'wyniki.csv').read_text().count('telefon1/b_trasa.txt') == 2
+
+
+def test_unexpected_error_resolves_future_and_keeps_consumer(tmp_path, monkeypatch):
+    evaluate = ingest.evaluate_recording
+
+    def failing(file_path, name, *args):
+        if name.startswith('zly'):
+            raise RuntimeError('nieoczekiwany błąd')
+        return evaluate(file_path, name, *args)
+    monkeypatch.setattr(ingest, 'evaluate_recording', failing)
+    ingest_service = service(tmp_path)
+
+    async def scenario():
+        runner = asyncio.create_task(ingest_service.run(socket_path=str(tmp_path / 'ingest.sock')))
+        while not (tmp_path / 'ingest.sock').exists():
+            await asyncio.sleep(0.01)
+        bad = await asyncio.wait_for(upload(str(tmp_path / 'ingest.sock'), RECORDING, 'zly.txt'), 30)
+        good = await asyncio.wait_for(upload(str(tmp_path / 'ingest.sock'), RECORDING, 'dobry.txt'), 30)
+        runner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await runner
+        return bad, good
+    bad, good = asyncio.run(scenario())
+    assert bad == {'name': 'zly.txt', 'status': 'error', 'error': 'nieoczekiwany błąd'}
+    assert good['status'] == 'ok' and set(good['results']) == {'smoothed', 'original'}
+    assert (ingest_service.failed, ingest_service.processed) == (1, 1)
@@ -0,0 +1,25 @@
+import tracemalloc
+
+import instrumentation
+
+
+def test_disable_keeps_external_tracemalloc():
+    tracemalloc.start()
+    try:
+        instrumentation.enable(memory=True)
+        with instrumentation.stage('alloc'):
+            data = [0] * 100000
+        result = instrumentation.disable()
+        assert tracemalloc.is_tracing()
+        assert result['stages'][0]['peak_memory'] >= 0 and len(data) == 100000
+    finally:
+        tracemalloc.stop()
+
+
+def test_disable_stops_tracemalloc_started_by_enable():
+    assert not tracemalloc.is_tracing()
+    instrumentation.enable(memory=True)
+    instrumentation.enable(memory=True)
+    assert tracemalloc.is_tracing()
+    instrumentation.disable()
+    assert not tracemalloc.is_tracing()
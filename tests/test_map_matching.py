@@ -0,0 +1,49 @@
+import numpy as np
+
+from geo import from_local_metres, to_local_metres
+from map_matching import build_road_index, snap_points
+from road_graph import RoadGraph
+from spatial_index import project_on_segments
+
+ORIGIN = np.array([50.29, 18.67])
+
+
+def dual_carriageway_graph():
+    # Jezdnia północna: jedna długa krawędź; jezdnia południowa 6 m obok: gęsto podzielona na krawędzie co 1 m
+    north = np.array([[0.0, 6.0], [1000.0, 6.0]])
+    south = np.column_stack((np.arange(1000.0, -1.0, -1.0), np.zeros(1001)))
+    local = np.vstack((north, south))
+    edge_starts = np.concatenate(([0], np.arange(2, len(local) - 1)))
+    edge_ends = np.concatenate(([1], np.arange(3, len(local))))
+    ways = np.concatenate(([1], np.full(len(edge_starts) - 1, 2)))
+    return RoadGraph(np.arange(len(local)), from_local_metres(local, ORIGIN), edge_starts, edge_ends, ways)
+
+
+def test_snaps_to_correct_carriageway():
+    road_index = build_road_index(dual_carriageway_graph())
+    # Punkty 2.5 m od jezdni północnej i 3.5 m od południowej, na granicach fragmentów długiej krawędzi
+    track = from_local_metres(np.column_stack((np.arange(100.0, 901.0, 10.0), np.full(81, 3.5))), ORIGIN)
+    result = snap_points(road_index, track)
+    assert np.all(result.edges == 0)
+    np.testing.assert_allclose(result.distances, 2.5, atol=1e-3)
+    assert np.all(result.matched)
+
+
+def test_candidates_match_brute_force():
+    road_index = build_road_index(dual_carriageway_graph())
+    rng = np.random.default_rng(0)
+    local = np.column_stack((rng.uniform(-20, 1020, 2000), rng.uniform(-10, 16, 2000)))
+    result = snap_points(road_index, from_local_metres(local, ORIGIN))
+    segments = road_index.segments
+    points = to_local_metres(from_local_metres(local, ORIGIN), road_index.origin)
+    all_edges = np.broadcast_to(np.arange(len(segments.starts)), (len(points), len(segments.starts)))
+    expected, _ = project_on_segments(segments, points[:, None, :], all_edges)
+    np.testing.assert_allclose(result.distances, expected.min(axis=1), rtol=0, atol=1e-6)
+
+
+def test_far_points_stay_unmatched():
+    road_index = build_road_index(dual_carriageway_graph())
+    track = from_local_metres(np.array([[500.0, 100.0]]), ORIGIN)
+    result = snap_points(road_index, track, max_distance=30.0)
+    assert not result.matched[0]
+    np.testing.assert_allclose(result.points, track)
@@ -0,0 +1,135 @@
+import sys
+import warnings
+
+import numpy as np
+import pytest
+
+import smoothing
+from geo import from_local_metres, to_local_metres
+from smoothing import (KALMAN, MA_AZIMUTH, METHODS, assign_groups, heading_from_positions, kalman, smooth_track,
+                       write_smoothed)
+
+ORIGIN = np.array([50.13, 19.43])
+
+
+def make_columns(count=200, seed=0, azimuth=True, jump_at=None):
+    rng = np.random.default_rng(seed)
+    # Ruch na północny wschód co ok. 2 m, z szumem pomiaru
+    local = np.column_stack((np.arange(count) * 1.5, np.arange(count) * 1.2)) + rng.normal(0, 0.5, (count, 2))
+    if jump_at is not None:
+        local[jump_at:] += 100.0
+    coords = from_local_metres(local, ORIGIN)
+    columns = {
+        'index': np.arange(count),
+        'lat': coords[:, 0],
+        'lon': coords[:, 1],
+        'accuracy': rng.uniform(3, 12, count),
+        'time': 1722252824555 + 1000 * np.arange(count, dtype=np.int64),
+    }
+    if azimuth:
+        columns['azimuth'] = np.full(count, 51.3) + rng.normal(0, 5, count)
+    return columns
+
+
+def reference_kalman(xy, segments, columns, process_noise=smoothing.DEFAULT_PROCESS_NOISE):
+    accuracy = smoothing._accuracy(columns)
+    times = np.asarray(columns['time'], dtype=np.float64) / 1000.0
+    result = np.empty_like(xy)
+    for k in range(len(xy)):
+        if k == 0 or segments[k] != segments[k - 1]:
+            state, variance = xy[k].copy(), accuracy[k] ** 2
+        else:
+            prior = variance + process_noise * max(times[k] - times[k - 1], 0.0)
+            gain = prior / (prior + accuracy[k] ** 2)
+            state = state + gain * (xy[k] - state)
+            variance = (1 - gain) * prior
+        result[k] = state
+    return result
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_methods_return_finite_tracks_without_azimuth(method):
+    columns = make_columns(azimuth=False)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        smoothed = smooth_track(columns, method)
+    assert np.all(np.isfinite(smoothed['lat'])) and np.all(np.isfinite(smoothed['lon']))
+
+
+def test_azimuth_nan_column_falls_back_to_headings():
+    columns = make_columns()
+    headings = dict(columns, azimuth=heading_from_positions(
+        to_local_metres(np.column_stack((columns['lat'], columns['lon'])), ORIGIN),
+        assign_groups(np.column_stack((columns['lat'], columns['lon'])))[0]))
+    missing = dict(columns, azimuth=np.full(len(columns['lat']), np.nan))
+    np.testing.assert_allclose(smooth_track(missing, MA_AZIMUTH)['lat'], smooth_track(headings, MA_AZIMUTH)['lat'])
+
+
+def test_heading_from_positions():
+    xy = np.array([[0.0, 0.0], [0.0, 1.0], [1.0, 1.0], [1.0, 1.0], [1.0, 1.0]])
+    headings = heading_from_positions(xy, np.array([0, 0, 0, 1, 1]))
+    np.testing.assert_allclose(headings[:3], [0.0, 45.0, 90.0])
+    assert np.all(np.isnan(headings[3:]))
+
+
+def test_kalman_matches_reference_loop_across_segments():
+    columns = make_columns(count=300, jump_at=150)
+    coords = np.column_stack((columns['lat'], columns['lon']))
+    segments, _ = assign_groups(coords)
+    assert segments.max() == 1
+    xy = to_local_metres(coords, ORIGIN)
+    np.testing.assert_allclose(kalman(xy, segments, columns), reference_kalman(xy, segments, columns), atol=1e-9)
+
+
+def test_kalman_nan_accuracy_is_imputed():
+    columns = make_columns(count=5000)
+    columns['accuracy'][[3, 1000, 4000]] = np.nan
+    columns['accuracy'][10] = np.inf
+    smoothed = smooth_track(columns, KALMAN)
+    assert np.all(np.isfinite(smoothed['lat'])) and np.all(np.isfinite(smoothed['lon']))
+    imputed = dict(columns, accuracy=np.where(np.isfinite(columns['accuracy']), columns['accuracy'],
+                                              np.median(columns['accuracy'][np.isfinite(columns['accuracy'])])))
+    np.testing.assert_allclose(smoothed['lat'], smooth_track(imputed, KALMAN)['lat'])
+
+
+def test_kalman_segment_reset_isolates_state():
+    columns = make_columns(count=300, jump_at=150)
+    coords = np.column_stack((columns['lat'], columns['lon']))
+    segments, _ = assign_groups(coords)
+    xy = to_local_metres(coords, ORIGIN)
+    poisoned = xy.copy()
+    poisoned[20] = np.nan
+    result = kalman(poisoned, segments, columns)
+    assert np.all(np.isnan(result[20:150]))
+    np.testing.assert_allclose(result[150:], kalman(xy, segments, columns)[150:])
+
+
+def test_cli_refuses_to_overwrite(tmp_path, monkeypatch, capsys):
+    columns = make_columns(count=50)
+    original = tmp_path / 'original.txt'
+    with open(original, 'w') as original_file:
+        for index, lat, lon, accuracy, time in zip(columns['index'], columns['lat'], columns['lon'],
+                                                   columns['accuracy'], columns['time']):
+            original_file.write(f'Point {index}:Latitude:{lat} Longitude:{lon} Accuracy:{accuracy} SX:0 SY:0 '
+                                f'Time:{time}\n')
+    output_dir = tmp_path / 'wyniki'
+    output_dir.mkdir()
+    existing = output_dir / 'smoothed MA.txt'
+    write_smoothed(smooth_track(columns, 'WMA'), existing)
+    content = existing.read_text()
+
+    monkeypatch.setattr(sys, 'argv', ['smoothing.py', str(original), '--methods', 'MA',
+                                      '--output-dir', str(output_dir)])
+    with pytest.raises(SystemExit):
+        smoothing.main()
+    assert existing.read_text() == content
+
+    monkeypatch.setattr(sys, 'argv', sys.argv + ['--force'])
+    smoothing.main()
+    assert existing.read_text() != content
+
+
+def test_cli_requires_output_dir(monkeypatch):
+    monkeypatch.setattr(sys, 'argv', ['smoothing.py', 'original.txt'])
+    with pytest.raises(SystemExit):
+        smoothing.main()
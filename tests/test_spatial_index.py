@@ -0,0 +1,54 @@
+import numpy as np
+
+from spatial_index import build_segment_index, project_on_segments, query_segments
+
+
+def brute_force(index, points):
+    segments = np.broadcast_to(np.arange(len(index.starts)), (len(points), len(index.starts)))
+    distances, _ = project_on_segments(index, points[:, None, :], segments)
+    return distances.min(axis=1), distances.argmin(axis=1)
+
+
+def dual_carriageway():
+    # Długi odcinek i gęsta równoległa łamana (pas ruchu) 4 m obok niego
+    lane_x = np.arange(400.0, 601.0)
+    starts = np.vstack(([[0.0, 0.0]], np.column_stack((lane_x[:-1], np.full(len(lane_x) - 1, 4.0)))))
+    ends = np.vstack(([[1000.0, 0.0]], np.column_stack((lane_x[1:], np.full(len(lane_x) - 1, 4.0)))))
+    return build_segment_index(starts, ends)
+
+
+def test_parallel_lane_does_not_hide_long_segment():
+    index = dual_carriageway()
+    distances, segments, fractions = query_segments(index, np.array([[500.0, 1.0]]))
+    assert segments[0] == 0
+    assert np.isclose(distances[0], 1.0)
+    assert np.isclose(fractions[0], 0.5)
+
+
+def test_matches_brute_force_on_parallel_geometry():
+    index = dual_carriageway()
+    rng = np.random.default_rng(0)
+    points = np.column_stack((rng.uniform(-50, 1050, 2000), rng.uniform(-10, 15, 2000)))
+    distances, segments, _ = query_segments(index, points)
+    expected, _ = brute_force(index, points)
+    np.testing.assert_allclose(distances, expected, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(project_on_segments(index, points, segments)[0], expected, rtol=0, atol=1e-9)
+
+
+def test_matches_brute_force_on_random_segments():
+    rng = np.random.default_rng(1)
+    starts = rng.uniform(0, 500, (300, 2))
+    ends = starts + rng.normal(0, 40, (300, 2))
+    index = build_segment_index(starts, ends, piece_length=10.0)
+    points = rng.uniform(-20, 520, (3000, 2))
+    distances, _, _ = query_segments(index, points, candidates=2)
+    expected, _ = brute_force(index, points)
+    np.testing.assert_allclose(distances, expected, rtol=0, atol=1e-9)
+
+
+def test_fewer_pieces_than_candidates():
+    index = build_segment_index(np.array([[0.0, 0.0]]), np.array([[5.0, 0.0]]))
+    distances, segments, fractions = query_segments(index, np.array([[2.0, 3.0], [-4.0, 0.0]]))
+    np.testing.assert_allclose(distances, [3.0, 4.0])
+    np.testing.assert_array_equal(segments, [0, 0])
+    np.testing.assert_allclose(fractions, [0.4, 0.0])
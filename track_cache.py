@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from loader import load_file
+
+##
+# \file track_cache.py
+# \brief Binarna pamięć podręczna wczytanych śladów z odczytem przez mapowanie pamięci.
+#
+# Każda kolumna wczytanego pliku (oryginalnego, wygładzonego lub referencyjnego) zapisywana jest jako osobny plik .npy
+# o stałym typie. Wpis identyfikowany jest ścieżką pliku źródłowego oraz jego czasem modyfikacji i rozmiarem, więc zmiana
+# pliku tekstowego automatycznie unieważnia wpis. Kolumny odczytywane są przez np.load(mmap_mode='r'), dzięki czemu
+# kolejne uruchomienia startują niemal natychmiast, a wiele procesów korzysta z tych samych stron pamięci.
+#
+# Układ katalogu: <cache_dir>/<skrót ścieżki>/<skrót znacznika>/{meta.json, <kolumna>.npy}
+
+DEFAULT_CACHE_DIR = '.track_cache'
+META_FILE = 'meta.json'
+
+##
+# @brief Zwraca skrót SHA-1 podanych wartości.
+# @param parts Wartości składające się na klucz.
+# @return Skrót szesnastkowy.
+def _digest(*parts):
+    return hashlib.sha1('\0'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+##
+# @brief Zwraca skrót zawartości pliku.
+# @param file_path Ścieżka do pliku.
+# @return Skrót SHA-1 (szesnastkowy).
+def file_digest(file_path):
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as data_file:
+        for chunk in iter(lambda: data_file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+##
+# @brief Zapisuje kolumny do nowego wpisu w sposób atomowy.
+# @param entry_dir Katalog wpisu.
+# @param columns Słownik nazwa kolumny -> tablica NumPy.
+# @param meta Metadane zapisywane w meta.json.
+# @param replace_siblings Czy usunąć pozostałe wpisy w katalogu nadrzędnym (nieaktualne wersje tego samego źródła).
+def _store(entry_dir, columns, meta, replace_siblings=False):
+    parent = os.path.dirname(entry_dir)
+    os.makedirs(parent, exist_ok=True)
+    if replace_siblings:
+        shutil.rmtree(entry_dir, ignore_errors=True)
+    temp_dir = tempfile.mkdtemp(dir=parent, prefix='.tmp-')
+    try:
+        for name, values in columns.items():
+            np.save(os.path.join(temp_dir, name + '.npy'), np.ascontiguousarray(values))
+        with open(os.path.join(temp_dir, META_FILE), 'w') as meta_file:
+            json.dump(dict(meta, columns=list(columns)), meta_file)
+        os.rename(temp_dir, entry_dir)
+    except OSError:
+        # Wpis mógł zostać zapisany równolegle przez inny proces
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        if not os.path.isdir(entry_dir):
+            raise
+
+    if not replace_siblings:
+        return
+    for name in os.listdir(parent):
+        path = os.path.join(parent, name)
+        if path != entry_dir and not name.startswith('.tmp-'):
+            shutil.rmtree(path, ignore_errors=True)
+
+##
+# @brief Odczytuje wpis przez mapowanie pamięci.
+# @param entry_dir Katalog wpisu.
+# @return Krotka (metadane, słownik kolumn) lub None, jeśli wpis nie istnieje.
+def _load(entry_dir):
+    try:
+        with open(os.path.join(entry_dir, META_FILE), 'r') as meta_file:
+            meta = json.load(meta_file)
+        columns = {name: np.load(os.path.join(entry_dir, name + '.npy'), mmap_mode='r') for name in meta['columns']}
+    except (OSError, ValueError):
+        return None
+    return meta, columns
+
+##
+# @brief Zwraca katalog wpisu dla pliku źródłowego o podanym stanie.
+# @param cache_dir Katalog pamięci podręcznej.
+# @param key Wartości identyfikujące źródło (ścieżka pliku i ewentualnie rodzaj danych).
+# @param stat Wynik os.stat dla pliku źródłowego.
+# @return Ścieżka katalogu wpisu.
+def _file_entry_dir(cache_dir, key, stat):
+    return os.path.join(cache_dir, _digest(*key), _digest(stat.st_mtime_ns, stat.st_size))
+
+##
+# @brief Wczytuje plik z danymi, korzystając z pamięci podręcznej (zamiennik loader.load_file).
+# @param file_path Ścieżka do pliku z danymi.
+# @param role Rola pliku; jeśli None, format rozpoznawany jest automatycznie.
+# @param cache_dir Katalog pamięci podręcznej.
+# @return Krotka (rola, słownik kolumn); kolumny są tylko do odczytu (np.memmap).
+def load_file_cached(file_path, role=None, cache_dir=DEFAULT_CACHE_DIR):
+    file_path = os.path.abspath(file_path)
+    stat = os.stat(file_path)
+    entry_dir = _file_entry_dir(cache_dir, (file_path,), stat)
+
+    cached = _load(entry_dir)
+    if cached is not None and role in (None, cached[0]['role']):
+        meta, columns = cached
+        return meta['role'], columns
+
+    role, columns = load_file(file_path, role)
+    if role is not None:
+        _store(entry_dir, columns, {'role': role, 'source': file_path,
+                                    'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}, replace_siblings=True)
+    return role, columns
+
+##
+# @brief Zwraca kolumny wyliczone z pliku źródłowego przez compute, zapamiętane do czasu zmiany tego pliku.
+#
+# Służy m.in. do zapamiętania grafu dróg zbudowanego z pliku map.osm (road_graph.py).
+# @param file_path Ścieżka do pliku źródłowego.
+# @param name Nazwa rodzaju danych (np. 'road_graph').
+# @param params Dodatkowe parametry wchodzące do klucza.
+# @param compute Funkcja bez argumentów zwracająca słownik nazwa kolumny -> tablica NumPy.
+# @param cache_dir Katalog pamięci podręcznej.
+# @return Słownik kolumn (np.memmap tylko do odczytu, jeśli pochodzą z pamięci podręcznej).
+def cached_file_columns(file_path, name, params, compute, cache_dir=DEFAULT_CACHE_DIR):
+    file_path = os.path.abspath(file_path)
+    stat = os.stat(file_path)
+    entry_dir = _file_entry_dir(cache_dir, (name, file_path, *params), stat)
+
+    cached = _load(entry_dir)
+    if cached is not None:
+        return cached[1]
+
+    columns = {column: np.asarray(values) for column, values in compute().items()}
+    _store(entry_dir, columns, {'name': name, 'source': file_path, 'params': [str(param) for param in params],
+                                'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}, replace_siblings=True)
+    return columns
+
+##
+# @brief Zwraca tablicę wyliczoną przez compute, zapamiętaną pod kluczem zależnym od zawartości danych wejściowych.
+#
+# Służy m.in. do zapamiętania interpolowanych danych referencyjnych: kluczem jest skrót tablicy referencyjnej,
+# liczba punktów i rodzaj interpolacji.
+# @param name Nazwa rodzaju danych (np. 'interpolated_reference').
+# @param inputs Tablica wejściowa, której zawartość wchodzi do klucza.
+# @param params Dodatkowe parametry wchodzące do klucza.
+# @param compute Funkcja bez argumentów wyliczająca tablicę w razie braku wpisu.
+# @param cache_dir Katalog pamięci podręcznej.
+# @return Tablica NumPy (np.memmap tylko do odczytu, jeśli pochodzi z pamięci podręcznej).
+def cached_array(name, inputs, params, compute, cache_dir=DEFAULT_CACHE_DIR):
+    inputs = np.ascontiguousarray(inputs)
+    content = hashlib.sha1(inputs.tobytes()).hexdigest()
+    entry_dir = os.path.join(cache_dir, _digest(name, content), _digest(inputs.dtype, inputs.shape, *params))
+
+    cached = _load(entry_dir)
+    if cached is not None:
+        return cached[1][name]
+
+    values = np.asarray(compute())
+    _store(entry_dir, {name: values}, {'name': name, 'params': [str(param) for param in params]})
+    return values
+
+##
+# @brief Usuwa całą pamięć podręczną.
+# @param cache_dir Katalog pamięci podręcznej.
+def clear_cache(cache_dir=DEFAULT_CACHE_DIR):
+    shutil.rmtree(cache_dir, ignore_errors=True)
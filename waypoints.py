@@ -0,0 +1,99 @@
+import html
+import re
+from array import array
+
+import numpy as np
+
+from loader import ORIGINAL_COLUMNS, INTEGER_COLUMNS, append_original_point, parse_original_fields
+
+##
+# \file waypoints.py
+# \brief Strumieniowe wczytywanie nagrań zapisanych jako XML SharedPreferences z aplikacji na Androida.
+#
+# Nagranie to pojedynczy element <string name="waypoints"> zawierający tablicę JSON z napisami
+# "Latitude:... Longitude:... Accuracy:... SX:... Time:... Azimuth:...", w której cudzysłowy zapisane są jako &quot;.
+# Plik czytany jest fragmentami, a kolejne punkty trafiają od razu do zwartych tablic kolumn, bez budowania całego
+# odkodowanego napisu ani list pośrednich.
+
+START_TAG = '<string name="waypoints">'
+END_TAG = '</string>'
+CHUNK_SIZE = 1 << 16
+
+# Pojedynczy punkt: tekst pomiędzy dwoma cudzysłowami (zakodowanymi lub nie)
+_ENTRY_PATTERN = re.compile(r'(?:&quot;|")([^&"]*)(?:&quot;|")')
+
+##
+# @brief Tworzy puste, zwarte tablice kolumn danych oryginalnych.
+# @return Słownik nazwa kolumny -> array.array.
+def _new_columns():
+    return {name: array('q' if name in INTEGER_COLUMNS else 'd') for name in ORIGINAL_COLUMNS}
+
+##
+# @brief Zamienia zwarte tablice kolumn na tablice NumPy.
+# @param columns Słownik nazwa kolumny -> array.array.
+# @return Słownik nazwa kolumny -> tablica NumPy.
+def _to_numpy(columns):
+    return {name: np.frombuffer(values, dtype=np.int64 if name in INTEGER_COLUMNS else np.float64)
+            for name, values in columns.items()}
+
+##
+# @brief Wczytuje kolejne punkty nagrania partiami.
+#
+# Pamięć zajmowana przez parser jest ograniczona rozmiarem fragmentu pliku i partii punktów, niezależnie od długości
+# nagrania.
+# @param file_path Ścieżka do pliku XML.
+# @param batch_size Maksymalna liczba punktów w jednej partii.
+# @param chunk_size Rozmiar fragmentu pliku czytanego jednorazowo (w znakach).
+# @return Generator słowników kolumn ORIGINAL_COLUMNS; numeracja punktów jest ciągła pomiędzy partiami.
+def iter_waypoint_batches(file_path, batch_size=65536, chunk_size=CHUNK_SIZE):
+    index = 0
+    columns = _new_columns()
+    buffer = ''
+    started = False
+    finished = False
+    with open(file_path, 'r', encoding='utf-8') as xml_file:
+        while not finished:
+            chunk = xml_file.read(chunk_size)
+            if not chunk:
+                finished = True
+            buffer += chunk
+
+            if not started:
+                start = buffer.find(START_TAG)
+                if start < 0:
+                    # Zachowanie końcówki, w której może zaczynać się znacznik
+                    buffer = buffer[-len(START_TAG):]
+                    continue
+                buffer = buffer[start + len(START_TAG):]
+                started = True
+
+            end = buffer.find(END_TAG)
+            if end >= 0:
+                buffer = buffer[:end]
+                finished = True
+
+            consumed = 0
+            for match in _ENTRY_PATTERN.finditer(buffer):
+                consumed = match.end()
+                point = parse_original_fields(html.unescape(match.group(1)))
+                if point is None:
+                    continue
+                append_original_point(columns, index, point)
+                index += 1
+                if len(columns['index']) >= batch_size:
+                    yield _to_numpy(columns)
+                    columns = _new_columns()
+            buffer = buffer[consumed:]
+
+    if len(columns['index']):
+        yield _to_numpy(columns)
+
+##
+# @brief Wczytuje całe nagranie do kolumn danych oryginalnych.
+# @param file_path Ścieżka do pliku XML.
+# @return Słownik kolumn ORIGINAL_COLUMNS (jak loader.parse_original).
+def load_waypoints(file_path):
+    batches = list(iter_waypoint_batches(file_path))
+    if not batches:
+        return _to_numpy(_new_columns())
+    return {name: np.concatenate([batch[name] for batch in batches]) for name in ORIGINAL_COLUMNS}